@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2018-2026 J-Michael Roberts, Corvus Forensics LLC
+'''
+OWL allocation benchmark.
+
+Runs wiper's write, verify and map passes against a scratch image file and
+samples the process RSS while each pass runs. The pass loops read into a
+preallocated ring and write from shared pattern buffers, so once the first
+blocks are through, nothing block-sized should be allocated: the resident
+set must stay flat for the rest of the pass. Growth beyond --tolerance
+after the warm-up fraction is reported as a failure (exit status 1).
+
+    python3 bench/bench_alloc.py --size 2G --blocksize 1M --queue-depth 4
+
+No root is needed. The image is created sparse in --dir and removed
+afterwards. --trace additionally reports the tracemalloc peak per pass,
+which shows Python-level allocation independently of allocator reuse.
+'''
+import os
+import sys
+import argparse
+import tempfile
+import threading
+import time
+import tracemalloc
+from rich.console import Console
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import wiper  # noqa: E402
+
+_PAGE = os.sysconf('SC_PAGE_SIZE')
+
+
+def rss():
+    '''Current resident set size in bytes, from /proc/self/statm.'''
+    with open('/proc/self/statm', encoding="utf-8") as statm:
+        return int(statm.read().split()[1]) * _PAGE
+
+
+class RssSampler(threading.Thread):
+    '''
+    Samples RSS every interval seconds until stopped. samples is a list of
+    (elapsed_seconds, rss_bytes).
+    '''
+    def __init__(self, interval=0.02):
+        super().__init__(daemon=True)
+        self.interval = interval
+        self.samples = []
+        self._done = threading.Event()
+
+    def run(self):
+        start = time.monotonic()
+        while not self._done.is_set():
+            self.samples.append((time.monotonic() - start, rss()))
+            self._done.wait(self.interval)
+
+    def stop(self):
+        self._done.set()
+        self.join()
+        return self.samples
+
+
+def measure(name, func, warmup, trace):
+    '''
+    Run func() under the RSS sampler and return a result dict. Growth is
+    the largest RSS seen after the warm-up fraction of the pass minus the
+    RSS at the end of the warm-up.
+    '''
+    if trace:
+        tracemalloc.start()
+    sampler = RssSampler()
+    sampler.start()
+    started = time.monotonic()
+    func()
+    elapsed = time.monotonic() - started
+    samples = sampler.stop()
+    peak_traced = None
+    if trace:
+        peak_traced = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    steady = [value for when, value in samples if when >= elapsed * warmup]
+    if not steady:
+        steady = [samples[-1][1]]
+    return {
+        "pass":        name,
+        "seconds":     elapsed,
+        "rss_start":   samples[0][1],
+        "rss_steady":  steady[0],
+        "rss_max":     max(steady),
+        "growth":      max(steady) - steady[0],
+        "samples":     len(samples),
+        "traced_peak": peak_traced,
+    }
+
+
+def main():
+    '''Build the scratch image, run each pass, and print a summary table.'''
+    parser = argparse.ArgumentParser(description="RSS / allocation benchmark "
+        "for the wiper pass loops.")
+    parser.add_argument("--size", default="1G", help="image size (default: 1G)")
+    parser.add_argument("--blocksize", default="1M", help="block size (default: 1M)")
+    parser.add_argument("--queue-depth", type=int, default=1, dest="queue_depth")
+    parser.add_argument("--engine", choices=wiper._ENGINES, default="buffered")
+    parser.add_argument("--dir", default=tempfile.gettempdir(),
+        help="directory for the scratch image")
+    parser.add_argument("--warmup", type=float, default=0.1,
+        help="fraction of each pass ignored before measuring growth (default: 0.1)")
+    parser.add_argument("--tolerance", default="4M",
+        help="allowed steady-state RSS growth per pass (default: 4M)")
+    parser.add_argument("--trace", action="store_true",
+        help="also report the tracemalloc peak for each pass")
+    args = parser.parse_args()
+
+    size = wiper.parse_size(args.size)
+    blocksize = wiper.parse_size(args.blocksize)
+    tolerance = wiper.parse_size(args.tolerance)
+
+    # Keep the progress bars out of the measurement
+    wiper.console = Console(file=open(os.devnull, "w", encoding="utf-8"))
+
+    fd_img, path = tempfile.mkstemp(prefix="owl_bench_", suffix=".img", dir=args.dir)
+    os.close(fd_img)
+    results = []
+    try:
+        os.truncate(path, size)
+        flags = os.O_RDWR | (os.O_DIRECT if args.engine == "direct" else os.O_SYNC)
+        block = os.open(path, flags)
+        logical, physical = wiper.sector_sizes(block)
+        engine = wiper.IOEngine(name=args.engine, logical_sector=logical,
+                                physical_sector=physical,
+                                queue_depth=args.queue_depth)
+        if args.engine == "direct" and size % logical:
+            engine.tailfd = os.open(path, os.O_RDWR | os.O_SYNC)
+
+        passes = [
+            ("write 0xFF",  lambda: wiper.writeloop(block, blocksize, size, "FF", None, engine)),
+            ("verify 0xFF", lambda: wiper.readloop(block, blocksize, size, "FF", None, engine)),
+            ("write 0x00",  lambda: wiper.writeloop(block, blocksize, size, "00", None, engine)),
+            ("verify 0x00", lambda: wiper.readloop(block, blocksize, size, "00", None, engine)),
+            ("map",         lambda: wiper.drivemap(block, blocksize, size, None, engine)),
+        ]
+        for name, func in passes:
+            results.append(measure(name, func, args.warmup, args.trace))
+        os.close(block)
+    finally:
+        os.remove(path)
+
+    mib = 1024 * 1024
+    print(f"{'pass':<12} {'MB/s':>9} {'RSS steady':>11} {'RSS max':>9} "
+          f"{'growth':>9}" + (f" {'traced peak':>12}" if args.trace else ""))
+    failed = False
+    for res in results:
+        line = (f"{res['pass']:<12} {size / res['seconds'] / mib:>9.1f} "
+                f"{res['rss_steady'] / mib:>9.1f}Mi {res['rss_max'] / mib:>7.1f}Mi "
+                f"{res['growth'] / 1024:>7.0f}Ki")
+        if args.trace:
+            line += f" {res['traced_peak'] / 1024:>10.0f}Ki"
+        if res['growth'] > tolerance:
+            line += "  GROWTH"
+            failed = True
+        print(line)
+    print("FAIL: RSS grew during a pass" if failed else "OK: RSS flat across every pass")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
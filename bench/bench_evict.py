@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2018-2026 J-Michael Roberts, Corvus Forensics LLC
+'''
+OWL cache eviction check.
+
+First checks the primitive directly: with the target's pages cached,
+flushcaches() must leave resident_bytes() reporting zero.
+
+Then proves that a verify pass reads the media: runs wiper's zero write and
+verify passes over a scratch image through the buffered engine, and at the
+moment readloop() is entered counts the image's pages still in the page
+cache with mincore(2). Any resident byte is a failure (exit status 1).
+
+It also shows that the flush is scoped to the target. A second "neighbour"
+image is read into the cache first and must still be cached after the
+target has been flushed; the old host-wide drop_caches would have evicted
+it, stalling every other wipe running at the time.
+
+Finally a --shards 2 run is resumed from a journal that stopped inside its
+verify pass, where the checkpoint holds one offset per shard, and the rest
+of each shard must again be out of the cache when readloop() is entered.
+
+    python3 bench/bench_evict.py --size 256M
+
+No root is needed for image files. Pass --device to check a real block
+device (or loop device) instead, which also exercises BLKFLSBUF; its
+contents are destroyed.
+'''
+import os
+import sys
+import argparse
+import tempfile
+import time
+from rich.console import Console
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import wiper  # noqa: E402
+
+
+def scratch(directory, size, fill=b"\xa5"):
+    '''Create a fully allocated scratch image and return its path.'''
+    fd_img, path = tempfile.mkstemp(prefix="owl_evict_", suffix=".img", dir=directory)
+    chunk = fill * (1 << 20)
+    for pos in range(0, size, len(chunk)):
+        os.write(fd_img, chunk[:size - pos])
+    os.close(fd_img)
+    return path
+
+
+def warm(fd, size, blocksize=1 << 20):
+    '''Read fd end to end so its pages are cached.'''
+    buf = bytearray(blocksize)
+    for pos in range(0, size, blocksize):
+        os.preadv(fd, [buf], pos)
+
+
+def main():
+    '''Run the passes with readloop instrumented and report cache residency.'''
+    parser = argparse.ArgumentParser(description="Page cache eviction check "
+        "for the wiper verify passes.")
+    parser.add_argument("--size", default="256M", help="image size (default: 256M)")
+    parser.add_argument("--blocksize", default="1M", help="block size (default: 1M)")
+    parser.add_argument("--dir", default=tempfile.gettempdir(),
+        help="directory for the scratch images")
+    parser.add_argument("--device", metavar="PATH",
+        help="check this block device instead of a scratch image (DESTROYS DATA)")
+    args = parser.parse_args()
+
+    size = wiper.parse_size(args.size)
+    blocksize = wiper.parse_size(args.blocksize)
+    wiper.console = Console(file=open(os.devnull, "w", encoding="utf-8"))
+
+    target = args.device or scratch(args.dir, size)
+    neighbour = scratch(args.dir, size, b"\x5a")
+    checks = []
+    try:
+        block = os.open(target, os.O_RDWR | os.O_SYNC)
+        devsize = os.lseek(block, 0, os.SEEK_END)
+        logical, physical = wiper.sector_sizes(block)
+        engine = wiper.IOEngine(name="buffered", logical_sector=logical,
+                                physical_sector=physical)
+        other = os.open(neighbour, os.O_RDONLY)
+        warm(other, size)
+
+        warm(block, devsize)
+        checks.append(("target cached after reading",
+                       wiper.resident_bytes(block, 0, devsize), "> 0"))
+        wiper.flushcaches(block, engine)
+        checks.append(("target cached after flushcaches",
+                       wiper.resident_bytes(block, 0, devsize), "== 0"))
+
+        # Fill the target's cache as a real run would, then instrument readloop
+        warm(block, devsize)
+        checks.append(("target cached before run",
+                       wiper.resident_bytes(block, 0, devsize), "> 0"))
+        readloop = wiper.readloop
+
+        label = "target cached at verify start"
+
+        def instrumented(fd, *rest, **kwargs):
+            checks.append((label, wiper.resident_bytes(fd, 0, devsize), "== 0"))
+            return readloop(fd, *rest, **kwargs)
+
+        wiper.readloop = instrumented
+        started = time.perf_counter()
+        wiper.runpasses(block, blocksize, devsize, wiper._ZERO_PASSES, None, engine)
+        elapsed = time.perf_counter() - started
+
+        checks.append(("neighbour still cached",
+                       wiper.resident_bytes(other, 0, size), "== size"))
+
+        # Resume a sharded run halfway through each shard of its verify pass
+        warm(block, devsize)
+        label = "cached at sharded verify resume"
+        fd_journal, journal_path = tempfile.mkstemp(prefix="owl_evict_", suffix=".json",
+                                                    dir=args.dir)
+        os.close(fd_journal)
+        try:
+            journal = wiper.Journal(journal_path, {
+                "passes": [wiper._pass_name(kind, pattern)
+                           for kind, pattern in wiper._ZERO_PASSES],
+                "pass": 1,
+                "offset": [(low + end) // 2 for low, end in wiper.shard_ranges(devsize, 2)],
+            })
+            sharded = wiper.IOEngine(name="buffered", logical_sector=logical,
+                                     physical_sector=physical, shards=2, journal=journal)
+            wiper.runpasses(block, blocksize, devsize, wiper._ZERO_PASSES, None, sharded)
+        finally:
+            os.remove(journal_path)
+        wiper.readloop = readloop
+        os.close(other)
+        os.close(block)
+    finally:
+        os.remove(neighbour)
+        if not args.device:
+            os.remove(target)
+
+    failed = False
+    for name, value, expect in checks:
+        if value is None:
+            ok = False
+        elif expect == "> 0":
+            ok = value > 0
+        elif expect == "== 0":
+            ok = value == 0
+        else:
+            ok = value == size
+        failed |= not ok
+        shown = "unknown" if value is None else f"{value:,}"
+        print(f"{name:<32} {shown:>16} bytes  (expect {expect}){'' if ok else '  FAIL'}")
+    print(f"zero + verify passes: {elapsed:.2f}s")
+    print("FAIL: cached pages survived the flush" if failed
+          else "OK: verify read from the media; other caches untouched")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2018-2026 J-Michael Roberts, Corvus Forensics LLC
+'''
+OWL shared link scheduling benchmark.
+
+Runs wiper's multi-device batch over several scratch targets that all sit
+behind one simulated shared link, once with every device running at once
+and once for each --link-streams cap given, and compares them. The batch
+is the real run_batch() in a child process, confirmed on its stdin; only
+two things are simulated there:
+
+  - shared_link() reports the same link for every target, as if they
+    were USB drives behind one hub;
+  - every read and write first waits its turn on the link, which moves
+    --link-mbps and pays --switch-ms whenever the request comes from a
+    different stream than the last one (a hub or expander switching
+    between drives, an HDD seeking).
+
+Running everything at once pays the switch on nearly every request, so
+aggregate throughput falls; a cap keeps each stream on the link for long
+runs. The ETA column is how far the remaining time a pass predicted at a
+quarter of the way differed from the time it then took, averaged over all
+passes.
+
+    python3 bench/bench_links.py --devices 4 --size 128M --streams 1 2
+
+Targets are image files by default; --target loop puts each on a loop
+device (root). Targets alternate between --size and twice that, so devices
+finish at different times.
+'''
+import os
+import sys
+import argparse
+import json
+import shutil
+import subprocess
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import wiper  # noqa: E402
+
+_WIPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# One batch behind the simulated link. The link's state lives in shared
+# memory created before run_batch() forks its device workers.
+_RUNNER = '''
+import multiprocessing, os, sys, threading, time
+sys.path.insert(0, sys.argv[1])
+import wiper
+
+rate, switch = float(sys.argv[2]) * 1024 * 1024, float(sys.argv[3]) / 1000
+free = multiprocessing.Value("d", 0.0)    # when the link is next idle
+owner = multiprocessing.Value("q", 0)     # the stream that used it last
+
+def link(length):
+    with free.get_lock():
+        start = max(time.monotonic(), free.value)
+        cost = length / rate
+        if owner.value != threading.get_native_id():
+            owner.value = threading.get_native_id()
+            cost += switch
+        free.value = done = start + cost
+    time.sleep(max(0.0, done - time.monotonic()))
+
+devpread, devpwrite = wiper.devpread, wiper.devpwrite
+
+def shared_read(block, buf, length, position, engine=None):
+    link(length)
+    return devpread(block, buf, length, position, engine)
+
+def shared_write(block, data, position, engine=None):
+    link(len(data))
+    return devpwrite(block, data, position, engine)
+
+wiper.devpread, wiper.devpwrite = shared_read, shared_write
+wiper.shared_link = lambda devname: "/sys/devices/simulated/usb1"
+sys.argv = ["wiper.py"] + sys.argv[4:]
+args = wiper.parse_arguments()
+wiper.set_progress(args)
+wiper.run_batch(args, wiper.resolve_targets(args.target))
+'''
+
+
+def command(cmd):
+    '''Run a setup command and return its stdout; RuntimeError if it fails.'''
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)}: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+def eta_error(events):
+    '''
+    Mean relative error of the remaining time each pass predicted once a
+    quarter done (at its average rate so far) against the time it took.
+    '''
+    errors = []
+    passes = {}
+    for event in events:
+        key = (event["device"], event.get("pass"))
+        if event["event"] == "start":
+            passes[key] = {"start": event["time"], "predicted": None}
+        elif event["event"] == "progress" and key in passes and event["total"]:
+            state = passes[key]
+            done = event["completed"] / event["total"]
+            if state["predicted"] is None and 0.25 <= done < 1:
+                elapsed = event["time"] - state["start"]
+                state["predicted"] = (event["time"], elapsed * (1 / done - 1))
+        elif event["event"] == "end" and key in passes and passes[key]["predicted"]:
+            at, predicted = passes.pop(key)["predicted"]
+            actual = event["time"] - at
+            if actual > 0:
+                errors.append(abs(predicted - actual) / actual)
+    return sum(errors) / len(errors) if errors else 0.0
+
+
+def run_batch(targets, streams, args, workdir):
+    '''Run one confirmed batch and summarise its JSON events.'''
+    cmd = [sys.executable, "-c", _RUNNER, _WIPER_DIR, str(args.link_mbps),
+           str(args.switch_ms), *targets, f"--{args.mode}", "--blocksize",
+           str(wiper.parse_size(args.blocksize)), "--progress", "json"]
+    if streams:
+        cmd += ["--link-streams", str(streams)]
+    proc = subprocess.run(cmd, cwd=workdir, input=f"WIPE {len(targets)} DEVICES\n",
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"batch failed (exit {proc.returncode}): "
+                           + " / ".join(proc.stderr.strip().splitlines()[-3:]))
+    events = [json.loads(line) for line in proc.stdout.splitlines() if line.startswith("{")]
+    began = min(event["time"] for event in events)
+    finished = {event["device"]: event["time"] - began
+                for event in events if event["event"] == "result"}
+    moved = sum(event["completed"] for event in events if event["event"] == "end")
+    wall = max(finished.values())
+    return {"wall": wall, "mbps": moved / wall / 1024 / 1024,
+            "eta": eta_error(events),
+            "finished": [finished[target] for target in targets]}
+
+
+def main():
+    '''Create the targets, run the batches and print the comparison.'''
+    parser = argparse.ArgumentParser(description="Batch throughput and ETA "
+        "accuracy behind one simulated shared link, with and without "
+        "--link-streams.")
+    parser.add_argument("--devices", type=int, default=4, help="targets (default: 4)")
+    parser.add_argument("--size", default="128M",
+        help="size of the smaller targets; the others are twice it (default: 128M)")
+    parser.add_argument("--blocksize", default="1M", help="block size (default: 1M)")
+    parser.add_argument("--mode", choices=("zero", "full"), default="zero")
+    parser.add_argument("--link-mbps", type=float, default=200.0, dest="link_mbps",
+        help="simulated link rate in MB/s (default: 200)")
+    parser.add_argument("--switch-ms", type=float, default=8.0, dest="switch_ms",
+        help="simulated cost of switching streams in ms (default: 8)")
+    parser.add_argument("--streams", type=int, nargs="+", default=[1],
+        help="--link-streams caps to compare with no cap (default: 1)")
+    parser.add_argument("--target", choices=("file", "loop"), default="file")
+    parser.add_argument("--dir", default=tempfile.gettempdir(),
+        help="directory for the scratch images")
+    args = parser.parse_args()
+
+    size = wiper.parse_size(args.size)
+    workdir = tempfile.mkdtemp(prefix="owl_links_", dir=args.dir)
+    targets, undo = [], []
+    try:
+        for index in range(args.devices):
+            path = os.path.join(workdir, f"drive{index}.img")
+            with open(path, "wb") as img:
+                img.truncate(size * (1 + index % 2))
+                os.posix_fallocate(img.fileno(), 0, size * (1 + index % 2))
+            if args.target == "loop":
+                path = command(["losetup", "--find", "--show", path])
+                undo.append(["losetup", "--detach", path])
+            targets.append(path)
+
+        print(f"{args.devices} {args.target} targets on one simulated "
+              f"{args.link_mbps:.0f} MB/s link, {args.switch_ms:g} ms per stream switch, "
+              f"--{args.mode}")
+        print(f"{'link streams':<14}{'wall s':>8}{'MB/s':>8}{'ETA error':>11}  finished (s)")
+        for streams in [0, *args.streams]:
+            result = run_batch(targets, streams, args, workdir)
+            label = str(streams) if streams else "unlimited"
+            print(f"{label:<14}{result['wall']:>8.1f}{result['mbps']:>8.0f}"
+                  f"{result['eta']:>11.0%}  "
+                  + " ".join(f"{seconds:.1f}" for seconds in result["finished"]))
+    finally:
+        for cmd in reversed(undo):
+            subprocess.run(cmd, capture_output=True)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
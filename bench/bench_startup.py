@@ -0,0 +1,138 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2018-2026 J-Michael Roberts, Corvus Forensics LLC
+'''
+OWL startup benchmark.
+
+Runs the short commands that scripts call most often — --help, --list and
+a --check of a small scratch image — under python -X importtime, and
+reports wall time, the time spent importing wiper and its dependencies,
+and which of the heavy stacks (reportlab, pypdf, rich, blkinfo) each
+command loaded. Those are imported where they are used, so:
+
+  - --help must load none of them;
+  - --list and --check must not load the PDF stack (reportlab, pypdf),
+    which only --report needs.
+
+The exit status is 1 if either rule is broken.
+
+    python3 bench/bench_startup.py --repeat 10
+    git show HEAD~1:wiper.py > /tmp/wiper_old.py
+    python3 bench/bench_startup.py --baseline /tmp/wiper_old.py
+
+--baseline times another copy of wiper.py the same way, for a before and
+after comparison; the rules are only checked against this tree's copy.
+'''
+import os
+import sys
+import argparse
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import wiper  # noqa: E402
+
+_WIPER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "wiper.py")
+
+_HEAVY = ("reportlab", "pypdf", "rich", "blkinfo")
+
+# The stacks each command may not load.
+_FORBIDDEN = {
+    "--help": _HEAVY,
+    "--list": ("reportlab", "pypdf"),
+    "--check": ("reportlab", "pypdf"),
+}
+
+
+def importtime(stderr):
+    '''
+    Parse -X importtime output into (packages, microseconds): the top-level
+    packages imported and the summed cumulative time of the outermost
+    imports: the interpreter's startup modules and the script's own.
+    '''
+    packages = set()
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line.split("|", 2)
+        if not cumulative.strip().isdigit():
+            continue
+        packages.add(name.strip().split(".")[0])
+        if not name[1:].startswith(" "):
+            total += int(cumulative)
+    return packages, total
+
+
+def run(script, args, repeat, workdir):
+    '''Time one command; returns (median wall s, median import ms, packages).'''
+    walls, imports = [], []
+    packages = set()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", script, *args],
+                              cwd=workdir, stdin=subprocess.DEVNULL,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                              text=True)
+        walls.append(time.perf_counter() - start)
+        if proc.returncode != 0:
+            raise RuntimeError(f"{os.path.basename(script)} {' '.join(args)} "
+                               f"exited {proc.returncode}")
+        packages, micros = importtime(proc.stderr)
+        imports.append(micros / 1000)
+    return statistics.median(walls), statistics.median(imports), packages
+
+
+def main():
+    '''Create the scratch image, time each command and check what it loaded.'''
+    parser = argparse.ArgumentParser(description="Wall and import time of "
+        "--help, --list and --check, and which heavy dependencies each loads.")
+    parser.add_argument("--repeat", type=int, default=5,
+        help="runs per command; medians are reported (default: 5)")
+    parser.add_argument("--size", default="16M",
+        help="size of the image --check reads (default: 16M)")
+    parser.add_argument("--baseline", metavar="WIPER_PY",
+        help="another copy of wiper.py to time for comparison")
+    parser.add_argument("--dir", default=tempfile.gettempdir(),
+        help="directory for the scratch image and logs")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="owl_startup_", dir=args.dir)
+    failures = []
+    try:
+        image = os.path.join(workdir, "check.img")
+        with open(image, "wb") as img:
+            img.truncate(wiper.parse_size(args.size))
+        commands = {
+            "--help": ["--help"],
+            "--list": ["--list"],
+            "--check": ["--check", "-l", workdir, image],
+        }
+        scripts = [("this tree", _WIPER)]
+        if args.baseline:
+            scripts.insert(0, ("baseline", os.path.abspath(args.baseline)))
+
+        print(f"{sys.executable} -X importtime, median of {args.repeat} runs")
+        print(f"{'command':<10}{'wiper.py':<11}{'wall s':>8}{'import ms':>11}  heavy stacks loaded")
+        for command, argv in commands.items():
+            for label, script in scripts:
+                wall, imported, packages = run(script, argv, args.repeat, workdir)
+                loaded = [name for name in _HEAVY if name in packages]
+                print(f"{command:<10}{label:<11}{wall:>8.3f}{imported:>11.1f}  "
+                      + (", ".join(loaded) or "none"))
+                if script == _WIPER:
+                    failures += [f"{command} loaded {name}"
+                                 for name in _FORBIDDEN[command] if name in packages]
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+# SPDX-License-Identifier: MIT
+# Copyright (c) 2018-2026 J-Michael Roberts, Corvus Forensics LLC
+'''
+OWL benchmark suite.
+
+Runs every selected wipe and check mode over a matrix of block sizes,
+engines and queue depths on scratch targets, and writes one JSON document
+with, for each run: MB/s per pass and overall, wall and CPU time, read and
+write syscall counts, and peak RSS. Each run is a separate process that
+goes through wiper's own prepare_device() and run_job() with the
+confirmation already given (the path a confirmed batch takes), so no
+prompt is shown and nothing is mocked.
+
+Targets:
+  sparse   a sparse image file (holes read as zeros without I/O)
+  file     a fully allocated image file
+  loop     a loop device over an allocated image (root)
+  delay    a device-mapper "delay" target over that loop device, adding
+           --delay-ms to every request, for slow-disk behaviour (root)
+
+    python3 bench/bench_suite.py --size 1G --output base.json
+    python3 bench/bench_suite.py --size 1G --output new.json --compare base.json
+
+--compare matches runs by target, mode, block size, engine and queue depth
+and flags a regression when MB/s drops, or CPU time or peak RSS grows, by
+more than --threshold percent; the exit status is then 1. With --current
+it compares two stored result files without running anything.
+'''
+import os
+import sys
+import argparse
+import datetime
+import json
+import platform
+import shutil
+import subprocess
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import wiper  # noqa: E402
+
+_WIPER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_MODE_FLAGS = {"zero": ["--zero"], "full": ["--full"], "smart": ["--smart"],
+               "check": ["--check"], "window": ["--full", "--window", "256M"]}
+
+# One benchmark run: a confirmed job for a single target, with the
+# process's read/write syscall counters saved as it exits
+_RUNNER = '''
+import atexit, sys
+sys.path.insert(0, sys.argv[1])
+import wiper
+
+def save_io(path=sys.argv[2]):
+    with open("/proc/self/io", encoding="utf-8") as src, open(path, "w") as dst:
+        dst.write(src.read())
+
+atexit.register(save_io)
+sys.argv = ["wiper.py"] + sys.argv[3:]
+args = wiper.parse_arguments()
+wiper.set_progress(args)
+job = wiper.prepare_device(args, args.target[0], None)
+wiper.run_job(args, job, confirmed=True)
+'''
+
+
+def command(cmd):
+    '''Run a setup command and return its stdout; RuntimeError if it fails.'''
+    result = subprocess.run(cmd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)}: {result.stderr.strip()}")
+    return result.stdout.strip()
+
+
+class Targets:
+    '''
+    Creates the scratch targets on first use and removes them all on exit:
+    images in a temporary directory, the loop device and the delay map.
+    '''
+    def __init__(self, directory, size, delay_ms):
+        self.size     = size
+        self.delay_ms = delay_ms
+        self.workdir  = tempfile.mkdtemp(prefix="owl_bench_", dir=directory)
+        self.made     = {}
+        self.undo     = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        for cmd in reversed(self.undo):
+            subprocess.run(cmd, capture_output=True)
+        shutil.rmtree(self.workdir, ignore_errors=True)
+        return False
+
+    def image(self, name, allocate):
+        '''An image of self.size bytes, preallocated or left sparse.'''
+        path = os.path.join(self.workdir, f"{name}.img")
+        with open(path, "wb") as img:
+            img.truncate(self.size)
+            if allocate:
+                os.posix_fallocate(img.fileno(), 0, self.size)
+        return path
+
+    def get(self, kind):
+        '''The path of target kind, creating it if needed.'''
+        if kind not in self.made:
+            if kind == "sparse":
+                self.made[kind] = self.image("sparse", False)
+            elif kind == "file":
+                self.made[kind] = self.image("file", True)
+            elif kind == "loop":
+                node = command(["losetup", "--find", "--show", self.image("loop", True)])
+                self.undo.append(["losetup", "--detach", node])
+                self.made[kind] = node
+            elif kind == "delay":
+                loop = self.get("loop")
+                sectors = self.size // 512
+                name = f"owl_bench_delay_{os.getpid()}"
+                command(["dmsetup", "create", name, "--table",
+                         f"0 {sectors} delay {loop} 0 {self.delay_ms}"])
+                self.undo.append(["dmsetup", "remove", name])
+                self.made[kind] = f"/dev/mapper/{name}"
+        return self.made[kind]
+
+
+def run_one(target, mode, blocksize, engine, queue_depth, workdir):
+    '''
+    Run one confirmed wiper job in a child process and measure it. The
+    child writes --progress json events to stdout; the "end" event of
+    each pass carries its MB/s.
+    '''
+    iofile = os.path.join(workdir, "io.txt")
+    cmd = [sys.executable, "-c", _RUNNER, _WIPER_DIR, iofile, target,
+           *_MODE_FLAGS[mode], "--blocksize", str(wiper.parse_size(blocksize)), "--engine", engine,
+           "--queue-depth", str(queue_depth), "--progress", "json"]
+    with tempfile.TemporaryFile(dir=workdir) as errors:
+        started = time.monotonic()
+        proc = subprocess.Popen(cmd, cwd=workdir, stdin=subprocess.PIPE,
+                                stdout=subprocess.PIPE, stderr=errors, text=True)
+        # "y" answers the map's "Continue mapping?" should a target be dirty
+        proc.stdin.write("y\n")
+        proc.stdin.close()
+        events = proc.stdout.read()
+        _, status, usage = os.wait4(proc.pid, 0)
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        wall = time.monotonic() - started
+        errors.seek(0)
+        stderr = errors.read().decode(errors="replace")
+
+    passes = []
+    for line in events.splitlines():
+        try:
+            event = json.loads(line)
+        except ValueError:
+            continue
+        if event.get("event") == "end":
+            passes.append({"pass": event["pass"], "bytes": event["completed"],
+                           "mbps": event.get("mbps", 0.0)})
+    counters = {}
+    if os.path.exists(iofile):
+        with open(iofile, encoding="utf-8") as io_counts:
+            counters = dict((key, int(value)) for key, value in
+                            (line.split(":") for line in io_counts if ":" in line))
+        os.remove(iofile)
+
+    moved = sum(p["bytes"] for p in passes)
+    seconds = sum(p["bytes"] / p["mbps"] / 1024 / 1024 for p in passes if p["mbps"])
+    result = {
+        "target": None, "mode": mode, "blocksize": blocksize, "engine": engine,
+        "queue_depth": queue_depth,
+        "status": proc.returncode,
+        "mbps": round(moved / seconds / 1024 / 1024, 2) if seconds else 0.0,
+        "passes": passes,
+        "wall_s": round(wall, 3),
+        "cpu_user_s": round(usage.ru_utime, 3),
+        "cpu_sys_s": round(usage.ru_stime, 3),
+        "read_syscalls": counters.get("syscr"),
+        "write_syscalls": counters.get("syscw"),
+        "peak_rss_bytes": usage.ru_maxrss * 1024,
+    }
+    if proc.returncode != 0:
+        result["error"] = stderr.strip().splitlines()[-5:]
+    return result
+
+
+def metadata(args):
+    '''Where and what was measured, stored with the results.'''
+    try:
+        commit = command(["git", "-C", _WIPER_DIR, "rev-parse", "--short", "HEAD"])
+    except (RuntimeError, OSError):
+        commit = ""
+    return {
+        "date": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "host": platform.node(),
+        "kernel": platform.release(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "commit": commit,
+        "size": wiper.parse_size(args.size),
+        "delay_ms": args.delay_ms,
+    }
+
+
+def _key(run):
+    return (run["target"], run["mode"], run["blocksize"], run["engine"], run["queue_depth"])
+
+
+def _split(text):
+    '''Items of a comma-separated option.'''
+    return [item.strip() for item in text.split(",") if item.strip()]
+
+
+def compare(baseline, current, threshold, out=sys.stdout):
+    '''
+    Print every run found in both documents with its change against the
+    baseline, and return the number of regressions: MB/s down, or CPU
+    time or peak RSS up, by more than threshold percent.
+    '''
+    base = {_key(run): run for run in baseline["runs"] if run["status"] == 0}
+    regressions = 0
+    print(f"{'target':<8}{'mode':<7}{'block':>6}{'engine':>10}{'qd':>4}"
+          f"{'MB/s':>10}{'Δ':>8}{'CPU s':>9}{'Δ':>8}{'RSS MiB':>9}{'Δ':>8}", file=out)
+    for run in current["runs"]:
+        old = base.get(_key(run))
+        if old is None or run["status"] != 0:
+            continue
+        cpu_old = old["cpu_user_s"] + old["cpu_sys_s"]
+        cpu_new = run["cpu_user_s"] + run["cpu_sys_s"]
+        changes = [
+            (run["mbps"] - old["mbps"]) / old["mbps"] * 100 if old["mbps"] else 0.0,
+            (cpu_new - cpu_old) / cpu_old * 100 if cpu_old else 0.0,
+            (run["peak_rss_bytes"] - old["peak_rss_bytes"]) / old["peak_rss_bytes"] * 100,
+        ]
+        flagged = (changes[0] < -threshold or changes[1] > threshold
+                   or changes[2] > threshold)
+        regressions += flagged
+        print(f"{run['target']:<8}{run['mode']:<7}{run['blocksize']:>6}{run['engine']:>10}"
+              f"{run['queue_depth']:>4}{run['mbps']:>10.1f}{changes[0]:>+7.1f}%"
+              f"{cpu_new:>9.2f}{changes[1]:>+7.1f}%"
+              f"{run['peak_rss_bytes'] / 1024 / 1024:>9.1f}{changes[2]:>+7.1f}%"
+              + ("  REGRESSION" if flagged else ""), file=out)
+    missing = len(base) - sum(_key(run) in base for run in current["runs"])
+    if missing:
+        print(f"{missing} baseline runs have no counterpart in this run.", file=out)
+    return regressions
+
+
+def main():
+    '''Run the matrix, write the results, and optionally compare them.'''
+    parser = argparse.ArgumentParser(description="Benchmark wiper's modes over "
+        "scratch targets and compare against a baseline.")
+    parser.add_argument("--size", default="1G", help="target size (default: 1G)")
+    parser.add_argument("--targets", default="file",
+        help="comma-separated: sparse, file, loop, delay (default: file)")
+    parser.add_argument("--modes", default="zero,full,smart,check",
+        help=f"comma-separated: {', '.join(_MODE_FLAGS)} (default: zero,full,smart,check)")
+    parser.add_argument("--blocksizes", default="64K,1M,8M",
+        help="comma-separated -b values (default: 64K,1M,8M)")
+    parser.add_argument("--engines", default="buffered,direct",
+        help="comma-separated (default: buffered,direct)")
+    parser.add_argument("--queue-depths", default="1", dest="queue_depths",
+        help="comma-separated (default: 1)")
+    parser.add_argument("--repeat", type=int, default=1,
+        help="runs per combination; the one with the median MB/s is kept")
+    parser.add_argument("--delay-ms", type=int, default=2, dest="delay_ms",
+        help="per-request delay of the 'delay' target (default: 2)")
+    parser.add_argument("--dir", default=tempfile.gettempdir(),
+        help="directory for scratch images")
+    parser.add_argument("--output", metavar="FILE", help="write results JSON here "
+        "(default: stdout)")
+    parser.add_argument("--compare", metavar="BASELINE",
+        help="flag regressions against this stored results file")
+    parser.add_argument("--current", metavar="FILE",
+        help="with --compare: compare this stored file instead of running")
+    parser.add_argument("--threshold", type=float, default=10.0,
+        help="regression threshold in percent (default: 10)")
+    args = parser.parse_args()
+
+    if args.current:
+        if not args.compare:
+            parser.error("--current needs --compare")
+        with open(args.compare, encoding="utf-8") as base, \
+                open(args.current, encoding="utf-8") as cur:
+            sys.exit(1 if compare(json.load(base), json.load(cur), args.threshold) else 0)
+
+    document = {"meta": metadata(args), "runs": []}
+    with Targets(args.dir, wiper.parse_size(args.size), args.delay_ms) as targets:
+        for kind in _split(args.targets):
+            try:
+                target = targets.get(kind)
+            except (RuntimeError, OSError) as exc:
+                print(f"Skipping target {kind}: {str(exc).splitlines()[0]}", file=sys.stderr)
+                continue
+            for blocksize in _split(args.blocksizes):
+                for engine in _split(args.engines):
+                    for depth in _split(args.queue_depths):
+                        for mode in _split(args.modes):
+                            runs = [run_one(target, mode, blocksize, engine, int(depth),
+                                            targets.workdir)
+                                    for _ in range(max(1, args.repeat))]
+                            runs.sort(key=lambda run: run["mbps"])
+                            result = runs[len(runs) // 2]
+                            result["target"] = kind
+                            if len(runs) > 1:
+                                result["mbps_runs"] = [run["mbps"] for run in runs]
+                            document["runs"].append(result)
+                            print(f"{kind:<7}{mode:<7}{blocksize:>5} {engine:<9}qd {depth:<3}"
+                                  f"{result['mbps']:>9.1f} MB/s"
+                                  + ("" if result["status"] == 0
+                                     else f"  FAILED ({result['status']})"),
+                                  file=sys.stderr)
+
+    text = json.dumps(document, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as out:
+            out.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as base:
+            # Keep stdout pure JSON when the results went there
+            regressions = compare(json.load(base), document, args.threshold,
+                                  sys.stdout if args.output else sys.stderr)
+        sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
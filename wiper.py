@@ -13,6 +13,8 @@ forensic drive wiper program by Corvus Forensics LLC
 designed to wipe, verify, optional logging, and paperwork generator
 '''
 import os
+import stat
+import errno
 import sys
 import signal
 import argparse
@@ -24,27 +26,77 @@ import subprocess
 import atexit
 import socket
 import secrets
-from dataclasses import dataclass, field
+import mmap
+import fcntl
+import struct
+import hashlib
+import csv
+import collections
+import glob
+import queue
+import threading
+import multiprocessing
+import socketserver
+import contextlib
+import io
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED, FIRST_EXCEPTION
+from dataclasses import dataclass, field, asdict
 from typing import Optional
-from blkinfo import BlkDiskInfo
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, HRFlowable,
-    Table as RLTable, TableStyle as RLTableStyle, KeepTogether)
-from pypdf import PdfReader, PdfWriter
-from rich.console import Console
-from rich.progress import (
-    Progress, BarColumn, TextColumn, TimeRemainingColumn,
-    TransferSpeedColumn, TaskProgressColumn,
-)
-from rich.panel import Panel
-from rich.table import Table
-from rich.text import Text
-from rich import box
-
-console = Console(highlight=False)
+
+# blkinfo, reportlab, pypdf and rich are imported where they are used, so
+# --help, --list and a --check without --report load only what they need.
+# See bench/bench_startup.py.
+
+
+class _LazyConsole:
+    '''
+    Stands in for the rich console until something is first printed, so
+    --help and argument errors never import rich. The first attribute
+    looked up installs the real Console as the module's console; anything
+    still holding this placeholder is forwarded to whatever console is
+    current.
+    '''
+    def __getattr__(self, name):
+        global console
+        if console is self:
+            from rich.console import Console
+            console = Console(highlight=False)
+        return getattr(console, name)
+
+
+console = _LazyConsole()
+
+# Set only inside batch worker processes (see run_batch): progress and log
+# messages are forwarded to the parent's combined table on this queue
+# instead of being drawn on this process's terminal.
+_batch_events = None
+_batch_device = None
+
+# Minimum seconds between progress messages a batch worker sends upstream
+_BATCH_UPDATE_INTERVAL = 0.25
+
+# --blocksize auto results by (device, size, engine, queue depth). Only a
+# --serve service lives long enough to reuse them: its jobs fork with the
+# cache and report new results back to it.
+_probe_cache = {}
+
+# --serve: log and state events kept per job for clients that start
+# watching late (progress keeps only the latest), and the seconds a
+# cancelled job gets to reach a checkpoint when the service stops
+_SERVE_HISTORY = 1000
+_SERVE_STOP_TIMEOUT = 30
+
+# Progress sink selected by --progress / --quiet ("rich", "json" or
+# "quiet"), the stream JSON events go to, and the device they describe
+_PROGRESS_MODES = ("rich", "json")
+_progress_mode = "rich"
+_progress_stream = None
+_progress_device = None
+
+# Progress events per pass are limited to one every _PROGRESS_INTERVAL
+# seconds (10 Hz); the clock is only checked every _PROGRESS_STEP bytes
+_PROGRESS_INTERVAL = 0.1
+_PROGRESS_STEP = 4 * 1024 * 1024
 
 
 @dataclass
@@ -85,10 +137,375 @@ class WipeRecord:
     # Wipe standard compliance
     wipe_standard: str  = ""
 
+    # I/O engine used for the software passes
+    engine: str         = "buffered"
+
+    # Checkpoint journal: one entry per --resume of an interrupted run
+    resume_events: list = field(default_factory=list)
 
-def generate_certificate(record: WipeRecord, report_path: str, logfile):
+    # --check --sample: how the sample was drawn and what it estimated
+    sampling: str       = ""
+
+    # --tolerate-bad: sectors that could not be written or read back, as
+    # (first LBA, last LBA) pairs. Any entry means the wipe is not fully verified.
+    bad_extents: list   = field(default_factory=list)
+
+    # --digest: one summary (algorithm, root hash, regions) per verify pass
+    digests: list       = field(default_factory=list)
+
+    # Per-pass request latency and device counters, as PassStats.summary()
+    # dicts; listed in a certificate appendix with --io-appendix
+    io_stats: list      = field(default_factory=list)
+
+    # Verify pass region profiles, as RegionProfile.summary() dicts; drawn
+    # as a heatmap on the certificate and written to the profile CSV
+    profiles: list      = field(default_factory=list)
+
+    # --random: the keystream, its seed, and the random passes' throughput
+    random_data: str    = ""
+
+    # How 0x00 was written: host writes, BLKZEROOUT offload, or both
+    zero_path: str      = ""
+
+    # How the block size was chosen ("default", "manual" or "auto") and,
+    # for --blocksize auto, the probe results as (size, MB/s) pairs
+    blocksize_source: str = "default"
+    blocksize_probe: list = field(default_factory=list)
+
+
+@dataclass
+class WipeJob:
+    '''
+    One target device, prepared up to the confirmation prompt: the open
+    descriptor, geometry, I/O engine, hardware pre-flight results and the
+    record that becomes its certificate. Built by prepare_device() and
+    consumed by run_job(), either in this process or in a batch worker.
+    '''
+    devname: str
+    logfile: Optional[str]
+    mode: str
+    block: int
+    devsize: int
+    blocksize: int
+    engine: "IOEngine"
+    record: WipeRecord
+    hw_info: object     = None
+    actual_op: str      = ""
+    window: int         = 0
+    sample: int         = 0
+    confidence: float   = 0.95
+    report_path: str    = ""
+    passes: tuple       = ()
+
+
+# Linux block device ioctls (linux/fs.h)
+_BLKSSZGET  = 0x1268   # logical sector size (int)
+_BLKPBSZGET = 0x127b   # physical sector size (unsigned int)
+_BLKFLSBUF  = 0x1261   # flush and invalidate the block device buffer cache
+_BLKZEROOUT = 0x127f   # zero a byte range: uint64 {start, length}
+
+# Bytes per BLKZEROOUT request: the unit of progress, checkpointing and
+# fallback to host writes when the device rejects a range
+_ZEROOUT_CHUNK = 256 * 1024 * 1024
+
+# Engines accepted by --engine
+_ENGINES = ("buffered", "direct")
+
+# Block size when -b is not given
+_DEFAULT_BLOCKSIZE = 4096 * 256  # 1 MiB
+
+# --blocksize auto: sysfs queue limits read, and the read-only probe budget
+# per candidate size (whichever of bytes or seconds runs out first)
+_QUEUE_LIMITS = ("logical_block_size", "physical_block_size",
+                 "optimal_io_size", "max_sectors_kb")
+
+# A PCI function in a sysfs device path (domain:bus:device.function), and
+# the USB root hubs and SCSI/ATA hosts that shared_link() looks for
+_PCI_ADDRESS = re.compile(r"[0-9a-f]{4}:[0-9a-f]{2}:[0-9a-f]{2}\.[0-7]")
+_USB_ROOT_HUB = re.compile(r"usb\d+")
+_STORAGE_HOST = re.compile(r"(host|ata)\d+")
+_PROBE_BYTES = 64 * 1024 * 1024
+_PROBE_SECONDS = 0.5
+_PROBE_MAX_BLOCK = 16 * 1024 * 1024
+
+# --tolerate-bad extents listed on the certificate; the log has them all
+_CERT_BAD_EXTENTS = 20
+
+# Seconds between checkpoint journal updates during a pass
+_JOURNAL_INTERVAL = 10.0
+
+# Repeating --plan patterns must divide this many bytes, so every sector —
+# and so every block, rewrite and bisection probe — starts the pattern afresh
+_PATTERN_PERIOD = 512
+
+
+@dataclass(frozen=True)
+class PassStep:
+    '''
+    One step of a pass plan: write pattern over the whole device — hex
+    bytes repeated end to end ("00", "AA", "DEADBEEF"; the length must
+    divide _PATTERN_PERIOD) or "random" for the --random keystream — then
+    optionally flush the device and verify the pattern.
+    '''
+    pattern: str
+    verify: bool = True
+    flush: bool  = False
+
+
+@dataclass(frozen=True)
+class PassPlan:
+    '''
+    A declarative wipe scheme: the name --plan knows it by, the operation
+    label and classification for the certificate, and its steps in order.
+    passes() expands the steps into the (kind, pattern) sequence that
+    runpasses() executes and the checkpoint journal indexes into.
+    '''
+    name: str
+    operation: str
+    standard: str
+    steps: tuple
+
+    def passes(self):
+        '''The plan as (kind, pattern) passes: write, then flush and verify as asked.'''
+        passes = []
+        for step in self.steps:
+            passes.append(("write", step.pattern))
+            if step.flush:
+                passes.append(("flush", step.pattern))
+            if step.verify:
+                passes.append(("verify", step.pattern))
+        return tuple(passes)
+
+
+# Built-in pass plans. full, zero and random are the --full, --zero and
+# --random operations; the rest are only reachable through --plan.
+_PASS_PLANS = {plan.name: plan for plan in (
+    PassPlan("full", "Full Double Wipe + Verify (FF then 00)",
+             "Two-pass overwrite (0xFF / 0x00) with verification — meets NIST SP 800-88r2 Clear; designed for stuck-bit detection",
+             (PassStep("FF"), PassStep("00"))),
+    PassPlan("zero", "Single-Pass Zero + Verify",
+             "NIST SP 800-88r2 — Clear",
+             (PassStep("00"),)),
+    PassPlan("random", "Random Data + Zero Wipe + Verify",
+             "Two-pass overwrite (random / 0x00) with verification — meets NIST SP 800-88r2 Clear; random pass defeats compressing and deduplicating controllers",
+             (PassStep("random"), PassStep("00"))),
+    PassPlan("checkerboard", "Checkerboard Wipe + Verify (AA, 55, then 00)",
+             "Three-pass overwrite (0xAA / 0x55 / 0x00) with verification — meets NIST SP 800-88r2 Clear; alternating bits exercise adjacent cells both ways",
+             (PassStep("AA"), PassStep("55"), PassStep("00"))),
+    PassPlan("dod", "Three-Pass Wipe (00, FF, random; final pass verified)",
+             "DoD 5220.22-M style three-pass overwrite (0x00 / 0xFF / random, final pass verified) — meets NIST SP 800-88r2 Clear",
+             (PassStep("00", verify=False), PassStep("FF", verify=False),
+              PassStep("random"))),
+)}
+
+# Software pass sequences as (kind, pattern). Shared by the pass drivers and
+# the checkpoint journal, which records progress as an index into them.
+_FULL_PASSES  = _PASS_PLANS["full"].passes()
+_ZERO_PASSES  = _PASS_PLANS["zero"].passes()
+_SMART_PASSES = (("smart", "00"),)
+_RANDOM_PASSES = _PASS_PLANS["random"].passes()
+_WINDOW_PASSES = (("window", "FF/00"),)
+# Modes that never write: no confirmation prompt, no SMART capture
+_READ_ONLY_MODES = ("check", "sample")
+
+_MODE_PASSES  = {"full": _FULL_PASSES, "zero": _ZERO_PASSES, "smart": _SMART_PASSES,
+                 "window": _WINDOW_PASSES, "random": _RANDOM_PASSES}
+
+# Binary multipliers accepted by parse_size()
+_SIZE_UNITS = {'K': 1024, 'M': 1024 ** 2, 'G': 1024 ** 3, 'T': 1024 ** 4}
+
+# Minimum buffers in the readahead ring: one being verified, one being read,
+# one spare. Grows to queue depth + 2 when more requests are kept in flight.
+_READAHEAD_DEPTH = 3
+
+# --digest: verify passes hash what they read in regions of this size, plus
+# a root hash over the region hashes. Copies queued for the hashing worker
+# per stream (each one block): enough to ride out a slow hash update.
+_DIGEST_REGION = 1024 ** 3
+_DIGEST_DEPTH = 4
+_DIGESTS = ("blake2b", "sha256")
+
+# --random: the keystream is SHAKE-128 keyed by the run's seed (of
+# _KEYSTREAM_SEED random bytes unless --seed gives one) and the index of
+# each _KEYSTREAM_CHUNK of the device, so any byte range can be regenerated
+# from its offset alone. Up to _KEYSTREAM_WORKERS processes generate ahead
+# of the write and verify loops.
+_KEYSTREAM_CHUNK = 64 * 1024
+_KEYSTREAM_SEED = 32
+_KEYSTREAM_WORKERS = 8
+
+# --shards: shard boundaries fall on this alignment whatever the block size,
+# so a resumed run splits the device exactly as the interrupted one did.
+# With --digest they fall on _DIGEST_REGION instead, so no region is split
+# between two shards; the journal records which was used.
+_SHARD_ALIGN = 1024 * 1024
+
+# Per-pass I/O statistics: request latencies go into log-spaced buckets,
+# _LATENCY_STEPS per doubling from 1 µs (about 19% wide, so a percentile is
+# reported to within a bucket) up to _LATENCY_BUCKETS; the device's sysfs
+# stat counters are sampled every _IOSTAT_INTERVAL seconds.
+_LATENCY_STEPS = 4
+_LATENCY_BUCKETS = 160
+_IOSTAT_INTERVAL = 1.0
+
+# Verify passes profile throughput and latency in this many equal regions
+# (0.1% of capacity each), fewer on small devices so every region still
+# averages _PROFILE_BLOCKS reads; a run of regions slower than _SLOW_ZONE
+# of the pass's median MB/s is a slow zone
+_PROFILE_REGIONS = 1000
+_PROFILE_BLOCKS = 16
+_SLOW_ZONE = 0.5
+
+
+@dataclass
+class IOEngine:
+    '''
+    Describes how the pass loops reach the device. Built once in main()
+    from --engine and the device's sector geometry, then handed to every
+    loop so they all issue I/O the same way.
+
+      buffered -> O_SYNC descriptor through the page cache (historic default)
+      direct   -> O_DIRECT descriptor, page-aligned buffers, sector-aligned
+                  lengths; an unaligned tail (image files only) goes through
+                  tailfd, a second buffered descriptor on the same target
+
+    queue_depth is the number of positional requests kept in flight by the
+    worker pools in readahead() and writebehind(). journal, when set, is
+    checkpointed by the pass loops as their watermark advances.
+
+    zeroout (--offload) makes 0x00 write passes ask the kernel to zero
+    ranges with BLKZEROOUT; the bytes zeroed each way are tallied in
+    zeroed_offload and zeroed_host for the certificate. zeroout is cleared
+    once the ioctl proves unavailable; offload records that --offload was
+    given, which is what decides whether the tally is reported at all.
+
+    tolerate_bad (--tolerate-bad) makes a block that fails to write or
+    verify get bisected down to its bad logical sectors instead of ending
+    the run; the failing byte ranges accumulate, merged, in bad_extents.
+
+    shards (--shards) splits every pass into that many disjoint ranges,
+    each streamed by its own worker; see streams(). The ranges start on
+    shard_align boundaries, and shards is the number the device really
+    gets, which a small device may bring below the number asked for.
+
+    digest (--digest) names the hash the verify passes run over the data
+    they read back; each pass appends its summary line to digests.
+
+    latency, while a pass runs under PassStats, is the LatencyHistogram
+    devpread() and devpwrite() time every request into; statpath is the
+    device's sysfs stat file ("" for image files) sampled alongside, and
+    iostats collects each pass's summary.
+
+    profile, while readloop() runs, is the RegionProfile devpread() also
+    records each read into; the finished profiles collect in profiles.
+
+    keystream (--random) regenerates the data of the "random" passes.
+    '''
+    name: str             = "buffered"
+    logical_sector: int   = 512
+    physical_sector: int  = 512
+    tailfd: Optional[int] = None
+    queue_depth: int      = 1
+    journal: Optional["Journal"] = None
+    zeroout: bool         = False
+    offload: bool         = False
+    zeroed_offload: int   = 0
+    zeroed_host: int      = 0
+    tolerate_bad: bool    = False
+    bad_extents: list     = field(default_factory=list)
+    shards: int           = 1
+    shard_align: int      = _SHARD_ALIGN
+    digest: str           = ""
+    digests: list         = field(default_factory=list)
+    latency: Optional["LatencyHistogram"] = None
+    statpath: str         = ""
+    iostats: list         = field(default_factory=list)
+    profile: Optional["RegionProfile"] = None
+    profiles: list        = field(default_factory=list)
+    keystream: Optional["Keystream"] = None
+
+
+# Guards the IOEngine tallies, which --shards workers update concurrently
+_engine_lock = threading.Lock()
+
+
+def _heat_color(ratio):
+    '''
+    Heatmap colour for a region running at ratio (0-1) of the pass median:
+    green at 90% or better, through amber, to red at half speed or worse.
+    '''
+    from reportlab.lib import colors
+    green, amber, red = (colors.HexColor("#1a7a1a"), colors.HexColor("#b36b00"),
+                         colors.HexColor("#c0392b"))
+    if ratio >= 0.9:
+        return green
+    if ratio >= 0.7:
+        return colors.linearlyInterpolatedColor(amber, green, 0.7, 0.9, ratio)
+    if ratio > _SLOW_ZONE:
+        return colors.linearlyInterpolatedColor(red, amber, _SLOW_ZONE, 0.7, ratio)
+    return red
+
+
+def profile_heatmap(profiles, width):
+    '''
+    Draw verify pass region profiles as a heatmap width points wide: two
+    strips per pass, read throughput and mean latency, each region coloured
+    by how it compares with the pass's median (see _heat_color). Runs of
+    regions with the same colour are drawn as one rectangle.
+    '''
+    from reportlab.lib import colors
+    from reportlab.graphics.shapes import Drawing, Rect, String
+
+    def scaled(values, faster):
+        '''Each value as a fraction of the median speed, None where empty.'''
+        measured = sorted(value for value in values if value is not None)
+        median = measured[len(measured) // 2] if measured else 0.0
+        ratios = []
+        for value in values:
+            if value is None:
+                ratios.append(None)
+            elif not median or not value:
+                ratios.append(1.0)
+            else:
+                ratios.append(min(1.0, value / median if faster else median / value))
+        return ratios
+
+    label_width, strip, gap = 90, 11, 3
+    rows = []
+    for summary in profiles:
+        rows.append((f"{summary['pass']} MB/s", scaled(summary["mbps"], True)))
+        rows.append(("latency", scaled(summary["latency"], False)))
+    height = len(rows) * (strip + gap) + 10
+    drawing = Drawing(width, height)
+    span = width - label_width
+    for row, (label, ratios) in enumerate(rows):
+        y = height - (row + 1) * (strip + gap)
+        drawing.add(String(0, y + 3, label, fontName="Helvetica", fontSize=7,
+                           fillColor=colors.HexColor("#444444")))
+        run = 0
+        for index in range(1, len(ratios) + 1):
+            if index < len(ratios) and (ratios[index] is None) == (ratios[run] is None) and (
+                    ratios[run] is None or round(ratios[index] * 20) == round(ratios[run] * 20)):
+                continue
+            fill = (colors.HexColor("#dddddd") if ratios[run] is None
+                    else _heat_color(ratios[run]))
+            drawing.add(Rect(label_width + span * run / len(ratios), y,
+                             span * (index - run) / len(ratios), strip,
+                             fillColor=fill, strokeColor=None))
+            run = index
+    for text, x, anchor in (("0%", label_width, "start"),
+                            ("50%", label_width + span / 2, "middle"),
+                            ("100% of capacity", width, "end")):
+        drawing.add(String(x, 0, text, fontName="Helvetica", fontSize=6,
+                           fillColor=colors.HexColor("#888888"), textAnchor=anchor))
+    return drawing
+
+
+def generate_certificate(record: WipeRecord, report_path: str, logfile,
+                         appendix: bool = False):
     '''
     Generate a formatted PDF wipe certificate and write it to report_path.
+    appendix (--io-appendix) adds a table of record.io_stats after the notes.
 
     Security model:
       - No user password  → opens freely in any PDF reader
@@ -97,6 +514,14 @@ def generate_certificate(record: WipeRecord, report_path: str, logfile):
       - The owner passphrase is printed to the terminal and logged so it can
         be recorded if ever needed for administrative override
     '''
+    # The PDF stack is the slowest import by far and only --report needs it
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+    from reportlab.lib.units import inch
+    from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, HRFlowable,
+        Table as RLTable, TableStyle as RLTableStyle)
+    from pypdf import PdfReader, PdfWriter
     # Ensure .pdf extension
     if not report_path.lower().endswith('.pdf'):
         report_path += '.pdf'
@@ -105,7 +530,13 @@ def generate_certificate(record: WipeRecord, report_path: str, logfile):
     size_gib  = record.device_size / 1024 / 1024 / 1024
 
     # --- Status string ---
-    if record.success:
+    if record.success and record.bad_extents:
+        status_text  = "COMPLETED — NOT FULLY VERIFIED (BAD SECTORS SKIPPED)"
+        status_color = colors.HexColor("#b36b00")
+    elif record.success and record.sampling:
+        status_text  = "SAMPLED CHECK COMPLETED — NOT A FULL SCAN"
+        status_color = colors.HexColor("#b36b00")
+    elif record.success:
         status_text  = "COMPLETED SUCCESSFULLY"
         status_color = colors.HexColor("#1a7a1a")
     else:
@@ -205,6 +636,22 @@ def generate_certificate(record: WipeRecord, report_path: str, logfile):
     ]
     if record.wipe_standard:
         op_rows.append(("Wipe standard", record.wipe_standard))
+    if record.random_data:
+        op_rows.append(("Random data", record.random_data))
+    if record.zero_path:
+        op_rows.append(("0x00 written by", record.zero_path))
+    if record.sampling:
+        op_rows.append(("Sampling", record.sampling))
+    for digest in record.digests:
+        op_rows.append(("Read-back digest", digest))
+    for event in record.resume_events:
+        op_rows.append(("Resumed", event))
+    if record.bad_extents:
+        shown = [f"{first:,}" if first == last else f"{first:,}–{last:,}"
+                 for first, last in record.bad_extents[:_CERT_BAD_EXTENTS]]
+        if len(record.bad_extents) > _CERT_BAD_EXTENTS:
+            shown.append(f"… {len(record.bad_extents) - _CERT_BAD_EXTENTS:,} more in the log")
+        op_rows.append(("Bad sectors (LBA)", ",  ".join(shown)))
     story.append(info_table(op_rows))
 
     # Device details
@@ -212,7 +659,12 @@ def generate_certificate(record: WipeRecord, report_path: str, logfile):
     story.append(info_table([
         ("Device path",   record.device_path),
         ("Size",          f"{record.device_size:,} bytes  ({size_gib:.2f} GiB)"),
-        ("Block size",    f"{record.block_size:,} bytes"),
+        ("Block size",    f"{record.block_size:,} bytes"
+                          + ("  (auto-tuned)" if record.blocksize_source == "auto" else "")),
+        *([("Block size probe", ",  ".join(f"{size // 1024:,} KiB: {mbps:.0f} MB/s"
+                                           for size, mbps in record.blocksize_probe))]
+          if record.blocksize_probe else []),
+        ("I/O engine",    record.engine),
         ("Model",         record.model),
         ("Vendor",        record.vendor),
         ("Serial",        record.serial),
@@ -235,6 +687,14 @@ def generate_certificate(record: WipeRecord, report_path: str, logfile):
         smart_section("SMART Data — Pre-Wipe",  record.smart_pre)
         smart_section("SMART Data — Post-Wipe", record.smart_post)
 
+    # Verify profile — slow zones flag media that verified clean but should
+    # not be redeployed
+    if record.profiles:
+        story.append(Paragraph("Verify Throughput Profile", section_style))
+        story.append(profile_heatmap(record.profiles, 6.4 * inch))
+        story.append(info_table([(summary["pass"], profile_text(summary))
+                                 for summary in record.profiles]))
+
     # Notes — user-supplied or auto-generated for hardware erase operations
     nvme_ops = ("NVMe User Data Erase", "NVMe Block Erase")
     ata_ops  = ("ATA Secure Erase", "ATA Erase")
@@ -283,6 +743,40 @@ def generate_certificate(record: WipeRecord, report_path: str, logfile):
         story.append(Paragraph("Notes", section_style))
         story.append(Paragraph(record.notes, styles['Normal']))
 
+    # I/O appendix — per-pass request latency and device counters
+    if appendix and record.io_stats:
+        story.append(Paragraph("Appendix — I/O Latency and Device Counters", section_style))
+        header = ["Pass", "Requests", "p50", "p90", "p99", "Max",
+                  "Busy", "Avg queue", "Stalls"]
+        tdata = [header]
+        for stats in record.io_stats:
+            device = stats["device"]
+            timed = [_seconds_text(stats[name]) if stats["requests"] else "—"
+                     for name in ("p50", "p90", "p99", "max")]
+            tdata.append([stats["pass"], f"{stats['requests']:,}", *timed,
+                          f"{device['busy']:.0%}" if device else "—",
+                          f"{device['queue']:.1f}" if device else "—",
+                          (f"{device['stalls']} (≤ {device['longest_stall']:.0f} s)"
+                           if device.get("stalls") else "0") if device else "—"])
+        t = RLTable(tdata, repeatRows=1)
+        t.setStyle(RLTableStyle([
+            ('FONTSIZE',    (0, 0), (-1, -1), 8),
+            ('FONTNAME',    (0, 0), (-1, 0), 'Helvetica-Bold'),
+            ('TOPPADDING',  (0, 0), (-1, -1), 2),
+            ('BOTTOMPADDING', (0, 0), (-1, -1), 2),
+            ('ALIGN',       (1, 0), (-1, -1), 'RIGHT'),
+            ('ROWBACKGROUNDS', (0, 1), (-1, -1),
+             [colors.HexColor("#f5f5f5"), colors.white]),
+            ('LINEBELOW',   (0, 0), (-1, 0), 0.5, colors.HexColor("#1a1a2e")),
+            ('LINEBELOW',   (0, -1), (-1, -1), 0.5, colors.HexColor("#dddddd")),
+        ]))
+        story.append(t)
+        story.append(Paragraph(
+            "Latencies are per request as seen by the host, in log-spaced buckets "
+            "about 19% wide. Busy, average queue and stalls (seconds with requests "
+            "in flight and none completing) are from the kernel's counters for the "
+            "device; they are blank for image files.", footer_style))
+
     # Footer
     generated_at = datetime.datetime.now(datetime.timezone.utc).astimezone().strftime("%Y-%m-%d %H:%M:%S %z")
     story.append(Spacer(1, 0.3 * inch))
@@ -361,21 +855,253 @@ def _sigint_handler(sig, frame):
 signal.signal(signal.SIGINT, _sigint_handler)
 
 
-def checkblock(block, blocksize, devsize, logfile):
+class ProgressBus:
+    '''
+    Progress for one pass, decoupled from how it is shown. The pass loops
+    drive it like rich Progress (context manager, add_task, update, stop,
+    start) and may call update() for every block: that only records the
+    position. An event reaches the sink at most every interval seconds —
+    and the clock is only read once another _PROGRESS_STEP bytes are done —
+    plus once when a task is added and once when it completes. The bus
+    adds the pass's MB/s to every event, so loops don't time each block.
+    '''
+    def __init__(self, sink, interval=_PROGRESS_INTERVAL):
+        self.sink     = sink
+        self.interval = interval
+        self.tasks    = []
+        self.sent     = 0.0
+
+    def __enter__(self):
+        self.sink.__enter__()
+        return self
+
+    def __exit__(self, *exc_info):
+        for task in range(len(self.tasks)):
+            self._emit(task)
+        return self.sink.__exit__(*exc_info)
+
+    def add_task(self, description, total=None, completed=0, rate_scale=1, **fields):
+        '''
+        rate_scale is the bytes moved per unit of completed, for passes whose
+        bar runs slower than their I/O (the windowed sweep moves four).
+        '''
+        state = {"mbps": 0.0}
+        state.update(fields, description=description, total=total, completed=completed)
+        total = total or 0
+        self.tasks.append({
+            "state": state,
+            "first": completed,
+            "mark": completed,
+            "step": max(1, min(_PROGRESS_STEP, total // 1000)),
+            "scale": rate_scale,
+            "started": time.monotonic(),
+            "id": self.sink.add(state),
+        })
+        return len(self.tasks) - 1
+
+    def update(self, task, completed=None, **fields):
+        entry = self.tasks[task]
+        state = entry["state"]
+        if fields:
+            state.update(fields)
+        if completed is not None:
+            state["completed"] = completed
+            if completed - entry["mark"] < entry["step"] and completed != state["total"]:
+                return
+        now = time.monotonic()
+        if now - self.sent >= self.interval or state["completed"] == state["total"]:
+            self._emit(task, now)
+
+    def start(self):
+        self.sink.start()
+
+    def stop(self):
+        self.sink.stop()
+
+    def _emit(self, task, now=None):
+        entry = self.tasks[task]
+        state = entry["state"]
+        now = now or time.monotonic()
+        runtime = now - entry["started"]
+        if runtime > 0:
+            moved = (state["completed"] - entry["first"]) * entry["scale"]
+            state["mbps"] = moved / runtime / 1024 / 1024
+        entry["mark"] = state["completed"]
+        self.sent = now
+        self.sink.update(entry["id"], state)
+
+
+class _RichSink:
+    '''Progress sink drawing a rich Progress bar on the console.'''
+    def __init__(self, columns, kwargs):
+        from rich.progress import Progress
+        self.progress = Progress(*columns, **kwargs)
+
+    def __enter__(self):
+        self.progress.__enter__()
+
+    def __exit__(self, *exc_info):
+        return self.progress.__exit__(*exc_info)
+
+    def add(self, state):
+        fields = {key: value for key, value in state.items()
+                  if key not in ("description", "total", "completed")}
+        return self.progress.add_task(state["description"], total=state["total"],
+                                      completed=state["completed"], **fields)
+
+    def update(self, task_id, state):
+        self.progress.update(task_id, **state)
+
+    def start(self):
+        self.progress.start()
+
+    def stop(self):
+        self.progress.stop()
+
+
+class _JsonSink:
+    '''
+    Progress sink writing newline-delimited JSON events (--progress json):
+    "start" when a pass begins, "progress" while it runs, "end" when it
+    finishes. Log messages are written as "log" events by logging().
+    '''
+    def __init__(self):
+        self.tasks = []
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        for state in self.tasks:
+            progress_event("end", _progress_device, state)
+        return False
+
+    def add(self, state):
+        self.tasks.append(state)
+        progress_event("start", _progress_device, state)
+        return len(self.tasks) - 1
+
+    def update(self, task_id, state):
+        progress_event("progress", _progress_device, state)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class _RemoteSink(_JsonSink):
+    '''
+    Progress sink inside a batch worker: the same start/progress/end
+    events, forwarded to the parent, which draws the combined table or
+    writes them out as JSON.
+    '''
+    def __init__(self, events, devname):
+        super().__init__()
+        self.events  = events
+        self.devname = devname
+
+    def __exit__(self, *exc_info):
+        for state in self.tasks:
+            self.events.put(("end", self.devname, dict(state)))
+        return False
+
+    def add(self, state):
+        self.tasks.append(state)
+        self.events.put(("start", self.devname, dict(state)))
+        return len(self.tasks) - 1
+
+    def update(self, task_id, state):
+        self.events.put(("progress", self.devname, dict(state)))
+
+
+class _NullSink(_JsonSink):
+    '''Progress sink for --quiet: every event is dropped.'''
+    def __exit__(self, *exc_info):
+        return False
+
+    def add(self, state):
+        return None
+
+    def update(self, task_id, state):
+        pass
+
+
+def event_dict(kind, device, state=None, **payload):
+    '''
+    One progress event as a dict: the shape written by --progress json and
+    streamed to --serve watchers.
+    '''
+    event = {"event": kind, "time": round(time.time(), 3), "device": device}
+    if state is not None:
+        event["pass"] = state["description"]
+        event["completed"] = state["completed"]
+        event["total"] = state["total"]
+        event.update((key, value) for key, value in state.items()
+                     if key not in ("description", "completed", "total"))
+        if isinstance(event.get("mbps"), float):
+            event["mbps"] = round(event["mbps"], 2)
+    event.update(payload)
+    return event
+
+
+def progress_event(kind, device, state=None, **payload):
+    '''
+    Write one JSON progress event line to the --progress json stream. The
+    line is flushed at once so a dashboard on the other end of a FIFO sees
+    it as it happens.
+    '''
+    import json as _json
+    event = event_dict(kind, device, state, **payload)
+    _progress_stream.write(_json.dumps(event) + "\n")
+    _progress_stream.flush()
+
+
+def make_progress(*columns, **kwargs):
+    '''
+    Build the progress bus for a pass, feeding the sink chosen with
+    --progress / --quiet: a rich Progress with these columns, JSON events,
+    nothing, or — in a batch worker — the parent's combined display.
+    '''
+    if _batch_events is not None:
+        return ProgressBus(_RemoteSink(_batch_events, _batch_device),
+                           interval=_BATCH_UPDATE_INTERVAL)
+    if _progress_mode == "json":
+        return ProgressBus(_JsonSink())
+    if _progress_mode == "quiet":
+        return ProgressBus(_NullSink())
+    return ProgressBus(_RichSink(columns, kwargs))
+
+
+def checkblock(block, blocksize, devsize, logfile, engine=None, start=0):
     '''
     --smart / -s
     Single pass overwriting non-clean sectors with nulls. Not verified.
     Ideal for flash media where we want to limit writes.
     '''
+    from rich.progress import (BarColumn, TextColumn, TimeRemainingColumn,
+        TaskProgressColumn)
     logging(logfile, "Smart wipe started")
-    nullbytes = bytes(blocksize)
-    flushcaches()
-    os.lseek(block, 0, os.SEEK_SET)
+    nullbuf = memoryview(pattern_buffer("00", blocksize))
+    flushcaches(block, engine)
+    extents = sparse_extents(block, 0, devsize, logfile)
+    resumed = _resumed_bytes(engine, devsize, start)
     starttime = time.time()
-    blockwrites = 0
-    devpos = 0
-
-    with Progress(
+    rewrites = []       # one counter per stream
+
+    def smartrange(first, end):
+        tally = [0]
+        rewrites.append(tally)
+        for devpos, bytesin in readahead(block, blocksize, end, engine,
+                                         ranges=_clip(extents, first, end)):
+            if classify(bytesin, blocksize) != "00":
+                devpwrite(block, nullbuf[:len(bytesin)], devpos, engine)
+                tally[0] += 1
+            yield devpos + len(bytesin)
+        yield end       # trailing hole, if any
+
+    with make_progress(
         TextColumn("[bold cyan]Smart wipe[/]"),
         BarColumn(bar_width=None),
         TaskProgressColumn(),
@@ -385,32 +1111,21 @@ def checkblock(block, blocksize, devsize, logfile):
         console=console,
         transient=False,
     ) as progress:
-        task = progress.add_task("Smart wipe", total=devsize, mbps=0.0, writes=0)
+        task = progress.add_task("Smart wipe", total=devsize, completed=resumed, writes=0)
 
-        for _ in range(0, devsize, blocksize):
-            devpos = os.lseek(block, 0, os.SEEK_CUR)
-            if devpos + blocksize > devsize:
-                blocksize = devsize - devpos
-                nullbytes = bytes(blocksize)
-            bytesin = os.read(block, blocksize)
-            runtime = time.time() - starttime
-            mbps = (devpos + blocksize) / runtime / 1024 / 1024 if runtime > 0 else 0.0
-
-            if bytesin != nullbytes:
-                devpos = os.lseek(block, -blocksize, os.SEEK_CUR)
-                os.write(block, nullbytes)
-                blockwrites += 1
-
-            progress.update(task, completed=devpos + blocksize, mbps=mbps, writes=blockwrites)
+        for done, offset in streams(engine, devsize, start, smartrange):
+            checkpoint(engine, block, offset)
+            progress.update(task, completed=done,
+                            writes=sum(tally[0] for tally in rewrites))
+    blockwrites = sum(tally[0] for tally in rewrites)
 
     console.print("[dim]Syncing...[/]")
-    os.sync()
-    flushcaches()
+    flushcaches(block, engine)
 
     runtime = time.time() - starttime
     runtimefmt = str(datetime.timedelta(seconds=math.floor(runtime)))
-    mbps = (devpos + blocksize) / runtime / 1024 / 1024 if runtime > 0 else 0.0
-    summary = (f"Smart wipe complete. {devpos + blocksize:,} bytes checked. "
+    mbps = (devsize - resumed) / runtime / 1024 / 1024 if runtime > 0 else 0.0
+    summary = (f"Smart wipe complete. {devsize - resumed:,} bytes checked. "
                f"{blockwrites} blocks rewritten. {runtimefmt} @ {mbps:.2f} MB/s")
     console.print(f"[bold green]✓[/] {summary}")
     logging(logfile, summary)
@@ -418,45 +1133,1323 @@ def checkblock(block, blocksize, devsize, logfile):
 
 
 
-def flushcaches():
+def flushcaches(block, engine=None):
+    '''
+    Make the next read of this device come from the media, touching nothing
+    else on the host: fdatasync the descriptor (and the image tail one),
+    drop its clean pages with posix_fadvise(DONTNEED), then BLKFLSBUF,
+    which syncs and invalidates the block device's own buffer cache. The
+    ioctl is skipped for disk image files, where fadvise alone suffices.
+    '''
+    descriptors = [block]
+    if engine is not None and engine.tailfd is not None:
+        descriptors.append(engine.tailfd)
+    for fd in descriptors:
+        os.fdatasync(fd)
+        os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+    try:
+        fcntl.ioctl(block, _BLKFLSBUF)
+    except OSError:
+        pass  # regular file (ENOTTY): nothing beyond the page cache to drop
+
+
+def resident_bytes(block, start=0, end=None, chunk=1 << 30):
+    '''
+    Bytes of [start, end) held in the page cache, counted with mincore(2)
+    over a read-only mapping, one chunk at a time. Mapping pages does not
+    read them, so this measures the cache without disturbing it. Returns
+    None where mincore is unavailable.
+    '''
+    import ctypes
+    libc = ctypes.CDLL(None, use_errno=True)
+    libc.mmap.restype = ctypes.c_void_p
+    libc.mmap.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_int,
+                          ctypes.c_int, ctypes.c_int, ctypes.c_long)
+    libc.munmap.argtypes = (ctypes.c_void_p, ctypes.c_size_t)
+    libc.mincore.argtypes = (ctypes.c_void_p, ctypes.c_size_t, ctypes.c_void_p)
+
+    if end is None:
+        end = os.fstat(block).st_size or os.lseek(block, 0, os.SEEK_END)
+    start -= start % mmap.PAGESIZE
+    resident = 0
+    for offset in range(start, end, chunk):
+        length = min(chunk, end - offset)
+        pages = -(-length // mmap.PAGESIZE)
+        addr = libc.mmap(None, length, mmap.PROT_READ, mmap.MAP_SHARED, block, offset)
+        if addr in (None, ctypes.c_void_p(-1).value):
+            return None
+        try:
+            vec = (ctypes.c_ubyte * pages)()
+            if libc.mincore(addr, length, vec) != 0:
+                return None
+            resident += (pages - bytes(vec).count(0)) * mmap.PAGESIZE
+        finally:
+            libc.munmap(addr, length)
+    return min(resident, end - start)
+
+
+def evictcheck(block, start, end, logfile, engine=None):
     '''
-    flush cache so we read from disk rather than buffer.
-    Silently skips if /proc/sys/vm/drop_caches is not writable (e.g. non-root
-    context or restricted environment) rather than crashing.
+    Confirm nothing in [start, end) is still cached before a verify pass
+    reads it, so the pass really reads the media. start may also be a
+    sharded checkpoint, one offset per shard, in which case the rest of
+    each shard is checked. Warns and logs if pages survived the flush;
+    returns the resident byte count (None if unknown).
+    '''
+    if isinstance(start, list):
+        ranges = [(first, stop) for (_, stop), first in _shard_starts(engine, end, start)]
+    else:
+        ranges = [(start, end)]
+    counts = [resident_bytes(block, first, stop) for first, stop in ranges if first < stop]
+    resident = None if None in counts else sum(counts)
+    if resident:
+        msg = (f"{resident:,} bytes of the device are still in the page cache "
+               "after flushing — verification may read them from memory.")
+        console.print(f"[bold yellow]⚠ {msg}[/]")
+        logging(logfile, f"WARNING: {msg}")
+    return resident
+
+
+def sector_sizes(block):
+    '''
+    Return (logical, physical) sector sizes for an open descriptor. Block
+    devices are asked via BLKSSZGET/BLKPBSZGET; regular files (disk images)
+    fall back to the filesystem's preferred I/O size, which is what O_DIRECT
+    alignment follows there.
     '''
     try:
-        with open('/proc/sys/vm/drop_caches', 'w', encoding="utf-8") as file_object:
-            file_object.write("1\n")
+        logical  = struct.unpack('i', fcntl.ioctl(block, _BLKSSZGET, bytes(4)))[0]
+        physical = struct.unpack('I', fcntl.ioctl(block, _BLKPBSZGET, bytes(4)))[0]
     except OSError:
-        pass  # non-fatal: cache flush is a best-effort optimization
+        logical = physical = os.fstat(block).st_blksize or 4096
+    return logical, max(physical, logical)
+
+
+def _pattern_fill(pattern, size):
+    '''size bytes of the hex pattern repeated from its first byte.'''
+    unit = bytes.fromhex(pattern)
+    return unit * (size // len(unit)) + unit[:size % len(unit)]
+
+
+def aligned_buffer(size, pattern="00"):
+    '''
+    Return a page-aligned buffer of size bytes filled with pattern (hex
+    bytes, repeated). Anonymous mmaps are always page-aligned, which
+    satisfies O_DIRECT for any sector size up to the page size.
+    '''
+    buf = mmap.mmap(-1, size)
+    if pattern != "00":
+        buf[:] = _pattern_fill(pattern, size)
+    return buf
+
+
+# Pattern buffers keyed by (kind, pattern, size). Each one is built the first
+# time a pass asks for it and shared read-only by every later pass, tail
+# block and rewrite, so the hot loops never allocate block-sized objects.
+_PATTERNS = {}
+
+
+def pattern_buffer(pattern, size):
+    '''
+    Return the shared page-aligned write source for pattern (hex bytes,
+    repeated) at size bytes. Callers must not modify it.
+    '''
+    key = ("write", pattern, size)
+    if key not in _PATTERNS:
+        _PATTERNS[key] = aligned_buffer(size, pattern)
+    return _PATTERNS[key]
+
+
+def pattern_bytes(pattern, size):
+    '''
+    Return the shared comparison reference for pattern at size bytes. It is
+    a bytearray, and must sit on the LEFT of == / != against a memoryview:
+    bytearray compares any buffer with a single memcmp, whereas memoryview
+    on the left falls back to a per-byte comparison roughly 100x slower.
+    '''
+    key = ("compare", pattern, size)
+    if key not in _PATTERNS:
+        _PATTERNS[key] = bytearray(_pattern_fill(pattern, size))
+    return _PATTERNS[key]
+
+
+def prepare_patterns(passes, blocksize):
+    '''
+    Build the write and compare buffers of every fixed pattern a pass list
+    uses before the first pass starts. Each is built once, however many
+    steps repeat the pattern, and shared read-only from then on.
+    '''
+    for kind, pattern in passes:
+        if kind in ("write", "verify") and pattern != "random":
+            pattern_buffer(pattern, blocksize)
+            pattern_bytes(pattern, blocksize)
+
+
+def pattern_label(pattern):
+    '''How a pass pattern is named in messages: 0xFF, 0x00 or random data.'''
+    return "random data" if pattern == "random" else f"0x{pattern}"
+
+
+def pattern_block(pattern, position, length, engine):
+    '''
+    Write source and comparison reference for one block of pattern at
+    position, for the rewrite and bisection paths. The shared pattern
+    buffers serve 0xFF and 0x00; random data depends on the offset and is
+    regenerated from engine.keystream.
+    '''
+    if pattern != "random":
+        return memoryview(pattern_buffer(pattern, length)), pattern_bytes(pattern, length)
+    expected = engine.keystream.data(position, length)
+    source = aligned_buffer(length)
+    source[:] = expected
+    return memoryview(source), expected
+
+
+def _keystream(seed, position, length):
+    '''
+    Keystream bytes [position, position + length) for seed, as a bytearray
+    (the fast side of a compare; see pattern_bytes()). Module-level so the
+    Keystream worker processes can run it.
+    '''
+    first = position // _KEYSTREAM_CHUNK
+    last = (position + length - 1) // _KEYSTREAM_CHUNK
+    data = bytearray()
+    for index in range(first, last + 1):
+        data += hashlib.shake_128(seed + index.to_bytes(8, "little")).digest(_KEYSTREAM_CHUNK)
+    skip = position - first * _KEYSTREAM_CHUNK
+    if skip or len(data) != length:
+        data = data[skip:skip + length]
+    return data
+
+
+def _keystream_worker():
+    '''
+    Keystream pool process initializer. Ctrl+C reaches the whole process
+    group; the workers leave it to the main process, which stops the pool.
+    '''
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+class Keystream:
+    '''
+    --random: the data of the random write and verify passes. Nothing is
+    stored: every block is a function of the seed and its offset, so the
+    verify pass, a rewrite, a bad-sector probe or a --resume (the seed is
+    kept in the journal) regenerates exactly what was written there.
+    Incompressible, never-repeating data makes compressing or
+    deduplicating controllers really program the flash, which a 0x00 or
+    0xFF pass does not guarantee.
+
+    SHAKE-128 holds the GIL while it generates, so generation runs in a
+    pool of worker processes (one thread where there is a single CPU) that
+    keeps several blocks ahead of each stream; see blocks().
+    '''
+
+    def __init__(self, seed):
+        self.seed = seed
+        self.rates = []
+        self._pool = None
+        self._workers = 1
+        self._lock = threading.Lock()
+
+    def data(self, position, length):
+        '''Regenerate [position, position + length) in this thread.'''
+        return _keystream(self.seed, position, length)
+
+    def pool(self):
+        '''The generator pool, started on first use and shared by every stream.'''
+        with self._lock:
+            if self._pool is None:
+                cpus = os.cpu_count() or 1
+                if cpus > 1:
+                    self._workers = min(cpus - 1, _KEYSTREAM_WORKERS)
+                    self._pool = ProcessPoolExecutor(max_workers=self._workers,
+                                                     initializer=_keystream_worker)
+                else:
+                    self._workers = 1
+                    self._pool = ThreadPoolExecutor(max_workers=1,
+                                                    thread_name_prefix="owl-keystream")
+            return self._pool
+
+    def blocks(self, start, end, blocksize, engine=None):
+        '''
+        Yield (position, data) for every block of [start, end) in order,
+        generated ahead by the pool. data is a fresh bytearray; under the
+        direct engine writebehind() copies it into an aligned buffer.
+        '''
+        pool = self.pool()
+        depth = 2 * self._workers + _queue_depth(engine)
+        positions = iter(range(start, end, blocksize))
+        pending = collections.deque()
+
+        def submit():
+            position = next(positions, None)
+            if position is not None:
+                pending.append((position, pool.submit(
+                    _keystream, self.seed, position, min(blocksize, end - position))))
+
+        for _ in range(depth):
+            submit()
+        while pending:
+            position, request = pending.popleft()
+            submit()
+            yield position, request.result()
+
+    def close(self):
+        '''Stop the generator pool.'''
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(cancel_futures=True)
+                self._pool = None
+
+
+class KeystreamBlocks:
+    '''
+    The write source writepass() and writebehind() take for a random pass
+    in place of a pattern buffer: blocksize long, but with data that
+    depends on where it is written.
+    '''
+
+    def __init__(self, keystream, blocksize):
+        self.keystream = keystream
+        self.blocksize = blocksize
+
+    def __len__(self):
+        return self.blocksize
+
 
-def wipefail(block, position, blocksize, pattern, logfile):
+def classify(view, blocksize):
+    '''
+    Detection kernel for the map and smart passes: "00" if view, a block of
+    at most blocksize bytes, is all 0x00, "FF" if all 0xFF, None if mixed.
+    The first byte picks the only pattern the block could be, so a mixed
+    block that starts with anything else costs no scan at all; otherwise
+    one memcmp against the start of the shared blocksize reference decides,
+    stopping at the first differing word. Extent tails of any length use
+    that same reference (startswith() compares a prefix without copying
+    it), so nothing is copied, allocated or cached per block or per length.
+    '''
+    if not view:
+        return "00"
+    first = view[0]
+    if first not in (0x00, 0xFF):
+        return None
+    pattern = "00" if first == 0x00 else "FF"
+    reference = pattern_bytes(pattern, max(blocksize, len(view)))
+    return pattern if reference.startswith(view) else None
+
+
+def _tail_unaligned(engine, length):
+    '''True if length must go through the buffered tail descriptor.'''
+    return (engine is not None and engine.name == "direct"
+            and length % engine.logical_sector != 0)
+
+
+def devpread(block, buf, length, position, engine=None):
+    '''
+    Read length bytes at position into the preallocated buffer buf and
+    return a memoryview over what was read. Positional, so any number of
+    worker threads can share the descriptor. Under the direct engine a
+    length that is not sector-aligned (the tail of an image file) is read
+    through engine.tailfd so O_DIRECT never sees it. Under PassStats the
+    request is timed into engine.latency, and during readloop() into the
+    engine.profile region it falls in.
+    '''
+    view = memoryview(buf)[:length]
+    fd = engine.tailfd if _tail_unaligned(engine, length) else block
+    if engine is None or (engine.latency is None and engine.profile is None):
+        return view[:os.preadv(fd, [view], position)]
+    latency, profile = engine.latency, engine.profile
+    began = time.perf_counter()
+    got = os.preadv(fd, [view], position)
+    ended = time.perf_counter()
+    if latency is not None:
+        latency.record(ended - began)
+    if profile is not None:
+        profile.record(position, got, began, ended)
+    return view[:got]
+
+
+def devpwrite(block, data, position, engine=None):
+    '''
+    Write data at position. data must come from aligned_buffer() when the
+    direct engine is in use; an unaligned tail is written through
+    engine.tailfd. Timed like devpread().
+    '''
+    fd = engine.tailfd if _tail_unaligned(engine, len(data)) else block
+    latency = engine.latency if engine is not None else None
+    if latency is None:
+        return os.pwrite(fd, data, position)
+    began = time.perf_counter()
+    written = os.pwrite(fd, data, position)
+    latency.record(time.perf_counter() - began)
+    return written
+
+
+def _queue_depth(engine):
+    '''Number of I/O requests the engine keeps in flight.'''
+    return engine.queue_depth if engine is not None else 1
+
+
+class LatencyHistogram:
+    '''
+    Request latencies of one pass in log-spaced buckets (see _LATENCY_STEPS):
+    constant memory however long the pass, and safe to record into from
+    every readahead/writebehind worker and shard at once. Bucket 0 holds
+    requests under 1 µs; bucket i covers up to 2 ** (i / _LATENCY_STEPS) µs.
+    '''
+
+    def __init__(self):
+        self.counts = [0] * _LATENCY_BUCKETS
+        self.count = 0
+        self.max = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds):
+        '''Add one request that took seconds.'''
+        micros = seconds * 1e6
+        index = 0 if micros < 1 else min(_LATENCY_BUCKETS - 1,
+                                          int(math.log2(micros) * _LATENCY_STEPS) + 1)
+        with self._lock:
+            self.counts[index] += 1
+            self.count += 1
+            if seconds > self.max:
+                self.max = seconds
+
+    def percentile(self, fraction):
+        '''
+        Latency in seconds that fraction (0-1) of the requests finished
+        within: the upper edge of the bucket holding that rank, capped at
+        the slowest request actually seen.
+        '''
+        rank = max(1, math.ceil(fraction * self.count))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.max, 2 ** (index / _LATENCY_STEPS) / 1e6)
+        return self.max
+
+
+class DeviceCounters:
+    '''
+    Samples a block device's sysfs stat file (Documentation/block/stat.rst)
+    on a daemon thread every _IOSTAT_INTERVAL seconds while a pass runs. It
+    is the kernel's side of the host latencies: io_ticks says how busy the
+    device was, time_in_queue the average number of requests queued, and an
+    interval that ends with requests in flight but saw none complete is a
+    stall — the device sat on its queue (firmware housekeeping, a sector
+    being retried) for that whole interval.
+    '''
+
+    def __init__(self, statpath):
+        self.statpath = statpath
+        self.began = time.monotonic()
+        self.first = self.last = self._read()
+        self.max_in_flight = 0
+        self.stalls = 0
+        self.longest_stall = 0.0
+        self._stalled = 0.0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        if self.first is not None:
+            self._thread.start()
+
+    def _read(self):
+        '''The stat fields as integers, or None if the file is unreadable.'''
+        try:
+            with open(self.statpath, encoding="ascii") as stat:
+                fields = [int(value) for value in stat.read().split()]
+        except (OSError, ValueError):
+            return None
+        return fields if len(fields) >= 11 else None
+
+    def _sample(self):
+        while not self._stop.wait(_IOSTAT_INTERVAL):
+            now = self._read()
+            if now is None:
+                continue
+            before, self.last = self.last, now
+            self.max_in_flight = max(self.max_in_flight, now[8])
+            if now[8] and now[0] + now[4] == before[0] + before[4]:
+                if not self._stalled:
+                    self.stalls += 1
+                self._stalled += _IOSTAT_INTERVAL
+                self.longest_stall = max(self.longest_stall, self._stalled)
+            else:
+                self._stalled = 0.0
+
+    def close(self):
+        '''Stop sampling and return the pass's counters as a dict ({} if unreadable).'''
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        if self.first is None:
+            return {}
+        last = self._read() or self.last
+        delta = [after - before for before, after in zip(self.first, last)]
+        elapsed = max(1.0, (time.monotonic() - self.began) * 1000)
+        completed = delta[0] + delta[4]
+        return {
+            "completed": completed,
+            "busy": min(1.0, delta[9] / elapsed),
+            "queue": delta[10] / elapsed,
+            "service": (delta[3] + delta[7]) / completed / 1000 if completed else 0.0,
+            "max_in_flight": max(self.max_in_flight, last[8]),
+            "stalls": self.stalls,
+            "longest_stall": self.longest_stall,
+        }
+
+
+def _seconds_text(seconds):
+    '''A latency as µs, ms or s with about three significant figures.'''
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:.0f} µs"
+    if seconds < 1:
+        return f"{seconds * 1e3:.3g} ms"
+    return f"{seconds:.3g} s"
+
+
+def iostats_text(summary):
+    '''One line describing a PassStats summary, for the log and the certificate.'''
+    parts = []
+    if summary["requests"]:
+        parts.append(f"{summary['requests']:,} requests, latency "
+                     + ", ".join(f"{name} {_seconds_text(summary[name])}"
+                                 for name in ("p50", "p90", "p99", "max")))
+    device = summary["device"]
+    if device:
+        stalls = (f"{device['stalls']} stalls (longest {device['longest_stall']:.0f} s)"
+                  if device["stalls"] else "no stalls")
+        parts.append(f"device {device['busy']:.0%} busy, avg queue {device['queue']:.1f}, "
+                     f"max in flight {device['max_in_flight']}, "
+                     f"{_seconds_text(device['service'])} service, {stalls}")
+    return "; ".join(parts) or "no I/O"
+
+
+class RegionProfile:
+    '''
+    Throughput and latency of one verify pass per region of the device.
+    The pass reads every LBA anyway, so this costs one bucket update per
+    read. A region's MB/s is its bytes over the span from its first read
+    being issued to its last completing; its latency is the mean and the
+    maximum of its reads. Regions before a --resume offset stay empty.
+    '''
+
+    def __init__(self, label, devsize, blocksize):
+        self.label = label
+        self.devsize = devsize
+        self.regions = max(1, min(_PROFILE_REGIONS, devsize // (blocksize * _PROFILE_BLOCKS)))
+        self.bytes = [0] * self.regions
+        self.requests = [0] * self.regions
+        self.latency = [0.0] * self.regions
+        self.max = [0.0] * self.regions
+        self.first = [math.inf] * self.regions
+        self.last = [0.0] * self.regions
+        self._lock = threading.Lock()
+
+    def record(self, position, length, began, ended):
+        '''Add one read of length bytes at position, timed by perf_counter().'''
+        index = min(self.regions - 1, position * self.regions // self.devsize)
+        with self._lock:
+            self.bytes[index] += length
+            self.requests[index] += 1
+            self.latency[index] += ended - began
+            self.max[index] = max(self.max[index], ended - began)
+            self.first[index] = min(self.first[index], began)
+            self.last[index] = max(self.last[index], ended)
+
+    def summary(self):
+        '''
+        The profile as a dict of per-region lists (None for an empty
+        region): mbps, latency (mean seconds) and max, with region_bytes
+        and the slow zones as [start, end) byte ranges.
+        '''
+        mbps, latency, peak = [], [], []
+        for index in range(self.regions):
+            if not self.requests[index]:
+                mbps.append(None)
+                latency.append(None)
+                peak.append(None)
+                continue
+            span = max(self.last[index] - self.first[index], 1e-9)
+            mbps.append(self.bytes[index] / span / 1024 / 1024)
+            latency.append(self.latency[index] / self.requests[index])
+            peak.append(self.max[index])
+        measured = sorted(rate for rate in mbps if rate is not None)
+        median = measured[len(measured) // 2] if measured else 0.0
+        slow, zone = [], None
+        for index, rate in enumerate(mbps + [None]):
+            if rate is not None and rate < median * _SLOW_ZONE:
+                zone = zone if zone is not None else index
+            elif zone is not None:
+                slow.append([self._offset(zone), self._offset(index)])
+                zone = None
+        return {"pass": self.label, "region_bytes": -(-self.devsize // self.regions),
+                "devsize": self.devsize, "median": median, "mbps": mbps,
+                "latency": latency, "max": peak, "requests": list(self.requests),
+                "slow": slow}
+
+    def _offset(self, index):
+        '''Byte offset where region index starts (the device end for regions).'''
+        return min(self.devsize, -(-index * self.devsize // self.regions))
+
+
+def profile_text(summary):
+    '''One line describing a RegionProfile summary and its slow zones, for the log.'''
+    size = summary["devsize"]
+    zones = ", ".join(f"{start / size:.1%}–{end / size:.1%}" for start, end in summary["slow"])
+    return (f"median {summary['median']:.0f} MB/s over {len(summary['mbps']):,} regions of "
+            f"{summary['region_bytes']:,} bytes; "
+            + (f"{len(summary['slow'])} slow zones under {_SLOW_ZONE:.0%} of median: {zones}"
+               if summary["slow"] else "no slow zones"))
+
+
+def write_profiles(path, profiles, logfile):
+    '''
+    Write verify pass region profiles to path as CSV, one row per pass and
+    region: byte range, requests, MB/s, mean and max read latency in ms,
+    and whether the region lies in a slow zone.
+    '''
+    try:
+        with open(path, "w", newline="", encoding="utf-8") as out:
+            rows = csv.writer(out)
+            rows.writerow(["pass", "region", "start_byte", "end_byte", "requests",
+                           "mb_per_s", "mean_latency_ms", "max_latency_ms", "slow"])
+            for summary in profiles:
+                size, regions = summary["devsize"], len(summary["mbps"])
+                for index, rate in enumerate(summary["mbps"]):
+                    first = -(-index * size // regions)
+                    last = -(-(index + 1) * size // regions)
+                    slow = any(start <= first < end for start, end in summary["slow"])
+                    rows.writerow([
+                        summary["pass"], index, first, last, summary["requests"][index],
+                        "" if rate is None else f"{rate:.1f}",
+                        "" if rate is None else f"{summary['latency'][index] * 1000:.3f}",
+                        "" if rate is None else f"{summary['max'][index] * 1000:.3f}",
+                        int(slow)])
+    except OSError as exc:
+        console.print(f"[yellow]⚠ Could not write profile {path}: {exc}[/]")
+        logging(logfile, f"WARNING: could not write profile {path}: {exc}")
+        return
+    console.print(f"[dim]Verify profile written to {path}[/]")
+    logging(logfile, f"Verify profile written to {path}")
+
+
+class PassStats:
+    '''
+    Wraps one pass (with PassStats(engine, label, logfile): ...): for its
+    duration devpread() and devpwrite() time every request into a fresh
+    LatencyHistogram on the engine and, for a block device, DeviceCounters
+    samples its sysfs stat. On exit — an interrupted or failed pass
+    included, since a stall is often what ended it — p50/p90/p99/max and
+    the device counters are logged and appended to engine.iostats.
+    BLKZEROOUT and the hardware erase commands are not timed per request;
+    the device counters still see them.
+    '''
+
+    def __init__(self, engine, label, logfile):
+        self.engine = engine
+        self.label = label
+        self.logfile = logfile
+        self.counters = None
+
+    def __enter__(self):
+        if self.engine is not None:
+            self.engine.latency = LatencyHistogram()
+            if self.engine.statpath:
+                self.counters = DeviceCounters(self.engine.statpath)
+        return self
+
+    def __exit__(self, *exc):
+        if self.engine is None or self.engine.latency is None:
+            return False
+        histogram, self.engine.latency = self.engine.latency, None
+        summary = {"pass": self.label, "requests": histogram.count,
+                   "device": self.counters.close() if self.counters is not None else {}}
+        for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99)):
+            summary[name] = histogram.percentile(fraction)
+        summary["max"] = histogram.max
+        if histogram.count or summary["device"]:
+            text = iostats_text(summary)
+            console.print(f"[dim]I/O {self.label}: {text}[/]")
+            logging(self.logfile, f"I/O {self.label}: {text}")
+            with _engine_lock:
+                self.engine.iostats.append(summary)
+        return False
+
+
+def data_extents(block, start, end):
+    '''
+    The allocated (start, end) extents of [start, end), found with
+    SEEK_DATA / SEEK_HOLE, for sparse disk images. Everything outside them
+    is a hole and reads as zeros without touching storage. Targets that
+    don't report holes — block devices report none, and some filesystems
+    refuse the whence values — come back as the single extent (start, end).
+    '''
+    extents = []
+    pos = start
+    try:
+        while pos < end:
+            try:
+                data = os.lseek(block, pos, os.SEEK_DATA)
+            except OSError as exc:
+                if exc.errno == errno.ENXIO:    # no data past pos
+                    break
+                raise
+            if data >= end:
+                break
+            hole = min(os.lseek(block, data, os.SEEK_HOLE), end)
+            extents.append((data, hole))
+            pos = hole
+    except (OSError, AttributeError):
+        return [(start, end)]
+    return extents
+
+
+def sparse_extents(block, start, devsize, logfile):
+    '''
+    data_extents() for the map and smart passes, logging how much of a
+    sparse target will be skipped as holes (known zeros).
+    '''
+    extents = data_extents(block, start, devsize)
+    allocated = sum(end - first for first, end in extents)
+    if allocated < devsize - start:
+        msg = (f"Sparse target: {devsize - start - allocated:,} bytes in holes are "
+               f"clean without reading; scanning {allocated:,} bytes in "
+               f"{len(extents):,} allocated extents.")
+        console.print(f"[dim]{msg}[/]")
+        logging(logfile, msg)
+    return extents
+
+
+def readahead(block, blocksize, devsize, engine=None, start=0,
+              depth=_READAHEAD_DEPTH, ranges=None):
+    '''
+    Pipelined reader for the verify, map and smart passes. Yields
+    (dev_pos, view) for every block from start to devsize, in order — or,
+    given ranges, for every block of each (start, end) range in turn.
+
+    A pool of engine.queue_depth worker threads fills a ring of
+    preallocated aligned buffers with positional reads while the caller
+    checks earlier blocks, so the device is never idle during comparison
+    or progress updates. Reads may complete in any order; blocks are
+    handed to the caller strictly in order, so the last dev_pos yielded is
+    always the contiguous verified watermark. A slot is handed back to the
+    pool when the caller asks for the next block, so each view is only
+    valid until then. An OSError is raised in the caller at the block
+    where it happened, after every earlier block has been yielded.
+    '''
+    workers = _queue_depth(engine)
+    depth = max(depth, workers + 2)
+    ring = [aligned_buffer(blocksize) for _ in range(depth)]
+    if ranges is None:
+        ranges = ((start, devsize),)
+    positions = ((dev_pos, min(blocksize, end - dev_pos))
+                 for first, end in ranges
+                 for dev_pos in range(first, end, blocksize))
+    pending = collections.deque()
+
+    with ThreadPoolExecutor(max_workers=workers,
+                            thread_name_prefix="owl-read") as pool:
+        def submit(slot):
+            dev_pos, length = next(positions, (None, 0))
+            if dev_pos is not None:
+                pending.append((dev_pos, slot, pool.submit(
+                    devpread, block, ring[slot], length, dev_pos, engine)))
+
+        for slot in range(depth):
+            submit(slot)
+        while pending:
+            dev_pos, slot, request = pending.popleft()
+            yield dev_pos, request.result()
+            submit(slot)
+
+
+def writebehind(block, data, devsize, engine=None, start=0):
+    '''
+    Write pass driver. Writes data — one block of pattern, shared
+    read-only by every request — from start to devsize with up to
+    engine.queue_depth positional writes in flight. For a random pass data
+    is a KeystreamBlocks, and each request writes the keystream for its
+    own offset instead; under the direct engine that is copied into one of
+    a set of aligned buffers, one per request in flight, each reused once
+    its write completes.
+
+    Requests complete in any order. After each completion this yields the
+    contiguous watermark: the offset below which every write has finished.
+    A failed write is raised once the watermark reaches it, so the last
+    value yielded before an OSError is the position of the failed block.
+    '''
+    blocksize = len(data)
+    workers = _queue_depth(engine)
+    positions = iter(range(start, devsize, blocksize))
+    keys = free = None
+    if isinstance(data, KeystreamBlocks):
+        keys = data.keystream.blocks(start, devsize, blocksize, engine)
+        if engine is not None and engine.name == "direct":
+            free = [aligned_buffer(blocksize) for _ in range(workers)]
+    inflight = {}
+    slots = {}
+    finished = {}
+    watermark = start
+
+    with ThreadPoolExecutor(max_workers=workers,
+                            thread_name_prefix="owl-write") as pool:
+        def submit():
+            dev_pos = next(positions, None)
+            if dev_pos is not None:
+                length = min(blocksize, devsize - dev_pos)
+                source = next(keys)[1] if keys is not None else data[:length]
+                slot = None
+                if free is not None:
+                    slot = free.pop()
+                    slot[:length] = source
+                    source = memoryview(slot)[:length]
+                request = pool.submit(devpwrite, block, source, dev_pos, engine)
+                inflight[request] = dev_pos
+                if slot is not None:
+                    slots[request] = slot
+
+        for _ in range(workers):
+            submit()
+        while inflight:
+            done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+            for request in done:
+                finished[inflight.pop(request)] = request.exception()
+                if request in slots:
+                    free.append(slots.pop(request))
+                submit()
+            while watermark in finished:
+                exc = finished.pop(watermark)
+                if exc is not None:
+                    raise exc
+                watermark = min(watermark + blocksize, devsize)
+            yield watermark
+
+
+def shard_ranges(devsize, shards, align=_SHARD_ALIGN):
+    '''
+    Split [0, devsize) into at most shards contiguous ranges, each starting
+    on an align boundary. Small devices get fewer, never empty, ranges.
+    '''
+    step = max(1, -(-devsize // shards // align)) * align
+    return [(first, min(first + step, devsize)) for first in range(0, devsize, step)]
+
+
+def _clip(extents, first, end):
+    '''The parts of (start, end) extents that fall inside [first, end).'''
+    return [(max(start, first), min(stop, end)) for start, stop in extents
+            if stop > first and start < end]
+
+
+def _offset_text(offset):
+    '''A checkpoint offset as words: one position, or one per shard.'''
+    if isinstance(offset, list):
+        return "shard offsets " + ", ".join(f"{mark:,}" for mark in offset)
+    return f"offset {offset:,}"
+
+
+def _shard_starts(engine, devsize, start):
+    '''
+    ((low, end), first) for each shard: its range and where this pass
+    starts in it. start is a single offset — shards wholly below it are
+    done — or, from a sharded checkpoint, one offset per shard.
+    '''
+    shards = engine.shards if engine is not None else 1
+    ranges = (shard_ranges(devsize, shards, engine.shard_align) if shards > 1
+              else [(0, devsize)])
+    if isinstance(start, list):
+        return list(zip(ranges, start))
+    return [((low, end), min(max(low, start), end)) for low, end in ranges]
+
+
+def _resumed_bytes(engine, devsize, start):
+    '''Bytes of a pass already done when it (re)starts from start.'''
+    return sum(first - low for (low, _), first in _shard_starts(engine, devsize, start))
+
+
+def streams(engine, devsize, start, stream):
+    '''
+    Drive one pass over the device. stream(first, end) is a generator that
+    processes [first, end) in order and yields its watermark as it goes.
+
+    Without --shards that is a single stream from start, run right here, and
+    this yields (watermark, watermark). With --shards each shard's stream
+    runs in its own thread — pread/pwrite release the GIL, so the device
+    sees that many sequential streams at once, each with its own
+    queue_depth — and this yields (bytes done, per-shard watermarks)
+    every _PROGRESS_INTERVAL, so progress and checkpoints stay in the
+    calling thread. It returns only when every shard has finished, which is
+    the barrier between passes. The first shard to fail (an OSError, or the
+    sys.exit of a failed verify) stops the others and is re-raised here.
+    '''
+    shards = _shard_starts(engine, devsize, start)
+    if engine is None or engine.shards == 1:
+        (_, end), first = shards[0]
+        for mark in stream(first, end):
+            yield mark, mark
+        return
+
+    marks = [first for _, first in shards]
+    stop = threading.Event()
+
+    def run(index, first, end):
+        for marks[index] in stream(first, end):
+            if stop.is_set():
+                return
+
+    with ThreadPoolExecutor(max_workers=len(shards),
+                            thread_name_prefix="owl-shard") as pool:
+        pending = {pool.submit(run, index, first, end)
+                   for index, ((_, end), first) in enumerate(shards)}
+        try:
+            while pending:
+                done, pending = wait(pending, timeout=_PROGRESS_INTERVAL,
+                                     return_when=FIRST_EXCEPTION)
+                for request in done:
+                    request.result()
+                yield (sum(mark - low for ((low, _), _), mark in zip(shards, marks)),
+                       list(marks))
+        except BaseException:
+            stop.set()
+            raise
+
+
+def _sysfs_dir(devname):
+    '''The sysfs directory of a block device node, or "" for an image file.'''
+    try:
+        rdev = os.stat(devname).st_rdev
+        if not rdev:
+            return ""
+        return os.path.realpath(f"/sys/dev/block/{os.major(rdev)}:{os.minor(rdev)}")
+    except OSError:
+        return ""
+
+
+def sysfs_stat(devname):
+    '''
+    Path of the device's own I/O statistics file (a partition has one of
+    its own), for DeviceCounters; "" when there is none to sample.
+    '''
+    sysdir = _sysfs_dir(devname)
+    path = os.path.join(sysdir, "stat") if sysdir else ""
+    return path if path and os.path.isfile(path) else ""
+
+
+def queue_limits(devname):
+    '''
+    Request queue limits from /sys/block/<dev>/queue for a block device
+    node (a partition reports its parent disk's): logical_block_size,
+    physical_block_size, optimal_io_size and max_sectors_kb, in the units
+    sysfs uses. Empty for image files or when sysfs is unavailable.
+    '''
+    sysdir = _sysfs_dir(devname)
+    if not sysdir:
+        return {}
+    if not os.path.isdir(os.path.join(sysdir, "queue")):
+        sysdir = os.path.dirname(sysdir)
+    limits = {}
+    for name in _QUEUE_LIMITS:
+        try:
+            with open(os.path.join(sysdir, "queue", name), encoding="utf-8") as limit:
+                limits[name] = int(limit.read().strip())
+        except (OSError, ValueError):
+            pass
+    return limits
+
+
+def shared_link(devname):
+    '''
+    The sysfs path of the link a block device shares with other drives:
+    its USB root hub, the SAS expander or host adapter (SATA/SAS/SCSI HBA)
+    above its SCSI host, or for NVMe and other PCIe storage the PCIe port
+    it hangs off below the root complex. "" when there is none to share —
+    image files and virtual devices (loop, device-mapper, md).
+    '''
+    parts = _sysfs_dir(devname).split("/")
+    if len(parts) < 5 or parts[2] != "devices" or parts[3] == "virtual":
+        return ""
+    for index, name in enumerate(parts):
+        if _USB_ROOT_HUB.fullmatch(name):
+            return "/".join(parts[:index + 1])
+    expanders = [index for index, name in enumerate(parts) if name.startswith("expander-")]
+    if expanders:
+        return "/".join(parts[:expanders[-1] + 1])
+    hosts = [index for index, name in enumerate(parts) if _STORAGE_HOST.fullmatch(name)]
+    functions = [index for index, name in enumerate(parts[:hosts[0] if hosts else None])
+                 if _PCI_ADDRESS.fullmatch(name)]
+    if hosts:
+        return "/".join(parts[:functions[-1] + 1] if functions else parts[:hosts[0]])
+    return "/".join(parts[:functions[0] + 1]) if functions else ""
+
+
+def link_label(link):
+    '''How a shared_link() path is shown: its last component, e.g. usb2.'''
+    return os.path.basename(link) if link else "—"
+
+
+def probe_blocksize(block, devname, devsize, engine, logfile):
+    '''
+    --blocksize auto: build a set of candidate sizes aligned to the queue
+    limits, time a short read-only pass over the start of the device for
+    each (caches evicted before every run, so each one reads the media),
+    and return (blocksize, [(size, MB/s), ...]). The smallest candidate
+    within 5% of the fastest wins — finer blocks cost nothing at that speed
+    and make rewrites and progress more granular. Nothing is written.
+    '''
+    limits = queue_limits(devname)
+    align = max(limits.get("physical_block_size", 0), engine.physical_sector)
+    candidates = {1 << shift for shift in range(16, 24)}       # 64 KiB - 8 MiB
+    optimal = limits.get("optimal_io_size", 0)
+    if optimal:
+        candidates |= {optimal * n for n in (1, 2, 4, 8)}
+    max_io = limits.get("max_sectors_kb", 0) * 1024
+    if max_io:
+        candidates.add(max_io)
+    candidates = sorted(size for size in candidates
+                        if size % align == 0 and size <= min(devsize, _PROBE_MAX_BLOCK))
+    if not candidates:
+        return _DEFAULT_BLOCKSIZE, []
+    logging(logfile, "Block size probe: queue limits " + (", ".join(
+        f"{name}={value}" for name, value in limits.items()) or "unavailable"))
+
+    span = min(devsize, _PROBE_BYTES)
+    results = []
+    with console.status("[dim]Probing block sizes (read-only)...[/]"):
+        # The first read after idle pays for spin-up and link wake; discard it
+        for _ in readahead(block, candidates[0], min(span, candidates[0] * 4), engine):
+            pass
+        for size in candidates:
+            flushcaches(block, engine)
+            readbytes = 0
+            starttime = time.perf_counter()
+            for dev_pos, view in readahead(block, size, span, engine):
+                readbytes = dev_pos + len(view)
+                if time.perf_counter() - starttime >= _PROBE_SECONDS:
+                    break
+            runtime = time.perf_counter() - starttime
+            results.append((size, readbytes / runtime / 1024 / 1024 if runtime > 0 else 0.0))
+    flushcaches(block, engine)
+
+    best = max(mbps for _, mbps in results)
+    blocksize = next(size for size, mbps in results if mbps >= best * 0.95)
+    for size, mbps in results:
+        logging(logfile, f"Block size probe: {size:,} bytes {mbps:.1f} MB/s"
+                + ("  <- selected" if size == blocksize else ""))
+    return blocksize, results
+
+
+class Journal:
+    '''
+    Crash-safe checkpoint journal for the software passes of --full, --zero,
+    --random, --smart and --plan. Records the device's path, serial and size, the operation,
+    the pass list, the pass in progress and the last offset known to be
+    durably written or verified, plus every resume of the run.
+
+    The journal is JSON, rewritten atomically (temp file, fsync, rename,
+    fsync of the directory) so a power loss leaves the previous checkpoint
+    or the new one — never a torn file. Before each checkpoint the device
+    itself is fdatasync'd so the recorded offset is really on the media.
+    '''
+    def __init__(self, path, state):
+        self.path  = path
+        self.state = state
+        self.saved = time.monotonic()
+
+    @classmethod
+    def create(cls, path, record, mode, passes, shards=1, seed="",
+               shard_align=_SHARD_ALIGN):
+        '''
+        Start a fresh journal for a run that has just been confirmed. With
+        --shards, offset holds one watermark per shard of a split on
+        shard_align boundaries; with --random, seed is the keystream seed in
+        hex, so a resumed run regenerates it.
+        '''
+        journal = cls(path, {
+            "version":   1,
+            "device":    record.device_path,
+            "serial":    record.serial,
+            "size":      record.device_size,
+            "mode":      mode,
+            "operation": record.operation,
+            "passes":    [_pass_name(kind, pattern) for kind, pattern in passes],
+            "pass":      0,
+            "offset":    0,
+            "shards":    shards,
+            "shard_align": shard_align,
+            "seed":      seed,
+            "complete":  False,
+            "started":   record.start_time,
+            "updated":   "",
+            "resumes":   [],
+        })
+        journal.save()
+        return journal
+
+    @classmethod
+    def load(cls, path):
+        '''Return the journal at path, or None if missing or unreadable.'''
+        import json as _json
+        try:
+            with open(path, encoding="utf-8") as jfile:
+                return cls(path, _json.load(jfile))
+        except (OSError, ValueError):
+            return None
+
+    def save(self):
+        '''Atomically replace the journal file with the current state.'''
+        import json as _json
+        self.state["updated"] = datetime.datetime.now(
+            datetime.timezone.utc).astimezone().isoformat(timespec='seconds')
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as jfile:
+            _json.dump(self.state, jfile, indent=2)
+            jfile.flush()
+            os.fsync(jfile.fileno())
+        os.replace(tmp_path, self.path)
+        dirfd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        try:
+            os.fsync(dirfd)
+        finally:
+            os.close(dirfd)
+        self.saved = time.monotonic()
+
+    def enter(self, index, offset):
+        '''Mark pass index as the one in progress, starting at offset.'''
+        self.state["pass"] = index
+        self.state["offset"] = offset
+        self.save()
+
+    def checkpoint(self, block, offset, force=False):
+        '''
+        Record offset as durably complete for the current pass. Cheap when
+        called per block: it only syncs and writes every _JOURNAL_INTERVAL
+        seconds unless force is set.
+        '''
+        if not force and time.monotonic() - self.saved < _JOURNAL_INTERVAL:
+            return
+        os.fdatasync(block)
+        self.state["offset"] = offset
+        self.save()
+
+    def finish(self):
+        '''Mark the run complete so it can no longer be resumed.'''
+        self.state["complete"] = True
+        self.state["pass"] = len(self.state["passes"])
+        self.state["offset"] = 0
+        self.save()
+
+
+def checkpoint(engine, block, offset):
+    '''Checkpoint offset in the engine's journal, if the run has one.'''
+    if engine is not None and engine.journal is not None:
+        engine.journal.checkpoint(block, offset)
+
+
+def _journal_path(logfile, devname):
+    '''
+    The journal lives next to the log (in the current directory without
+    one). Its name carries no timestamp so a later --resume run, whose
+    auto-named log will differ, still finds it.
+    '''
+    devshort = devname.replace('/', '_').strip('_')
+    directory = os.path.dirname(os.path.abspath(logfile)) if logfile else os.getcwd()
+    return os.path.join(directory, f"owl_journal_{devshort}.json")
+
+
+# Digest.reference() results, by (algorithm, pattern, length)
+_digest_references = {}
+
+
+class Digest:
+    '''
+    --digest: hashes of the bytes one verify pass actually read back, one
+    per _DIGEST_REGION-aligned region, and a root hash over those region
+    hashes in order. A region that was not read from end to end in this
+    run (it started before a --resume offset, or --tolerate-bad skipped an
+    unreadable block in it) is left out, and the summary says how many.
+
+    Hashing never holds up the read path. Each stream feeding the digest
+    gets a DigestStream: the verified block is copied into one of a small
+    ring of preallocated buffers and the stream carries on, while a worker
+    thread hashes the copies in order (hashlib drops the GIL for large
+    buffers, so the hashing really runs alongside the reads and compares).
+    Regions never span shards, so each is hashed by exactly one stream.
+    '''
+    def __init__(self, algorithm, devsize, pattern):
+        self.algorithm = algorithm
+        self.devsize   = devsize
+        self.pattern   = pattern
+        self.regions   = {}        # region index -> digest bytes
+
+    def new(self):
+        '''A fresh hash object of the chosen algorithm.'''
+        return hashlib.new(self.algorithm)
+
+    def stream(self, blocksize):
+        '''A DigestStream feeding this digest, with its own worker.'''
+        return DigestStream(self, blocksize)
+
+    def reference(self, length):
+        '''
+        The hash a region of length bytes of pattern should have. Computed
+        once per process for each algorithm, pattern and length.
+        '''
+        key = (self.algorithm, self.pattern, length)
+        if key not in _digest_references:
+            chunk = pattern_bytes(self.pattern, min(length, 4 * 1024 * 1024))
+            reference = self.new()
+            for pos in range(0, length, len(chunk)):
+                reference.update(memoryview(chunk)[:length - pos])
+            _digest_references[key] = reference.digest()
+        return _digest_references[key]
+
+    def root(self):
+        '''Hash over the region hashes in device order.'''
+        root = self.new()
+        for index in sorted(self.regions):
+            root.update(self.regions[index])
+        return root.hexdigest()
+
+    def report(self, logfile):
+        '''
+        Log every region hash and the root, and return the one-line summary
+        kept for the certificate. Regions are compared with the hash of a
+        pure pattern region of the same length, so the log shows at a
+        glance whether the read-back data was exactly the pattern. Random
+        data has no such reference; the verify pass itself compared every
+        byte with the keystream.
+        '''
+        label = pattern_label(self.pattern)
+        references = {}
+        differing = 0
+        for index in sorted(self.regions):
+            start = index * _DIGEST_REGION
+            length = min(_DIGEST_REGION, self.devsize - start)
+            matches = True
+            if self.pattern != "random":
+                if length not in references:
+                    references[length] = self.reference(length)
+                matches = self.regions[index] == references[length]
+            differing += not matches
+            logging(logfile, f"Digest {self.algorithm} {label} region {index} "
+                f"[{start:,}-{start + length:,}): {self.regions[index].hex()}"
+                + ("" if matches else "  (differs from the pattern)"))
+        regions = -(-self.devsize // _DIGEST_REGION)
+        summary = (f"{self.algorithm} root {self.root()} over {len(self.regions):,} of "
+                   f"{regions:,} regions of {_DIGEST_REGION // 1024 ** 3} GiB")
+        if differing:
+            summary += f"; {differing:,} differ from the {label} reference"
+        elif self.regions and self.pattern != "random":
+            summary += f", all matching the {label} reference"
+        if regions > len(self.regions):
+            summary += (f"; {regions - len(self.regions):,} not read end to end "
+                        "in this run (resumed or skipped)")
+        logging(logfile, f"Digest of verify {label}: {summary}")
+        return summary
+
+
+class DigestStream:
+    '''
+    One ordered stream of verified blocks into a Digest. update() copies a
+    block into a free ring buffer (waiting only if the worker has fallen
+    _DIGEST_DEPTH blocks behind) and queues it; close() drains the worker
+    and files the region hashes it finished.
+    '''
+    def __init__(self, digest, blocksize):
+        self.digest = digest
+        self.ring   = [bytearray(blocksize) for _ in range(_DIGEST_DEPTH)]
+        self.free   = queue.Queue()
+        self.work   = queue.Queue()
+        self.error  = None
+        for slot in range(_DIGEST_DEPTH):
+            self.free.put(slot)
+        self.worker = threading.Thread(target=self._run, name="owl-digest", daemon=True)
+        self.worker.start()
+
+    def update(self, dev_pos, view):
+        '''Queue a copy of view, read from dev_pos, for hashing.'''
+        slot = self.free.get()
+        length = len(view)
+        self.ring[slot][:length] = view
+        self.work.put((dev_pos, slot, length))
+
+    def close(self):
+        '''Wait for every queued block to be hashed.'''
+        self.work.put(None)
+        self.worker.join()
+        if self.error is not None:
+            raise self.error
+
+    def _run(self):
+        digest = self.digest
+        index, current, expect = None, None, None
+        try:
+            while True:
+                item = self.work.get()
+                if item is None:
+                    break
+                dev_pos, slot, length = item
+                view = memoryview(self.ring[slot])[:length]
+                while view:
+                    region = dev_pos // _DIGEST_REGION
+                    if region != index:
+                        self._file(index, current, expect)
+                        index, current = region, digest.new()
+                        expect = region * _DIGEST_REGION
+                    if dev_pos != expect:      # a gap: started late or skipped a block
+                        current = None
+                    take = min(len(view), (region + 1) * _DIGEST_REGION - dev_pos)
+                    if current is not None:
+                        current.update(view[:take])
+                    dev_pos += take
+                    expect = dev_pos
+                    view = view[take:]
+                self.free.put(slot)
+            self._file(index, current, expect)
+        except BaseException as exc:     # surfaced by close()
+            self.error = exc
+            # Keep handing buffers back so update() never blocks
+            while item is not None:
+                self.free.put(item[1])
+                item = self.work.get()
+
+    def _file(self, index, current, end):
+        '''Record the hash of region index if it was read from end to end.'''
+        if index is None or current is None:
+            return
+        if end == min((index + 1) * _DIGEST_REGION, self.digest.devsize):
+            self.digest.regions[index] = current.digest()
+
+
+def wipefail(block, position, blocksize, pattern, logfile, engine=None):
     '''
     Called when a read-back verification mismatch is detected.
     Attempts a single rewrite of the failed block. If that also fails
     (bad sector / I/O error), logs the failure and exits rather than
-    silently continuing over unwritable media.
+    silently continuing over unwritable media — unless --tolerate-bad is
+    set, in which case badsectors() isolates the failing sectors and the
+    pass carries on.
     '''
     console.print(f"\n[bold yellow]⚠ Write mismatch at position {position:,} — attempting rewrite...[/]")
     logging(logfile, f"Write failure detected in block at {position} - rewrite attempted")
-    if pattern == "00":
-        bytepattern = bytes(blocksize)
-    else:
-        bytepattern = bytes(blocksize).replace(b'\x00', b'\xff')
+    if engine is not None and engine.tolerate_bad:
+        badsectors(block, position, blocksize, pattern, logfile, engine)
+        return
+    bytepattern, expected = pattern_block(pattern, position, blocksize, engine)
+    readbuf = aligned_buffer(blocksize)
     try:
-        os.lseek(block, position, os.SEEK_SET)
-        os.write(block, bytepattern)
-        os.sync()
-        flushcaches()
-        os.lseek(block, position, os.SEEK_SET)
-        bytesin = os.read(block, blocksize)
+        devpwrite(block, bytepattern, position, engine)
+        flushcaches(block, engine)
+        bytesin = devpread(block, readbuf, blocksize, position, engine)
     except OSError as exc:
         msg = f"I/O error during rewrite at position {position}: {exc}"
         console.print(f"[bold red]✗ {msg}[/]")
         logging(logfile, msg)
         logging(logfile, "Exiting due to I/O error.")
         sys.exit(1)
-    if bytesin != bytepattern:
+    if expected != bytesin:
         msg = f"Re-write attempt failed at position {position} — sector may be bad."
         console.print(f"[bold red]✗ {msg}[/]")
         logging(logfile, msg)
@@ -464,41 +2457,143 @@ def wipefail(block, position, blocksize, pattern, logfile):
         sys.exit(1)
     return
 
-def drivemap(block, blocksize, devsize, logfile):
+
+def ioerror(block, position, length, pattern, logfile, engine, exc, kind):
+    '''
+    A pass's read or write of the block at position raised exc. Logs it and
+    exits, unless --tolerate-bad is set: then the block is handed to
+    badsectors() and the caller restarts its pipeline after the block.
+    '''
+    msg = f"I/O {kind} error at position {position}: {exc}"
+    console.print(f"[bold red]✗ {msg}[/]")
+    logging(logfile, msg)
+    if engine is None or not engine.tolerate_bad:
+        logging(logfile, "Exiting due to I/O error.")
+        sys.exit(1)
+    badsectors(block, position, length, pattern, logfile, engine)
+
+
+def _probe_range(block, position, length, pattern, engine):
+    '''Write pattern over one range and read it back: True if it holds.'''
+    readbuf = aligned_buffer(length)
+    source, expected = pattern_block(pattern, position, length, engine)
+    try:
+        devpwrite(block, source, position, engine)
+        flushcaches(block, engine)
+        return expected == devpread(block, readbuf, length, position, engine)
+    except OSError:
+        return False
+
+
+def badsectors(block, position, length, pattern, logfile, engine):
+    '''
+    --tolerate-bad: find which logical sectors of a failed block will not
+    take the pattern. The block is rewritten and verified as a whole, then
+    each failing range is split in half, on sector boundaries, until the
+    failures are single sectors. One bad sector in a 1 MiB block costs
+    about 2·log2(2048) small probes; the good sectors around it end up
+    written and verified like the rest of the pass. The failing ranges are
+    merged into engine.bad_extents (and the journal, so --resume keeps
+    them) and the caller continues after the block.
+    '''
+    sector = engine.logical_sector
+    failed = []
+    pending = [(position, position + length)]
+    while pending:
+        start, end = pending.pop()
+        if _probe_range(block, start, end - start, pattern, engine):
+            continue
+        if end - start <= sector:
+            failed.append((start, end))
+            continue
+        middle = start + max(sector, (end - start) // 2 // sector * sector)
+        pending += [(middle, end), (start, middle)]
+
+    if not failed:
+        msg = f"Block at position {position:,} rewritten and verified."
+        console.print(f"[yellow]↻ {msg}[/]")
+        logging(logfile, msg)
+        return
+
+    for start, end in _merge_extents(failed):
+        first, last = start // sector, (end - 1) // sector
+        lbas = f"{first}" if first == last else f"{first}-{last}"
+        msg = (f"Bad sectors: LBA {lbas} ({end - start:,} bytes at position "
+               f"{start:,}) will not hold {pattern_label(pattern)}")
+        console.print(f"[bold red]✗ {msg}[/]")
+        logging(logfile, msg)
+    with _engine_lock:
+        engine.bad_extents = _merge_extents(engine.bad_extents + failed)
+        if engine.journal is not None:
+            # Saved by the next checkpoint, which lies past these sectors
+            engine.journal.state["bad_extents"] = engine.bad_extents
+    logging(logfile, "Continuing past bad sectors (--tolerate-bad).")
+
+
+def _merge_extents(extents):
+    '''Sort [start, end) byte ranges and join any that touch or overlap.'''
+    merged = []
+    for start, end in sorted(tuple(extent) for extent in extents):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+def drivemap(block, blocksize, devsize, logfile, engine=None):
     '''
     --check / -c
     Quick mapping of the data on the drive for stats.
     '''
+    from rich.progress import (BarColumn, TextColumn, TimeRemainingColumn,
+        TaskProgressColumn)
     logging(logfile, "Drive mapping started")
-    cleancount = 0
-    dirtycount = 0
     keepmapping = False
-    nullbytes = bytes(blocksize)
-    os.lseek(block, 0, os.SEEK_SET)
-    flushcaches()
-
-    with Progress(
+    flushcaches(block, engine)
+    # Holes read as zeros: only the allocated extents are read
+    extents = sparse_extents(block, 0, devsize, logfile)
+    # One tally per stream: dirty bytes, those in all-0xFF blocks (erased
+    # flash, a --full pass), and the first dirty block seen
+    tallies = []
+
+    def maprange(first, end):
+        tally = {"dirty": 0, "erased": 0, "at": None}
+        tallies.append(tally)
+        for dev_pos, bytesin in readahead(block, blocksize, end, engine,
+                                          ranges=_clip(extents, first, end)):
+            kind = classify(bytesin, blocksize)
+            if kind != "00":
+                tally["dirty"] += len(bytesin)
+                if kind == "FF":
+                    tally["erased"] += len(bytesin)
+                if tally["at"] is None:
+                    tally["at"] = dev_pos
+            yield dev_pos + len(bytesin)
+        yield end
+
+    with make_progress(
         TextColumn("[bold cyan]{task.description}"),
         BarColumn(bar_width=None),
         TaskProgressColumn(),
         TimeRemainingColumn(),
-        TextColumn("[green]Clean: {task.fields[cleanpct]}"),
-        TextColumn("[red]Dirty: {task.fields[dirtypct]}"),
+        TextColumn("[green]Clean: {task.fields[clean]:.3%}"),
+        TextColumn("[red]Dirty: {task.fields[dirty]:.3%}"),
         console=console,
         transient=False,
     ) as progress:
-        task = progress.add_task("Drive map", total=devsize, cleanpct="0.000%", dirtypct="0.000%")
-
-        for dev_pos in range(0, devsize, blocksize):
-            if dev_pos + blocksize > devsize:
-                blocksize = devsize - dev_pos
-                nullbytes = bytes(blocksize)
-            bytesin = os.read(block, blocksize)
-
-            if bytesin == nullbytes:
-                cleancount += blocksize
-            else:
-                dirtycount += blocksize
+        task = progress.add_task("Drive map", total=devsize, clean=0.0, dirty=0.0)
+
+        scan = streams(engine, devsize, 0, maprange)
+        for done, _ in scan:
+            dirtycount = sum(tally["dirty"] for tally in tallies)
+            if dirtycount and not keepmapping:
+                dev_pos = min(tally["at"] for tally in tallies if tally["at"] is not None)
+                if _batch_events is not None:
+                    # No terminal to ask in a batch worker — map everything
+                    keepmapping = True
+                    logging(logfile, f"Non-clear sectors found in block starting at {dev_pos:,}")
+                    logging(logfile, "Batch mode: continuing mapping.")
                 if not keepmapping:
                     progress.stop()
                     logging(logfile, f"Non-clear sectors found in block starting at {dev_pos:,}")
@@ -512,12 +2607,19 @@ def drivemap(block, blocksize, devsize, logfile):
                         console.print("[bold red]Drive is not clear. Exiting.[/]")
                         logging(logfile, "User chose to terminate mapping.")
                         logging(logfile, "Drive mapped. Drive is dirty and contains non-clear sectors.")
+                        scan.close()    # stops any shards still reading
                         sys.exit()
 
-            cleanpct = f"{cleancount / devsize:.3%}"
-            dirtypct = f"{dirtycount / devsize:.3%}"
-            progress.update(task, completed=dev_pos + blocksize,
-                            cleanpct=cleanpct, dirtypct=dirtypct)
+            # Everything behind the read positions is scanned or a hole
+            progress.update(task, completed=done, clean=(done - dirtycount) / devsize,
+                            dirty=dirtycount / devsize)
+        dirtycount = sum(tally["dirty"] for tally in tallies)
+        erasedcount = sum(tally["erased"] for tally in tallies)
+        cleancount = devsize - dirtycount
+        progress.update(task, completed=devsize, clean=cleancount / devsize)
+
+    cleanpct = f"{cleancount / devsize:.3%}"
+    dirtypct = f"{dirtycount / devsize:.3%}"
 
     console.print()
     if dirtycount == 0:
@@ -527,9 +2629,92 @@ def drivemap(block, blocksize, devsize, logfile):
         console.print("[bold red]✗ Drive is not clear.[/]")
         logging(logfile, f"Drive mapped. Drive is dirty and contains non-nulled "
             f"data. {cleanpct} clean and {dirtypct} dirty ({dirtycount:,} bytes).")
+        if erasedcount:
+            console.print(f"[yellow]{erasedcount:,} bytes are in blocks of solid 0xFF.[/]")
+            logging(logfile, f"{erasedcount:,} of the dirty bytes are in blocks of "
+                "solid 0xFF (erased flash or an interrupted --full).")
 
 
 
+def wilson_interval(hits, trials, confidence):
+    '''
+    Wilson score interval for a binomial proportion: stays inside [0, 1]
+    and gives a useful upper bound when no hits were seen at all, which is
+    the common case when sampling a wiped drive.
+    '''
+    import statistics
+    if not trials:
+        return 0.0, 1.0
+    z = statistics.NormalDist().inv_cdf((1 + confidence) / 2)
+    phat = hits / trials
+    denom = 1 + z * z / trials
+    centre = (phat + z * z / (2 * trials)) / denom
+    spread = z * math.sqrt(phat * (1 - phat) / trials + z * z / (4 * trials * trials)) / denom
+    return max(0.0, centre - spread), min(1.0, centre + spread)
+
+
+def samplemap(block, blocksize, devsize, samples, confidence, logfile, record, engine=None):
+    '''
+    --check --sample N
+    Intake triage: read N blocks, one at a random offset inside each of N
+    equal strata of the device, and estimate the dirty fraction with a
+    Wilson confidence interval. Any dirty block proves the drive dirty; a
+    clean sample only bounds how much could have been missed. The result
+    is labelled as sampled in the log and certificate.
+    '''
+    from rich.progress import BarColumn, TextColumn, TaskProgressColumn
+    import random
+    blocks = -(-devsize // blocksize)
+    samples = min(samples, blocks)
+    seed = secrets.randbits(64)
+    rng = random.Random(seed)
+    positions = [rng.randrange(i * blocks // samples, (i + 1) * blocks // samples) * blocksize
+                 for i in range(samples)]
+    logging(logfile, f"Sampled drive map started: {samples:,} of {blocks:,} blocks, "
+            f"stratified, seed {seed:#018x}")
+    flushcaches(block, engine)
+
+    dirty = []
+    with make_progress(
+        TextColumn("[bold cyan]Sample map[/]"),
+        BarColumn(bar_width=None),
+        TaskProgressColumn(),
+        TextColumn("[red]{task.fields[dirty]} dirty"),
+        console=console,
+        transient=False,
+    ) as progress:
+        task = progress.add_task("Sample map", total=samples, dirty=0)
+        ranges = ((pos, min(pos + blocksize, devsize)) for pos in positions)
+        for done, (dev_pos, bytesin) in enumerate(
+                readahead(block, blocksize, devsize, engine, ranges=ranges), 1):
+            if classify(bytesin, blocksize) != "00":
+                dirty.append(dev_pos)
+                progress.update(task, dirty=len(dirty))
+            progress.update(task, completed=done)
+
+    low, high = wilson_interval(len(dirty), samples, confidence)
+    estimate = (f"{len(dirty):,} of {samples:,} sampled blocks dirty "
+                f"({len(dirty) / samples:.3%}); {confidence:.0%} confidence interval "
+                f"{low:.3%} – {high:.3%} of the device")
+    record.sampling = (f"{samples:,} of {blocks:,} blocks of {blocksize:,} bytes, "
+                       f"stratified random (seed {seed:#018x}). {estimate}.")
+    console.print()
+    if dirty:
+        console.print(f"[bold red]✗ Drive is not clear[/] (sampled): {estimate}.")
+        logging(logfile, f"Sampled drive map. Drive is dirty: {estimate}. "
+            f"First dirty blocks at {', '.join(f'{pos:,}' for pos in dirty[:8])}.")
+        record.notes = ("Sampled read-only check. Non-zero data was found, so the "
+                        "drive is not clear. Not a full scan.")
+    else:
+        console.print(f"[bold green]✓ No dirty blocks in the sample[/] — at most "
+                      f"{high:.3%} of the device is dirty at {confidence:.0%} confidence.")
+        logging(logfile, f"Sampled drive map. No dirty blocks found: {estimate}.")
+        record.notes = ("Sampled read-only check. No data was written. Only the sampled "
+                        "blocks were read: this bounds, but does not exclude, "
+                        "remaining data.")
+    logging(logfile, "Result is a statistical sample, not a full verification.")
+
+
 def command_line(cmd, cmdtimeout=None):
     '''
     subprocess helper
@@ -746,7 +2931,7 @@ def check_nvme_support(devname, mode, logfile):
     return ctrl
 
 
-def nvme_format(devname, block, blocksize, devsize, logfile):
+def nvme_format(devname, block, blocksize, devsize, logfile, engine=None):
     '''
     --nvme-format
     NVMe User Data Erase via nvme format --ses=1.
@@ -775,16 +2960,15 @@ def nvme_format(devname, block, blocksize, devsize, logfile):
 
     # Sync and flush before verify
     console.print("[dim]Syncing...[/]")
-    os.sync()
-    flushcaches()
+    flushcaches(block, engine)
 
     # Software verify pass — confirms the drive reads back as zeros
     console.print("[cyan]Running software verification pass (0x00)...[/]")
-    readloop(block, blocksize, devsize, "00", logfile)
+    readloop(block, blocksize, devsize, "00", logfile, engine)
     logging(logfile, "NVMe Format + software verify completed.")
 
 
-def nvme_sanitize(devname, block, blocksize, devsize, logfile):
+def nvme_sanitize(devname, block, blocksize, devsize, logfile, engine=None):
     '''
     --nvme-sanitize
     NVMe Block Erase via nvme sanitize --sanact=2.
@@ -801,6 +2985,7 @@ def nvme_sanitize(devname, block, blocksize, devsize, logfile):
 
     Not equivalent to --full for stuck-bit detection purposes.
     '''
+    from rich.progress import BarColumn, TextColumn
     logging(logfile, "NVMe Sanitize (Block Erase) started.")
     console.print("[cyan]Issuing NVMe Sanitize Block Erase (sanact=2)...[/]")
 
@@ -815,7 +3000,7 @@ def nvme_sanitize(devname, block, blocksize, devsize, logfile):
     console.print("[dim]Waiting for sanitize operation to complete...[/]")
     logging(logfile, "Polling nvme sanitize-log for completion...")
 
-    with Progress(
+    with make_progress(
         TextColumn("[bold cyan]Sanitizing"),
         BarColumn(bar_width=None),
         TextColumn("[dim]{task.fields[status]}"),
@@ -860,12 +3045,11 @@ def nvme_sanitize(devname, block, blocksize, devsize, logfile):
     logging(logfile, "NVMe Sanitize (Block Erase) completed.")
 
     console.print("[dim]Syncing...[/]")
-    os.sync()
-    flushcaches()
+    flushcaches(block, engine)
 
     # Software verify pass
     console.print("[cyan]Running software verification pass (0x00)...[/]")
-    readloop(block, blocksize, devsize, "00", logfile)
+    readloop(block, blocksize, devsize, "00", logfile, engine)
     logging(logfile, "NVMe Sanitize + software verify completed.")
 
 
@@ -874,7 +3058,7 @@ def _is_nvme(devname):
     return os.path.basename(devname).startswith('nvme')
 
 
-def hw_erase(devname, block, blocksize, devsize, logfile, hw_info=None):
+def hw_erase(devname, block, blocksize, devsize, logfile, hw_info=None, engine=None):
     '''
     --hw-erase
     Standard hardware erase, dispatched by device type:
@@ -889,21 +3073,20 @@ def hw_erase(devname, block, blocksize, devsize, logfile, hw_info=None):
     if _is_nvme(devname):
         logging(logfile, "hw-erase: NVMe device, using nvme format --ses=1")
         console.print("[dim]NVMe device detected — using NVMe User Data Erase.[/]")
-        nvme_format(devname, block, blocksize, devsize, logfile)
+        nvme_format(devname, block, blocksize, devsize, logfile, engine)
     else:
         logging(logfile, "hw-erase: ATA device, using hdparm --security-erase")
         console.print("[dim]ATA device detected — using ATA Security Erase.[/]")
         ataerase(devname, logfile, hw_info)
         # ATA standard erase typically writes zeros — run verify pass
         console.print("[dim]Syncing...[/]")
-        os.sync()
-        flushcaches()
+        flushcaches(block, engine)
         console.print("[cyan]Running software verification pass (0x00)...[/]")
-        readloop(block, blocksize, devsize, "00", logfile)
+        readloop(block, blocksize, devsize, "00", logfile, engine)
         logging(logfile, "ATA Erase + software verify completed.")
 
 
-def hw_secure(devname, block, blocksize, devsize, logfile, hw_info=None):
+def hw_secure(devname, block, blocksize, devsize, logfile, hw_info=None, engine=None):
     '''
     --hw-secure
     Thorough hardware erase reaching overprovisioned sectors,
@@ -928,11 +3111,11 @@ def hw_secure(devname, block, blocksize, devsize, logfile, hw_info=None):
         if bool(sanicap & 0b010):
             logging(logfile, "hw-secure: NVMe, using nvme sanitize (block erase)")
             console.print("[dim]NVMe device — using NVMe Block Erase (sanitize).[/]")
-            nvme_sanitize(devname, block, blocksize, devsize, logfile)
+            nvme_sanitize(devname, block, blocksize, devsize, logfile, engine)
         else:
             logging(logfile, "hw-secure: NVMe, falling back to nvme format --ses=1")
             console.print("[dim]NVMe device — using NVMe User Data Erase (format fallback).[/]")
-            nvme_format(devname, block, blocksize, devsize, logfile)
+            nvme_format(devname, block, blocksize, devsize, logfile, engine)
     else:
         logging(logfile, "hw-secure: ATA device, using hdparm --security-erase-enhanced")
         console.print("[dim]ATA device detected — using ATA Enhanced Security Erase.[/]")
@@ -941,28 +3124,91 @@ def hw_secure(devname, block, blocksize, devsize, logfile, hw_info=None):
         # be 0x00. Skipping software verify to avoid false mismatches.
         # This is noted in the certificate.
         console.print("[dim]Syncing...[/]")
-        os.sync()
-        flushcaches()
+        flushcaches(block, engine)
         console.print("[bold green]✓ ATA Enhanced Security Erase completed. "
             "Verify pass skipped (vendor-defined erase pattern).[/]")
         logging(logfile, "ATA Enhanced Security Erase completed. "
             "Verify pass skipped — erase pattern is vendor-defined, may not be 0x00.")
 
-def writeloop(block, blocksize, devsize, pattern, logfile):
+def zeroout(block, start, end):
     '''
-    Full disk write pass — writes a single byte pattern across the entire device.
+    Zero [start, end) with the BLKZEROOUT ioctl. The kernel issues Write
+    Zeroes / WRITE SAME where the device supports it (and otherwise writes
+    zero pages itself), so no data crosses from userspace, and it drops the
+    range from the page cache. Raises OSError if the ioctl fails — ENOTTY
+    for an image file.
     '''
-    logging(logfile, f"Writing 0x{pattern} to drive.")
-    color = "red" if pattern == "FF" else "cyan"
-    if pattern == "00":
-        writepattern = bytes(blocksize)
-    else:
-        writepattern = bytes(blocksize).replace(b'\x00', b'\xff')
-    os.lseek(block, 0, os.SEEK_SET)
+    fcntl.ioctl(block, _BLKZEROOUT, struct.pack('QQ', start, end - start))
+
+
+def zero_path(engine):
+    '''
+    Certificate wording for how the 0x00 data was written; "" when
+    --offload was not given or no 0x00 was written.
+    '''
+    if not engine.offload or not (engine.zeroed_offload or engine.zeroed_host):
+        return ""
+    if not engine.zeroed_host:
+        return "BLKZEROOUT offload (device Write Zeroes / WRITE SAME)"
+    if not engine.zeroed_offload:
+        return "host writes (BLKZEROOUT offload unavailable)"
+    return (f"BLKZEROOUT offload for {engine.zeroed_offload:,} bytes, "
+            f"host writes for {engine.zeroed_host:,} bytes")
+
+
+def tryzeroout(block, start, end, logfile, engine):
+    '''
+    Offload zeroing of [start, end) if --offload is on. Returns True when
+    BLKZEROOUT did it. A rejected range is reported and left to the caller
+    to write; once the ioctl is plainly unavailable (not a block device, or
+    unsupported) offload is switched off for the rest of the run.
+    '''
+    if engine is None or not engine.zeroout:
+        return False
+    try:
+        zeroout(block, start, end)
+    except OSError as exc:
+        unsupported = exc.errno in (errno.ENOTTY, errno.EOPNOTSUPP)
+        msg = (f"BLKZEROOUT {'not available' if unsupported else 'failed'} "
+               f"at position {start:,} ({exc.strerror}) — "
+               + ("using host writes." if unsupported else "writing this range from the host."))
+        console.print(f"[yellow]⚠ {msg}[/]")
+        logging(logfile, msg)
+        if unsupported:
+            engine.zeroout = False
+        return False
+    with _engine_lock:
+        engine.zeroed_offload += end - start
+    return True
+
+
+def zerooutloop(block, blocksize, devsize, logfile, engine, start=0):
+    '''
+    --offload 0x00 write pass: BLKZEROOUT over the device in _ZEROOUT_CHUNK
+    ranges, each falling back to host writes if the offload is refused.
+    '''
+    from rich.progress import (BarColumn, TextColumn, TimeRemainingColumn,
+        TaskProgressColumn)
+    logging(logfile, "Zeroing drive with BLKZEROOUT offload." if not start else
+            f"Zeroing drive with BLKZEROOUT offload from {_offset_text(start)}.")
+    writepattern = memoryview(pattern_buffer("00", blocksize))
+    offloaded = engine.zeroed_offload
+    resumed = _resumed_bytes(engine, devsize, start)
     starttime = time.time()
 
-    with Progress(
-        TextColumn(f"[bold {color}]Write 0x{pattern}[/]"),
+    def zerorange(first, end):
+        for region in range(first, end, _ZEROOUT_CHUNK):
+            stop = min(region + _ZEROOUT_CHUNK, end)
+            if tryzeroout(block, region, stop, logfile, engine):
+                yield stop
+                continue
+            yield from writepass(block, writepattern, stop, "00", logfile,
+                                 engine, start=region)
+            with _engine_lock:
+                engine.zeroed_host += stop - region
+
+    with make_progress(
+        TextColumn("[bold cyan]Zero 0x00[/] [dim](offload)[/]"),
         BarColumn(bar_width=None),
         TaskProgressColumn(),
         TimeRemainingColumn(),
@@ -970,47 +3216,63 @@ def writeloop(block, blocksize, devsize, pattern, logfile):
         console=console,
         transient=False,
     ) as progress:
-        task = progress.add_task(f"Write 0x{pattern}", total=devsize, mbps=0.0)
-        for dev_pos in range(0, devsize, blocksize):
-            if dev_pos + blocksize > devsize:
-                blocksize = devsize - dev_pos
-                if pattern == "00":
-                    writepattern = bytes(blocksize)
-                else:
-                    writepattern = bytes(blocksize).replace(b'\x00', b'\xff')
-            try:
-                os.write(block, writepattern)
-            except OSError as exc:
-                msg = f"I/O write error at position {dev_pos}: {exc}"
-                console.print(f"[bold red]✗ {msg}[/]")
-                logging(logfile, msg)
-                logging(logfile, "Exiting due to I/O error.")
-                sys.exit(1)
-            runtime = time.time() - starttime
-            mbps = (dev_pos + blocksize) / runtime / 1024 / 1024 if runtime > 0 else 0.0
-            progress.update(task, completed=dev_pos + blocksize, mbps=mbps)
+        task = progress.add_task("Zero 0x00 (offload)", total=devsize, completed=resumed)
+        for done, offset in streams(engine, devsize, start, zerorange):
+            checkpoint(engine, block, offset)
+            progress.update(task, completed=done)
 
+    os.fdatasync(block)
     runtime = time.time() - starttime
-    mbps = devsize / runtime / 1024 / 1024 if runtime > 0 else 0.0
+    mbps = (devsize - resumed) / runtime / 1024 / 1024 if runtime > 0 else 0.0
     runtimefmt = str(datetime.timedelta(seconds=math.floor(runtime)))
-    summary = f"Wrote 0x{pattern}: {devsize:,} bytes in {runtimefmt} @ {mbps:.2f} MB/s"
+    offloaded = engine.zeroed_offload - offloaded
+    summary = (f"Zeroed: {devsize - resumed:,} bytes in {runtimefmt} @ {mbps:.2f} MB/s "
+               f"({offloaded:,} by BLKZEROOUT, {devsize - resumed - offloaded:,} by host writes)")
     console.print(f"[bold green]✓[/] {summary}")
     logging(logfile, summary)
 
-def readloop(block, blocksize, devsize, pattern, logfile):
+
+def writepass(block, data, devsize, pattern, logfile, engine=None, start=0):
     '''
-    Full disk verify pass — reads back every block and checks against expected pattern.
+    writebehind() for the pass loops: yields the same watermarks, and on a
+    failed write hands the block at the watermark to ioerror(). That exits,
+    or under --tolerate-bad isolates the bad sectors, after which the
+    writes restart with the next block.
+    '''
+    blocksize = len(data)
+    while start < devsize:
+        watermark = start
+        try:
+            for watermark in writebehind(block, data, devsize, engine, start=start):
+                yield watermark
+            return
+        except OSError as exc:
+            length = min(blocksize, devsize - watermark)
+            ioerror(block, watermark, length, pattern, logfile, engine, exc, "write")
+            start = watermark + length
+            yield start
+
+
+def writeloop(block, blocksize, devsize, pattern, logfile, engine=None, start=0):
     '''
-    logging(logfile, f"Verifying 0x{pattern} on drive.")
-    if pattern == "00":
-        writepattern = bytes(blocksize)
+    Full disk write pass — writes a single byte pattern across the entire device,
+    or from start onwards when resuming. "random" writes engine.keystream.
+    '''
+    from rich.progress import (BarColumn, TextColumn, TimeRemainingColumn,
+        TaskProgressColumn)
+    label = pattern_label(pattern)
+    logging(logfile, f"Writing {label} to drive." if not start else
+            f"Writing {label} to drive from {_offset_text(start)}.")
+    color = {"FF": "red", "random": "magenta"}.get(pattern, "cyan")
+    if pattern == "random":
+        writepattern = KeystreamBlocks(engine.keystream, blocksize)
     else:
-        writepattern = bytes(blocksize).replace(b'\x00', b'\xff')
-    os.lseek(block, 0, os.SEEK_SET)
+        writepattern = memoryview(pattern_buffer(pattern, blocksize))
+    resumed = _resumed_bytes(engine, devsize, start)
     starttime = time.time()
 
-    with Progress(
-        TextColumn("[bold green]Verify 0x{task.fields[pat]}[/]"),
+    with make_progress(
+        TextColumn(f"[bold {color}]Write {label}[/]"),
         BarColumn(bar_width=None),
         TaskProgressColumn(),
         TimeRemainingColumn(),
@@ -1018,74 +3280,290 @@ def readloop(block, blocksize, devsize, pattern, logfile):
         console=console,
         transient=False,
     ) as progress:
-        task = progress.add_task(f"Verify 0x{pattern}", total=devsize, mbps=0.0, pat=pattern)
-        for dev_pos in range(0, devsize, blocksize):
-            if dev_pos + blocksize > devsize:
-                blocksize = devsize - dev_pos
-                if pattern == "00":
-                    writepattern = bytes(blocksize)
-                else:
-                    writepattern = bytes(blocksize).replace(b'\x00', b'\xff')
+        task = progress.add_task(f"Write {label}", total=devsize, completed=resumed)
+        # Progress follows the contiguous watermark, not the newest write
+        for done, offset in streams(engine, devsize, start, lambda first, end: writepass(
+                block, writepattern, end, pattern, logfile, engine, start=first)):
+            checkpoint(engine, block, offset)
+            progress.update(task, completed=done)
+
+    # O_DIRECT skips the page cache but not the drive's own write cache;
+    # flush it so the pass is durable before anything reads it back.
+    if engine is not None and engine.name == "direct":
+        os.fsync(block)
+
+    runtime = time.time() - starttime
+    mbps = (devsize - resumed) / runtime / 1024 / 1024 if runtime > 0 else 0.0
+    runtimefmt = str(datetime.timedelta(seconds=math.floor(runtime)))
+    summary = f"Wrote {label}: {devsize - resumed:,} bytes in {runtimefmt} @ {mbps:.2f} MB/s"
+    console.print(f"[bold green]✓[/] {summary}")
+    logging(logfile, summary)
+    if pattern == "random":
+        engine.keystream.rates.append(f"written @ {mbps:.2f} MB/s")
+
+def verifyrange(block, blocksize, end, pattern, logfile, engine=None, start=0,
+                digest=None):
+    '''
+    Verify [start, end) against pattern, yielding the watermark after each
+    block. Reads run ahead in a worker; blocks still arrive here in order.
+    A mismatch goes to wipefail() and a read error to ioerror(). With a
+    Digest, every block read is also queued for hashing as it was read.
+    Random data is compared with the keystream regenerated for each offset.
+    '''
+    keys = expected = None
+    if pattern == "random":
+        keys = engine.keystream.blocks(start, end, blocksize)
+    else:
+        expected = pattern_bytes(pattern, blocksize)
+    reads = readahead(block, blocksize, end, engine, start=start)
+    hashing = digest.stream(blocksize) if digest is not None else None
+    try:
+        for dev_pos in range(start, end, blocksize):
+            length = min(blocksize, end - dev_pos)
+            if keys is not None:
+                _, expected = next(keys)
+            elif length != len(expected):
+                expected = pattern_bytes(pattern, length)
             try:
-                bytesin = os.read(block, blocksize)
+                _, bytesin = next(reads)
             except OSError as exc:
-                msg = f"I/O read error at position {dev_pos}: {exc}"
-                console.print(f"[bold red]✗ {msg}[/]")
-                logging(logfile, msg)
-                logging(logfile, "Exiting due to I/O error.")
-                sys.exit(1)
-            if bytesin != writepattern:
-                wipefail(block, dev_pos, blocksize, pattern, logfile)
-            runtime = time.time() - starttime
-            mbps = (dev_pos + blocksize) / runtime / 1024 / 1024 if runtime > 0 else 0.0
-            progress.update(task, completed=dev_pos + blocksize, mbps=mbps)
+                ioerror(block, dev_pos, length, pattern, logfile, engine, exc, "read")
+                reads = readahead(block, blocksize, end, engine, start=dev_pos + length)
+            else:
+                if hashing is not None:
+                    hashing.update(dev_pos, bytesin)
+                if expected != bytesin:
+                    wipefail(block, dev_pos, length, pattern, logfile, engine)
+            yield dev_pos + length
+    finally:
+        if hashing is not None:
+            hashing.close()
+
+
+def readloop(block, blocksize, devsize, pattern, logfile, engine=None, start=0):
+    '''
+    Full disk verify pass — reads back every block and checks against expected pattern.
+    '''
+    from rich.progress import (BarColumn, TextColumn, TimeRemainingColumn,
+        TaskProgressColumn)
+    label = pattern_label(pattern)
+    logging(logfile, f"Verifying {label} on drive." if not start else
+            f"Verifying {label} on drive from {_offset_text(start)}.")
+    resumed = _resumed_bytes(engine, devsize, start)
+    digest = None
+    if engine is not None and engine.digest:
+        digest = Digest(engine.digest, devsize, pattern)
+    if engine is not None:
+        engine.profile = RegionProfile(f"verify {label}", devsize, blocksize)
+    starttime = time.time()
+
+    with make_progress(
+        TextColumn("[bold green]Verify {task.fields[pat]}[/]"),
+        BarColumn(bar_width=None),
+        TaskProgressColumn(),
+        TimeRemainingColumn(),
+        TextColumn("[dim]{task.fields[mbps]:.2f} MB/s"),
+        console=console,
+        transient=False,
+    ) as progress:
+        task = progress.add_task(f"Verify {label}", total=devsize, completed=resumed,
+                                 pat=label)
+        try:
+            for done, offset in streams(engine, devsize, start, lambda first, end: verifyrange(
+                    block, blocksize, end, pattern, logfile, engine, start=first,
+                    digest=digest)):
+                checkpoint(engine, block, offset)
+                progress.update(task, completed=done)
+        finally:
+            profile = engine.profile if engine is not None else None
+            if profile is not None:
+                engine.profile = None
+                engine.profiles.append(profile.summary())
+                logging(logfile, f"Profile {profile.label}: {profile_text(engine.profiles[-1])}")
 
     runtime = time.time() - starttime
-    mbps = devsize / runtime / 1024 / 1024 if runtime > 0 else 0.0
+    mbps = (devsize - resumed) / runtime / 1024 / 1024 if runtime > 0 else 0.0
     runtimefmt = str(datetime.timedelta(seconds=math.floor(runtime)))
-    summary = f"Verified 0x{pattern}: {devsize:,} bytes in {runtimefmt} @ {mbps:.2f} MB/s"
+    summary = f"Verified {label}: {devsize - resumed:,} bytes in {runtimefmt} @ {mbps:.2f} MB/s"
     console.print(f"[bold green]✓[/] {summary}")
     logging(logfile, summary)
+    if pattern == "random":
+        engine.keystream.rates.append(f"verified @ {mbps:.2f} MB/s")
+    if digest is not None:
+        engine.digests.append(f"verify {label}: {digest.report(logfile)}")
+        console.print(f"[dim]Digest ({digest.algorithm}) root: {digest.root()}[/]")
+    if engine is not None and engine.profiles[-1]["slow"]:
+        console.print(f"[yellow]⚠ {len(engine.profiles[-1]['slow'])} slow zones under "
+                      f"{_SLOW_ZONE:.0%} of the median read rate — see the log.[/]")
+
 
 
+def _pass_name(kind, pattern):
+    '''Human-readable name of one pass, as recorded in the journal.'''
+    if kind == "smart":
+        return "smart"
+    if kind == "window":
+        return f"windowed {pattern}"
+    return f"{kind} {pattern}"
 
-def fulltest(block, blocksize, devsize, logfile):
+
+def windowpass(block, blocksize, devsize, window, logfile, engine=None, start=0):
     '''
-    --full / -f - check all bits flip both ways and verify
+    Windowed --full: write 0xFF, flush and verify, write 0x00, flush and
+    verify one window-sized region at a time, then move on. Every bit still
+    has to flip both ways, but the heads stay within one region instead of
+    sweeping the device four times, and an interrupted run leaves a
+    contiguous verified-clean prefix. Checkpoints fall on region boundaries.
     '''
-    logging(logfile, "Full drive double-wipe and verify started")
+    from rich.progress import (BarColumn, TextColumn, TimeRemainingColumn,
+        TaskProgressColumn)
+    logging(logfile, f"Windowed sweep of {window:,}-byte regions" +
+            (f" from offset {start:,}." if start else "."))
+    phases = (("write", "FF"), ("verify", "FF"), ("write", "00"), ("verify", "00"))
+    writebufs = {pattern: memoryview(pattern_buffer(pattern, blocksize))
+                 for pattern in ("FF", "00")}
+    regions = 0
+    starttime = time.time()
 
-    writeloop(block, blocksize, devsize, "FF", logfile)
-    console.print("[dim]Syncing...[/]")
-    os.sync()
-    flushcaches()
+    with make_progress(
+        TextColumn("[bold magenta]Window FF/00[/]"),
+        BarColumn(bar_width=None),
+        TaskProgressColumn(),
+        TimeRemainingColumn(),
+        TextColumn("[dim]{task.fields[phase]:>9}"),
+        TextColumn("[dim]{task.fields[mbps]:.2f} MB/s"),
+        console=console,
+        transient=False,
+    ) as progress:
+        task = progress.add_task("Window FF/00", total=devsize, completed=start,
+                                 rate_scale=len(phases), phase="")
+
+        def show(region, end, index, phase_pos):
+            # The bar advances a quarter of the region per phase
+            progress.update(task, completed=region + ((end - region) * index
+                                                      + phase_pos - region) // len(phases))
+
+        for region in range(start, devsize, window):
+            end = min(region + window, devsize)
+            for index, (kind, pattern) in enumerate(phases):
+                progress.update(task, phase=f"{kind} {pattern}")
+                if kind == "write" and pattern == "00" and tryzeroout(block, region,
+                                                                      end, logfile, engine):
+                    show(region, end, index, end)
+                elif kind == "write":
+                    for watermark in writepass(block, writebufs[pattern], end, pattern,
+                                               logfile, engine, start=region):
+                        show(region, end, index, watermark)
+                    if engine is not None and engine.name == "direct":
+                        os.fsync(block)
+                    if pattern == "00" and engine is not None and engine.offload:
+                        with _engine_lock:
+                            engine.zeroed_host += end - region
+                else:
+                    flushcaches(block, engine)
+                    evictcheck(block, region, end, logfile)
+                    for watermark in verifyrange(block, blocksize, end, pattern,
+                                                 logfile, engine, start=region):
+                        show(region, end, index, watermark)
+            regions += 1
+            checkpoint(engine, block, end)
+            progress.update(task, completed=end)
 
-    readloop(block, blocksize, devsize, "FF", logfile)
+    runtime = time.time() - starttime
+    runtimefmt = str(datetime.timedelta(seconds=math.floor(runtime)))
+    mbps = (devsize - start) * len(phases) / runtime / 1024 / 1024 if runtime > 0 else 0.0
+    summary = (f"Windowed sweep complete: {regions} regions, {devsize - start:,} bytes "
+               f"written and verified as 0xFF and 0x00 in {runtimefmt} @ {mbps:.2f} MB/s")
+    console.print(f"[bold green]✓[/] {summary}")
+    logging(logfile, summary)
 
-    writeloop(block, blocksize, devsize, "00", logfile)
 
-    console.print("[dim]Syncing...[/]")
-    os.sync()
-    flushcaches()
+def runpasses(block, blocksize, devsize, passes, logfile, engine=None, window=None):
+    '''
+    Run a sequence of (kind, pattern) passes. With a resumed journal on the
+    engine, passes it records as done are skipped and the pass in progress
+    restarts from its last checkpoint. Caches are flushed before every
+    verify, including one that resumes part-way through, and by a "flush"
+    pass, which a pass plan step asks for after its write.
+    '''
+    journal = engine.journal if engine is not None else None
+    first, offset = 0, 0
+    if journal is not None:
+        first, offset = journal.state["pass"], journal.state["offset"]
+    prepare_patterns(passes, blocksize)
+
+    for index, (kind, pattern) in enumerate(passes):
+        if index < first:
+            logging(logfile, f"Skipping {_pass_name(kind, pattern)} — completed before resume.")
+            continue
+        start = offset if index == first else 0
+        if journal is not None:
+            journal.enter(index, start)
+        if kind == "flush":
+            console.print("[dim]Syncing...[/]")
+            flushcaches(block, engine)
+            logging(logfile, f"Flushed {pattern_label(pattern)} to the media.")
+            continue
+        if kind == "verify":
+            console.print("[dim]Syncing...[/]")
+            flushcaches(block, engine)
+            if evictcheck(block, start, devsize, logfile, engine) == 0:
+                logging(logfile, "Device page cache evicted before verify.")
+        with PassStats(engine, _pass_name(kind, pattern), logfile):
+            if kind == "write" and pattern == "00" and engine is not None and engine.zeroout:
+                zerooutloop(block, blocksize, devsize, logfile, engine, start=start)
+            elif kind == "write":
+                writeloop(block, blocksize, devsize, pattern, logfile, engine, start=start)
+            elif kind == "verify":
+                readloop(block, blocksize, devsize, pattern, logfile, engine, start=start)
+            elif kind == "window":
+                windowpass(block, blocksize, devsize, window, logfile, engine, start=start)
+            else:
+                checkblock(block, blocksize, devsize, logfile, engine, start=start)
+
+    if journal is not None:
+        journal.finish()
+
+
+def fulltest(block, blocksize, devsize, logfile, engine=None):
+    '''
+    --full / -f - check all bits flip both ways and verify
+    '''
+    logging(logfile, "Full drive double-wipe and verify started")
+    runpasses(block, blocksize, devsize, _FULL_PASSES, logfile, engine)
+    logging(logfile, "Double wipe and verify completed.")
+
+def randomtest(block, blocksize, devsize, logfile, engine=None):
+    '''
+    --random - random data written and verified, then zeroed and verified
+    '''
+    logging(logfile, "Random data wipe and verify started")
+    runpasses(block, blocksize, devsize, _RANDOM_PASSES, logfile, engine)
+    logging(logfile, "Random data and zero wipe with verify completed.")
 
-    readloop(block, blocksize, devsize, "00", logfile)
+def plantest(block, blocksize, devsize, passes, logfile, engine=None):
+    '''
+    --plan - run the passes of a built-in or custom pass plan
+    '''
+    logging(logfile, "Pass plan started: " + ", ".join(_pass_name(kind, pattern)
+                                                   for kind, pattern in passes))
+    runpasses(block, blocksize, devsize, passes, logfile, engine)
+    logging(logfile, "Pass plan completed.")
 
-    logging(logfile, "Double wipe and verify completed.")
+def windowtest(block, blocksize, devsize, window, logfile, engine=None):
+    '''
+    --full --window SIZE - the full double wipe, one region at a time
+    '''
+    logging(logfile, "Windowed double-wipe and verify started")
+    runpasses(block, blocksize, devsize, _WINDOW_PASSES, logfile, engine, window=window)
+    logging(logfile, "Windowed double wipe and verify completed.")
 
-def singlepass(block, blocksize, devsize, logfile):
+def singlepass(block, blocksize, devsize, logfile, engine=None):
     '''
     --zero / -z - write a null to every sector and then verify
     '''
     logging(logfile, "Single-pass null and verify started")
-
-    writeloop(block, blocksize, devsize, "00", logfile)
-
-    console.print("[dim]Syncing...[/]")
-    os.sync()
-    flushcaches()
-
-    readloop(block, blocksize, devsize, "00", logfile)
-
+    runpasses(block, blocksize, devsize, _ZERO_PASSES, logfile, engine)
     logging(logfile, "Single-pass null and verify completed. Drive is clear.")
 
 def rootcheck():
@@ -1102,15 +3580,22 @@ def cleanup():
     Rich handles cursor management during Progress blocks,
     but we restore it explicitly here as a final safety net.
     '''
-    # Raw escape intentional here — runs outside any rich context on exit
-    sys.stdout.write("\033[?25h")
-    sys.stdout.flush()
+    # Raw escape intentional here — runs outside any rich context on exit.
+    # Written to the console's own stream, so stdout stays pure JSON under
+    # --progress json and redirected output gets no stray escape.
+    if console.file.isatty():
+        console.file.write("\033[?25h")
+        console.file.flush()
 
 
 def prettyheader(devname, devsize, blocksize, logfile):
     '''
-    Styled startup banner using rich Panel and Table.
+    Styled startup banner using rich Panel and Table. blocksize is None
+    while --blocksize auto has yet to be probed.
     '''
+    from rich.panel import Panel
+    from rich.table import Table
+    from rich.text import Text
     owl = Text()
     owl.append("   , _ ,\n", style="bold yellow")
     owl.append("  ( o o )\n", style="bold yellow")
@@ -1126,7 +3611,7 @@ def prettyheader(devname, devsize, blocksize, logfile):
     info.add_column(style="white")
     info.add_row("Device:", devname)
     info.add_row("Size:", f"{devsize:,} bytes  ({devsize / 1024 / 1024 / 1024:.2f} GiB)")
-    info.add_row("Block size:", f"{blocksize:,} bytes")
+    info.add_row("Block size:", f"{blocksize:,} bytes" if blocksize else "auto (probed next)")
 
     console.print(Panel.fit(owl, border_style="yellow", padding=(0, 2)))
     console.print(info)
@@ -1137,7 +3622,8 @@ def prettyheader(devname, devsize, blocksize, logfile):
     logging(logfile, f"Command: {' '.join(sys.argv)}")
     logging(logfile, f"Device: {devname}")
     logging(logfile, f"Device size: {devsize:,} bytes")
-    logging(logfile, f"Block size set to {blocksize:,} bytes")
+    if blocksize:
+        logging(logfile, f"Block size set to {blocksize:,} bytes")
 
 
 def confirm_wipe(devname, devsize, operation, logfile):
@@ -1146,6 +3632,8 @@ def confirm_wipe(devname, devsize, operation, logfile):
     Displays a clear warning panel and requires the user to type the exact
     device path to proceed. Bails out on anything that doesn't match.
     '''
+    from rich.panel import Panel
+    from rich.text import Text
     size_gib = devsize / 1024 / 1024 / 1024
 
     warning = Text()
@@ -1181,6 +3669,69 @@ def confirm_wipe(devname, devsize, operation, logfile):
     logging(logfile, f"Wipe confirmed by user. Starting {operation}.")
 
 
+def confirm_batch(jobs, operation, links):
+    '''
+    Safety gate for a multi-device run. Lists every device with its model,
+    serial and size, and requires the operator to type the exact phrase
+    "WIPE <n> DEVICES" — one confirmation covering the whole batch, which is
+    logged to every device's log.
+    '''
+    from rich.panel import Panel
+    from rich.table import Table
+    from rich.text import Text
+    from rich import box
+    total = sum(job.devsize for job in jobs)
+    phrase = f"WIPE {len(jobs)} DEVICES"
+
+    table = Table(box=box.SIMPLE, header_style="bold white")
+    table.add_column("Device",  style="bold yellow", no_wrap=True)
+    table.add_column("Model",   style="white")
+    table.add_column("Serial",  style="bold white")
+    table.add_column("Size",    style="yellow", justify="right", no_wrap=True)
+    table.add_column("Link",    style="cyan",   no_wrap=True)
+    for job in jobs:
+        table.add_row(job.devname, job.record.model, job.record.serial,
+                      f"{job.devsize / 1024 / 1024 / 1024:.2f} GiB",
+                      link_label(links[job.devname]))
+
+    warning = Text()
+    warning.append("  ⚠  WARNING: DESTRUCTIVE BATCH OPERATION  ⚠\n\n", style="bold red")
+    warning.append("Operation : ", style="bold white")
+    warning.append(f"{operation}\n", style="bold yellow")
+    warning.append("Devices   : ", style="bold white")
+    warning.append(f"{len(jobs)}  ({total / 1024 / 1024 / 1024:.2f} GiB total)\n\n",
+                   style="bold yellow")
+    warning.append("ALL DATA ON EVERY DEVICE LISTED BELOW WILL BE PERMANENTLY DESTROYED.\n",
+                   style="bold red")
+    warning.append("This action cannot be undone.", style="red")
+
+    console.print(Panel(warning, border_style="bold red", padding=(1, 2)))
+    console.print(table)
+    console.print(f"[bold]To confirm, type [yellow]{phrase}[/yellow] exactly:[/] ", end="")
+
+    try:
+        response = input()
+    except (EOFError, KeyboardInterrupt):
+        console.print("\n[bold red]Aborted.[/]")
+        for job in jobs:
+            logging(job.logfile, "Batch confirmation aborted by user (EOF/interrupt).")
+        sys.exit(1)
+
+    if response.strip() != phrase:
+        console.print(f"\n[bold red]✗ Input did not match '{phrase}'. Aborting.[/]\n")
+        for job in jobs:
+            logging(job.logfile, f"Batch confirmation failed. User entered "
+                f"'{response.strip()}' instead of '{phrase}'. Aborting.")
+        sys.exit(1)
+
+    console.print(f"[bold green]✓ Confirmed. Starting {operation} on "
+        f"{len(jobs)} devices...[/]\n")
+    serials = ", ".join(f"{job.devname} ({job.record.serial})" for job in jobs)
+    for job in jobs:
+        logging(job.logfile, f"Batch wipe confirmed by user for {len(jobs)} devices: "
+            f"{serials}. Starting {operation}.")
+
+
 def list_devices():
     '''
     --list
@@ -1188,6 +3739,9 @@ def list_devices():
     Uses blkinfo as the primary source; falls back to parsing lsblk output
     if blkinfo raises or returns nothing.
     '''
+    from blkinfo import BlkDiskInfo
+    from rich.table import Table
+    from rich import box
     console.print()
 
     try:
@@ -1211,6 +3765,7 @@ def list_devices():
         table.add_column("Serial",     style="dim white")
         table.add_column("Transport",  style="cyan",        no_wrap=True)
         table.add_column("Size",       style="green",       justify="right", no_wrap=True)
+        table.add_column("Link",       style="dim cyan",    no_wrap=True)
         table.add_column("Mounted",    style="yellow",      no_wrap=True)
 
         for disk in disks:
@@ -1235,7 +3790,10 @@ def list_devices():
             else:
                 mounted_str = "[green]no[/]"
 
-            table.add_row(devname, model, vendor, serial, transport, size_str, mounted_str)
+            link = link_label(shared_link(devname))
+
+            table.add_row(devname, model, vendor, serial, transport, size_str, link,
+                          mounted_str)
 
         console.print(table)
 
@@ -1373,14 +3931,17 @@ def capture_smart(devname, logfile):
     return result
 
 
-def parse_arguments():
+def parse_arguments(argv=None):
     '''
-    handle command line args
+    handle command line args (sys.argv, or argv for a --serve job)
     '''
     arghelpdesc = ("Health check, sterilization, verification, and logging for"
         " data storage devices.")
     parser = argparse.ArgumentParser(description=arghelpdesc)
-    parser.add_argument("target", help="Path to block device", nargs="?", default=None)
+    parser.add_argument("target", nargs="*", default=None,
+        help="Path to block device. Several devices (or a quoted glob such as "
+             "'/dev/sd[b-m]') are processed concurrently, one worker process "
+             "per device, after a single batch confirmation")
     parser.add_argument("-f", "--full",
         help="Full double wipe and verify [default]",
         action="store_true")
@@ -1388,13 +3949,81 @@ def parse_arguments():
         action="store_true")
     parser.add_argument("-z", "--zero", help="Single pass of null bytes",
         action="store_true")
+    parser.add_argument("--random", action="store_true",
+        help="write a random keystream and verify it by regenerating it, then "
+             "zero and verify. Defeats controllers that compress or deduplicate "
+             "0x00/0xFF writes instead of programming the flash")
+    parser.add_argument("--seed", metavar="HEX",
+        help="keystream seed for --random (default: 32 fresh random bytes); "
+             "recorded in the log, the journal and the certificate")
+    parser.add_argument("--plan", metavar="PLAN",
+        help="run a pass plan: a built-in (" + ", ".join(_PASS_PLANS) + ") or "
+             "comma-separated steps PATTERN[:noverify][:flush], where PATTERN is "
+             "hex bytes repeated across the device or 'random', e.g. "
+             "'AA,55,00'. Steps are verified unless marked noverify")
     parser.add_argument("-c", "--check", help="verify media contains only nulls",
         action="store_true")
+    parser.add_argument("--sample", metavar="N",
+        help="with --check, read only N randomly placed blocks (one per equal "
+             "stratum of the device) and report the estimated dirty fraction "
+             "with a confidence interval. The result is labelled as sampled")
+    parser.add_argument("--confidence", metavar="PCT", default="95",
+        help="confidence level for --sample intervals, in percent (default: 95)")
     parser.add_argument("-l", "--logfile",
         help="Write/append timestamped log to FILE. If FILE is a directory, "
              "the log is auto-named as owl_log_<device>_<timestamp>.txt inside it.")
     parser.add_argument("-b", "--blocksize",
-        help="override default working blocksize")
+        help="override default working blocksize (bytes, rounded up to whole "
+             "sectors), or 'auto' to pick the fastest aligned size from the "
+             "device's queue limits and a short read-only probe")
+    parser.add_argument("--window", metavar="SIZE",
+        help="run the full double wipe one SIZE region at a time (e.g. 1G): "
+             "write 0xFF, verify, write 0x00, verify, then move on. Keeps "
+             "HDD heads local; an interrupted run leaves a clean prefix")
+    parser.add_argument("--offload", action="store_true",
+        help="zero with the BLKZEROOUT ioctl (Write Zeroes / WRITE SAME) instead "
+             "of host writes, for --zero and the 0x00 pass of --full; ranges "
+             "the device refuses fall back to host writes. Always verified")
+    parser.add_argument("--tolerate-bad", action="store_true", dest="tolerate_bad",
+        help="on a block that will not write or verify, bisect it down to the "
+             "failing logical sectors, log their LBAs and carry on instead of "
+             "exiting. The result is marked as not fully verified")
+    parser.add_argument("--engine", choices=_ENGINES, default="buffered",
+        help="I/O engine for software passes: 'buffered' (O_SYNC through the "
+             "page cache) [default] or 'direct' (O_DIRECT with page-aligned "
+             "buffers; block size is rounded up to the physical sector size)")
+    parser.add_argument("--queue-depth", dest="queue_depth", metavar="N",
+        help="keep N positional reads/writes in flight from a worker pool "
+             "(default: 1). NVMe drives typically need 16-64 to reach rated "
+             "throughput")
+    parser.add_argument("--digest", choices=_DIGESTS,
+        help="hash everything the verify passes read back (on a worker "
+             "thread, overlapping the reads): a hash per 1 GiB region and a "
+             "root hash over them, in the log and on the certificate")
+    parser.add_argument("--shards", metavar="N",
+        help="split each pass into N aligned ranges, each streamed by its "
+             "own worker, for SSDs that scale with concurrent streams. Every "
+             "shard finishes a pass before any starts the next")
+    parser.add_argument("--link-streams", metavar="N", dest="link_streams",
+        help="with several devices, run at most N streams at once on each "
+             "shared link (USB root hub, SAS expander, HBA or PCIe port, from "
+             "sysfs); the rest queue and start as devices on their link "
+             "finish. A device with --shards N counts N")
+    parser.add_argument("--profile", metavar="PATH",
+        help="write the verify passes' per-region throughput and latency "
+             "(1000 regions) to PATH as CSV (auto-named in a directory). "
+             "With --report it is written beside the certificate by default")
+    parser.add_argument("--io-appendix", action="store_true", dest="io_appendix",
+        help="add an appendix to the --report certificate with each pass's "
+             "request latency percentiles and device counters (always logged)")
+    parser.add_argument("--progress", choices=_PROGRESS_MODES, default="rich",
+        help="progress output: 'rich' bars on the terminal [default] or 'json' "
+             "newline-delimited events (on stdout, or --progress-file)")
+    parser.add_argument("--progress-file", metavar="PATH", dest="progress_file",
+        help="write --progress json events to PATH (a file or FIFO) instead "
+             "of stdout")
+    parser.add_argument("-q", "--quiet", action="store_true",
+        help="no progress display; messages, warnings and prompts still appear")
     parser.add_argument("--hw-erase",
         help="Hardware erase (ATA security-erase or NVMe format --ses=1, "
              "auto-detected) + software verify",
@@ -1406,8 +4035,17 @@ def parse_arguments():
              "verify pass. ATA enhanced security-erase skips software verify "
              "as the erase pattern is vendor-defined and may not be 0x00.",
         action="store_true", dest="hw_secure")
+    parser.add_argument("--resume",
+        help="continue an interrupted --full, --zero, --random, --smart or --plan run from its "
+             "checkpoint journal (owl_journal_<device>.json, kept next to the log)",
+        action="store_true")
     parser.add_argument("--list", help="List available block devices and exit",
         action="store_true")
+    parser.add_argument("--serve", metavar="SOCKET",
+        help="run as a wipe service taking jobs as JSON requests on the Unix "
+             "socket SOCKET (mode 0600): submit, list, status, watch, pause, "
+             "resume and cancel. Jobs share this process's warm imports, "
+             "pattern buffers and block size probe results")
     parser.add_argument("--report", help="Write a wipe certificate to this file path "
         "(auto-named if path is a directory or omitted with this flag)",
         metavar="PATH", default=None)
@@ -1415,12 +4053,17 @@ def parse_arguments():
         "(recorded in the certificate, requires --report)",
         metavar="NAME", default=None)
 
-    return parser.parse_args()
+    return parser.parse_args(argv)
 
 def logging(logfile, message):
     '''
     optional logging to file
     '''
+    if _batch_events is not None:
+        # Batch worker: the latest message is this device's status line
+        _batch_events.put(("status", _batch_device, message))
+    elif _progress_mode == "json":
+        progress_event("log", _progress_device, message=message)
     if logfile is None:
         return
     with open(logfile, "a", encoding="utf-8") as log:
@@ -1434,6 +4077,8 @@ def diskinfo(devname, logfile):
     block device paths) rather than crashing with an IndexError.
     Returns a dict of disk fields, or an empty dict if info is unavailable.
     '''
+    from blkinfo import BlkDiskInfo
+    from rich.table import Table
     try:
         blk = BlkDiskInfo()
         filters = { 'name' : devname[5:] } # trim /dev/ to make shortname 'sdx'
@@ -1491,11 +4136,12 @@ def mountcheck(blkdata, logfile, mountct):
 # Maps each operation label to its NIST SP 800-88r2 standard classification.
 # Auto-populated on the certificate for every operation.
 _WIPE_STANDARDS = {
-    "Full Double Wipe + Verify (FF then 00)":                     "Two-pass overwrite (0xFF / 0x00) with verification — meets NIST SP 800-88r2 Clear; designed for stuck-bit detection",
+    **{plan.operation: plan.standard for plan in _PASS_PLANS.values()},
     "Full Double Wipe + Verify (FF then 00) [default]":           "Two-pass overwrite (0xFF / 0x00) with verification — meets NIST SP 800-88r2 Clear; designed for stuck-bit detection",
-    "Single-Pass Zero + Verify":                                  "NIST SP 800-88r2 — Clear",
+    "Full Double Wipe + Verify (FF then 00), windowed":           "Two-pass overwrite (0xFF / 0x00) with verification — meets NIST SP 800-88r2 Clear; designed for stuck-bit detection",
     "Smart Wipe (selective null overwrite)":                      "Non-standard (partial overwrite, selective sectors only)",
     "Drive Map / Null Check (read-only)":                         "N/A — read-only operation",
+    "Drive Map / Null Check (sampled, read-only)":                "N/A — read-only statistical sample, not a full verification",
     "Hardware Erase + Software Verify (NVMe format)":             "NIST SP 800-88r2 — Clear",
     "Hardware Erase + Software Verify (ATA security-erase)":      "NIST SP 800-88r2 — Clear",
     "Hardware Secure Erase + Software Verify (NVMe sanitize)":    "NIST SP 800-88r2 — Purge",
@@ -1504,75 +4150,166 @@ _WIPE_STANDARDS = {
 }
 
 
-def main():
+def parse_plan(text):
     '''
-    Entry point. Parses arguments, opens the device, and dispatches to the
-    appropriate wipe/check function.
+    Resolve --plan: the name of a built-in plan, or a custom plan written as
+    comma-separated steps PATTERN[:noverify][:flush], e.g. "AA,55:noverify,00".
+    PATTERN is hex bytes repeated across the device or "random"; steps are
+    verified unless marked noverify. Raises ValueError on a malformed plan.
     '''
-    args = parse_arguments()
+    if text in _PASS_PLANS:
+        return _PASS_PLANS[text]
+    steps = []
+    for item in text.split(","):
+        pattern, *options = item.strip().split(":")
+        pattern = pattern.strip()
+        if pattern.lower() == "random":
+            pattern = "random"
+        else:
+            pattern = pattern.upper().removeprefix("0X")
+            unit = bytes.fromhex(pattern) if pattern and len(pattern) % 2 == 0 else b""
+            if not unit or _PATTERN_PERIOD % len(unit):
+                raise ValueError(f"pattern '{item.strip()}' must be hex bytes whose count "
+                                 f"divides {_PATTERN_PERIOD}, or 'random'")
+        unknown = set(options) - {"verify", "noverify", "flush"}
+        if unknown:
+            raise ValueError(f"unknown step option '{sorted(unknown)[0]}' in '{item.strip()}'")
+        steps.append(PassStep(pattern, verify="noverify" not in options,
+                              flush="flush" in options))
+    steps = tuple(steps)
+    labels = [pattern_label(step.pattern) + ("" if step.verify else " (unverified)")
+              for step in steps]
+    if steps[-1].verify:
+        standard = (f"Custom {len(steps)}-pass overwrite ({' / '.join(labels)}), "
+                    "final pass verified — meets NIST SP 800-88r2 Clear")
+    else:
+        standard = (f"Custom {len(steps)}-pass overwrite ({' / '.join(labels)}), "
+                    "final pass not verified — non-standard")
+    return PassPlan("custom", f"Custom Pass Plan ({', '.join(labels)})", standard, steps)
 
-    # --list needs no target and no root — handle and exit immediately
-    if args.list:
-        list_devices()
-        sys.exit(0)
 
-    # All other operations require a target device
-    if args.target is None:
-        console.print("[bold red]ERROR: A target device is required. "
-            "Use --list to see available devices.[/]")
+def _plan(args):
+    '''The PassPlan --plan selects, or None; a malformed plan exits.'''
+    if not args.plan:
+        return None
+    try:
+        return parse_plan(args.plan)
+    except ValueError as exc:
+        console.print(f"[bold red]ERROR: --plan: {exc}.[/]")
         sys.exit(1)
 
-    devname = os.path.abspath(args.target)
-    if not os.path.exists(devname):
-        console.print(f"[bold red]ERROR: Target device {devname} not found. "
-            "Use --list to see available devices.[/]")
-        sys.exit(1)
 
-    logfile = args.logfile  # None if not provided by user
+def _operation(args):
+    '''
+    Return (mode, operation label) for the selected wipe flags, using the
+    same precedence main() has always applied when several are given.
+    A --plan naming the --full, --zero or --random plan runs that mode.
+    '''
+    plan = _plan(args)
+    if plan is not None:
+        if plan.name in _MODE_PASSES:
+            return plan.name, plan.operation
+        return "plan", plan.operation
+    if args.check and args.sample:
+        return "sample", "Drive Map / Null Check (sampled, read-only)"
+    if args.check:
+        return "check", "Drive Map / Null Check (read-only)"
+    if args.smart:
+        return "smart", "Smart Wipe (selective null overwrite)"
+    if args.zero:
+        return "zero", "Single-Pass Zero + Verify"
+    if args.random:
+        return "random", "Random Data + Zero Wipe + Verify"
+    if args.full or (args.window and not (args.hw_erase or args.hw_secure)):
+        if args.window:
+            return "window", "Full Double Wipe + Verify (FF then 00), windowed"
+        return "full", "Full Double Wipe + Verify (FF then 00)"
+    if args.hw_erase:
+        return "hw_erase", "Hardware Erase + Software Verify"
+    if args.hw_secure:
+        return "hw_secure", "Hardware Secure Erase + Software Verify"
+    return "full", "Full Double Wipe + Verify (FF then 00) [default]"
+
+
+def parse_size(text):
+    '''Parse a byte count with an optional K/M/G/T suffix (binary units).'''
+    text = text.strip().upper().rstrip('B').rstrip('I')
+    if text and text[-1] in _SIZE_UNITS:
+        return int(float(text[:-1]) * _SIZE_UNITS[text[-1]])
+    return int(text)
+
+
+def resolve_targets(patterns):
+    '''
+    Expand the target arguments into a de-duplicated list of absolute
+    device paths, in the order given. Shell globs arrive pre-expanded;
+    quoted globs (e.g. '/dev/sd[b-m]') are expanded here so the same command
+    line works from scripts that do not go through a shell.
+    '''
+    targets = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if glob.has_magic(pattern) else [pattern]
+        if not matches:
+            console.print(f"[bold red]ERROR: No devices match {pattern}. "
+                "Use --list to see available devices.[/]")
+            sys.exit(1)
+        for match in matches:
+            devname = os.path.abspath(match)
+            if not os.path.exists(devname):
+                console.print(f"[bold red]ERROR: Target device {devname} not found. "
+                    "Use --list to see available devices.[/]")
+                sys.exit(1)
+            if devname not in targets:
+                targets.append(devname)
+    return targets
 
-    # If a directory was given for --logfile, auto-name the file inside it
-    if logfile is not None and os.path.isdir(logfile):
+
+def _device_path(path, devname, prefix, ext, batch=False):
+    '''
+    Resolve a --logfile or --report argument for one device. A directory
+    gets an auto-named file inside it (<prefix>_<device>_<timestamp><ext>).
+    In a batch, a plain file path gets the device name appended before the
+    extension so every device keeps its own log and certificate.
+    '''
+    devshort = devname.replace('/', '_').strip('_')
+    if os.path.isdir(path):
         ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        devshort = devname.replace('/', '_').strip('_')
-        logfile = os.path.join(logfile, f"owl_log_{devshort}_{ts}.txt")
+        return os.path.join(path, f"{prefix}_{devshort}_{ts}{ext}")
+    if batch:
+        root, extension = os.path.splitext(path)
+        return f"{root}_{devshort}{extension}"
+    return path
 
-    # Determine operation label early for the record
-    if args.check:
-        operation = "Drive Map / Null Check (read-only)"
-    elif args.smart:
-        operation = "Smart Wipe (selective null overwrite)"
-    elif args.zero:
-        operation = "Single-Pass Zero + Verify"
-    elif args.full:
-        operation = "Full Double Wipe + Verify (FF then 00)"
-    elif args.hw_erase:
-        operation = "Hardware Erase + Software Verify"
-    elif args.hw_secure:
-        operation = "Hardware Secure Erase + Software Verify"
-    else:
-        operation = "Full Double Wipe + Verify (FF then 00) [default]"
 
-    # Auto-assign the wipe standard from the map
-    wipe_standard = _WIPE_STANDARDS.get(operation, "")
+def prepare_device(args, devname, logfile):
+    '''
+    Everything that happens before the confirmation prompt for one device:
+    open it, size it, build the I/O engine, print the header and disk info
+    (which also refuses mounted devices), and run hardware-erase pre-flight
+    checks. Returns a WipeJob ready for run_job().
+    '''
+    global _progress_device
+    _progress_device = devname
+    mode, operation = _operation(args)
+    plan = _plan(args)
+    passes = plan.passes() if mode == "plan" else _MODE_PASSES.get(mode, ())
 
     record = WipeRecord(
         operation=operation,
         command=' '.join(sys.argv),
         device_path=devname,
         operator_name=args.operator or "",
-        wipe_standard=wipe_standard,
+        wipe_standard=(plan.standard if plan is not None
+                       else _WIPE_STANDARDS.get(operation, "")),   # auto-assigned
     )
 
-    if args.operator and args.report is None:
-        console.print("[yellow]⚠ --operator was specified but --report was not. "
-            "The operator name will not be saved unless --report is also used.[/]")
-
-    atexit.register(cleanup)
-    rootcheck()
-
     # Direct access to disk to bypass cache, sync writes
+    if args.engine == "direct":
+        openflags = os.O_RDWR | os.O_DIRECT
+    else:
+        openflags = os.O_RDWR | os.O_SYNC
     try:
-        block = os.open(devname, os.O_RDWR | os.O_SYNC)
+        block = os.open(devname, openflags)
     except PermissionError:
         console.print(f"[bold red]ERROR: Permission denied opening {devname}. "
             "Are you running as root?[/]")
@@ -1587,21 +4324,125 @@ def main():
     os.lseek(block, 0, os.SEEK_SET)
     record.device_size = devsize
 
-    if args.blocksize:
+    blocksize = _DEFAULT_BLOCKSIZE
+    if args.blocksize and args.blocksize.lower() == "auto":
+        record.blocksize_source = "auto"
+    elif args.blocksize:
         try:
             blocksize = int(args.blocksize)
             if blocksize <= 0:
                 raise ValueError
         except ValueError:
-            console.print("[bold red]ERROR: --blocksize must be a positive integer.[/]")
+            console.print("[bold red]ERROR: --blocksize must be a positive integer or 'auto'.[/]")
+            sys.exit(1)
+        record.blocksize_source = "manual"
+
+    if args.queue_depth:
+        try:
+            queue_depth = int(args.queue_depth)
+            if queue_depth <= 0:
+                raise ValueError
+        except ValueError:
+            console.print("[bold red]ERROR: --queue-depth must be a positive integer.[/]")
             sys.exit(1)
     else:
-        blocksize = 4096 * 256  # default 1MB
+        queue_depth = 1
 
-    record.block_size = blocksize
+    shards = 1
+    if args.shards:
+        try:
+            shards = int(args.shards)
+            if shards <= 0:
+                raise ValueError
+        except ValueError:
+            console.print("[bold red]ERROR: --shards must be a positive integer.[/]")
+            sys.exit(1)
+        if mode in ("window", "sample"):
+            console.print("[yellow]⚠ --shards does not apply to --window or --sample "
+                "and is ignored.[/]")
+            shards = 1
 
-    prettyheader(devname, devsize, blocksize, logfile)
+    sample, confidence = 0, 0.95
+    if args.sample:
+        try:
+            sample = int(args.sample)
+            confidence = float(args.confidence) / 100
+            if sample <= 0 or not 0 < confidence < 1:
+                raise ValueError
+        except ValueError:
+            console.print("[bold red]ERROR: --sample must be a positive integer and "
+                "--confidence a percentage between 0 and 100.[/]")
+            sys.exit(1)
+        if mode != "sample":
+            console.print("[yellow]⚠ --sample applies only to --check and is ignored.[/]")
+            sample = 0
 
+    window = 0
+    if args.window:
+        try:
+            window = parse_size(args.window)
+            if window <= 0:
+                raise ValueError
+        except ValueError:
+            console.print("[bold red]ERROR: --window must be a positive size, e.g. 1G.[/]")
+            sys.exit(1)
+        if mode != "window":
+            console.print("[yellow]⚠ --window applies only to --full and is ignored.[/]")
+            window = 0
+
+    logical, physical = sector_sizes(block)
+    engine = IOEngine(name=args.engine, logical_sector=logical,
+                      physical_sector=physical, queue_depth=queue_depth,
+                      shards=shards, statpath=sysfs_stat(devname))
+    if any(pattern == "random" for _, pattern in passes):
+        try:
+            seed = bytes.fromhex(args.seed) if args.seed else secrets.token_bytes(_KEYSTREAM_SEED)
+            if not seed:
+                raise ValueError
+        except ValueError:
+            console.print("[bold red]ERROR: --seed must be a non-empty hex string.[/]")
+            sys.exit(1)
+        engine.keystream = Keystream(seed)
+    elif args.seed:
+        console.print("[yellow]⚠ --seed applies only to --random and plans with a "
+            "random step, and is ignored.[/]")
+    if args.offload:
+        if mode in ("zero", "full", "window", "random", "plan"):
+            engine.zeroout = engine.offload = True
+        else:
+            console.print("[yellow]⚠ --offload applies only to --zero and --full "
+                "and is ignored.[/]")
+    if args.digest:
+        if mode in ("zero", "full", "random", "plan", "hw_erase", "hw_secure"):
+            engine.digest = args.digest
+        else:
+            console.print("[yellow]⚠ --digest applies only to the verify passes of "
+                "--zero, --full, --random and the hardware erases, and is ignored.[/]")
+    if args.tolerate_bad:
+        if mode in ("zero", "full", "window", "random", "plan", "hw_erase", "hw_secure"):
+            engine.tolerate_bad = True
+        else:
+            console.print("[yellow]⚠ --tolerate-bad applies only to verified wipes "
+                "and is ignored.[/]")
+    # Whole sectors only: O_DIRECT needs physical-sector multiples, and a
+    # buffered block that straddles logical sectors only adds read-modify-write
+    sector = physical if engine.name == "direct" else logical
+    aligned = -(-blocksize // sector) * sector
+    if aligned != blocksize:
+        console.print(f"[yellow]⚠ Block size {blocksize:,} is not a multiple of the "
+            f"{sector:,}-byte {'physical' if engine.name == 'direct' else 'logical'} "
+            f"sector — using {aligned:,}.[/]")
+        blocksize = aligned
+    if engine.name == "direct":
+        # Image files need not end on a sector boundary; keep a buffered
+        # descriptor for that final partial block.
+        if devsize % logical:
+            engine.tailfd = os.open(devname, os.O_RDWR | os.O_SYNC)
+
+    # The header and disk info come first: diskinfo() refuses a mounted
+    # device, which the probe's reads and cache flushes must not touch
+    prettyheader(devname, devsize, None if record.blocksize_source == "auto" else blocksize,
+                 logfile)
     blkdata = diskinfo(devname, logfile)
     if blkdata:
         record.model     = str(blkdata.get('model',  '') or '—').strip()
@@ -1609,43 +4450,76 @@ def main():
         record.serial    = str(blkdata.get('serial', '') or '—').strip()
         record.transport = str(blkdata.get('tran',   '') or '—').strip()
 
-    # Capture SMART data before the wipe
-    if args.report is not None and not args.check:
-        console.print("[dim]Capturing pre-wipe SMART data...[/]")
-        record.smart_pre = capture_smart(devname, logfile)
-        record.smart_available = bool(record.smart_pre)
+    if record.blocksize_source == "auto":
+        probekey = (devname, devsize, engine.name, engine.queue_depth)
+        if probekey in _probe_cache:
+            blocksize, record.blocksize_probe = _probe_cache[probekey]
+            logging(logfile, "Block size probe: reusing this service's earlier result")
+        else:
+            blocksize, record.blocksize_probe = probe_blocksize(block, devname, devsize,
+                                                                engine, logfile)
+            _probe_cache[probekey] = (blocksize, record.blocksize_probe)
+            if _batch_events is not None:
+                # Lets a --serve service hand the result to later jobs
+                _batch_events.put(("probe", devname, (probekey, _probe_cache[probekey])))
+        if record.blocksize_probe:
+            console.print("[dim]Block size probe: " + ",  ".join(
+                f"{size // 1024:,} KiB {mbps:.0f} MB/s"
+                for size, mbps in record.blocksize_probe) + "[/]")
+        console.print(f"[cyan]Auto-tuned block size: {blocksize:,} bytes[/]")
+        logging(logfile, f"Block size set to {blocksize:,} bytes (auto-tuned)")
+
+    if window:
+        # Regions hold whole blocks so only the device's last one is short
+        window = -(-window // blocksize) * blocksize
+        record.notes = (f"Windowed sweep: 0xFF and 0x00 written and verified "
+                        f"per {window:,}-byte region.")
+
+    if engine.shards > 1:
+        # With --digest, boundaries fall on digest regions so none is split
+        engine.shard_align = _DIGEST_REGION if engine.digest else _SHARD_ALIGN
+        count = len(shard_ranges(devsize, engine.shards, engine.shard_align))
+        if count < engine.shards:
+            console.print(f"[yellow]⚠ The device splits into only {count} "
+                f"{engine.shard_align // (1024 * 1024):,} MiB-aligned shard(s); "
+                f"running {count}.[/]")
+            engine.shards = count
 
-    if args.check:
-        drivemap(block, blocksize, devsize, logfile)
-        record.success = True
-        record.notes   = "Read-only check. No data was written."
-    elif args.smart:
-        confirm_wipe(devname, devsize, operation, logfile)
-        checkblock(block, blocksize, devsize, logfile)
-        record.success = True
-    elif args.zero:
-        confirm_wipe(devname, devsize, operation, logfile)
-        singlepass(block, blocksize, devsize, logfile)
-        record.success = True
-    elif args.full:
-        confirm_wipe(devname, devsize, operation, logfile)
-        fulltest(block, blocksize, devsize, logfile)
-        record.success = True
-    elif args.hw_erase:
-        # Pre-flight before confirmation screen
+    record.block_size = blocksize
+    record.engine     = engine.name
+    if engine.queue_depth > 1:
+        record.engine += f", queue depth {engine.queue_depth}"
+    if engine.shards > 1:
+        record.engine += f", {engine.shards} shards"
+
+    logging(logfile, f"I/O engine: {engine.name}, queue depth {engine.queue_depth}"
+        + (f", {engine.shards} shards" if engine.shards > 1 else "")
+        + f" (logical sector {logical}, physical sector {physical})")
+    if engine.keystream is not None and not args.resume:
+        logging(logfile, f"Random data: SHAKE-128 keystream, seed {engine.keystream.seed.hex()}")
+
+    job = WipeJob(devname=devname, logfile=logfile, mode=mode, block=block,
+                  devsize=devsize, blocksize=blocksize, engine=engine,
+                  record=record, window=window, sample=sample,
+                  confidence=confidence, passes=passes)
+
+    journal_path = _journal_path(logfile, devname)
+    journal = Journal.load(journal_path) if passes else None
+    if args.resume:
+        resume_journal(job, journal, journal_path)
+    elif journal is not None and not journal.state.get("complete"):
+        console.print(f"[yellow]⚠ An interrupted run was found in {journal_path}. "
+            "Use --resume to continue it; starting over will replace it.[/]")
+
+    # Hardware erase pre-flight runs before any confirmation screen
+    if mode == "hw_erase":
         if _is_nvme(devname):
-            hw_info = check_nvme_support(devname, "format", logfile)
-            actual_op = "Hardware Erase + Software Verify (NVMe format)"
+            job.hw_info = check_nvme_support(devname, "format", logfile)
+            job.actual_op = "Hardware Erase + Software Verify (NVMe format)"
         else:
-            hw_info = check_ata_support(devname, "erase", logfile)
-            actual_op = "Hardware Erase + Software Verify (ATA security-erase)"
-        confirm_wipe(devname, devsize, operation, logfile)
-        hw_erase(devname, block, blocksize, devsize, logfile, hw_info)
-        record.success = True
-        record.operation = actual_op
-        record.wipe_standard = _WIPE_STANDARDS.get(actual_op, "")
-    elif args.hw_secure:
-        # Pre-flight before confirmation screen
+            job.hw_info = check_ata_support(devname, "erase", logfile)
+            job.actual_op = "Hardware Erase + Software Verify (ATA security-erase)"
+    elif mode == "hw_secure":
         if _is_nvme(devname):
             # Probe sanitize support; fall back gracefully
             import json as _json
@@ -1661,30 +4535,178 @@ def main():
                 except _json.JSONDecodeError:
                     pass
             if sanitize_ok:
-                hw_info = check_nvme_support(devname, "sanitize", logfile)
-                actual_op = "Hardware Secure Erase + Software Verify (NVMe sanitize)"
+                job.hw_info = check_nvme_support(devname, "sanitize", logfile)
+                job.actual_op = "Hardware Secure Erase + Software Verify (NVMe sanitize)"
             else:
                 console.print("[yellow]⚠ NVMe Block Erase (sanitize) not supported — "
                     "falling back to NVMe User Data Erase (format --ses=1).[/]")
                 logging(logfile, "hw-secure: sanitize not supported, "
                     "falling back to nvme format")
-                hw_info = check_nvme_support(devname, "format", logfile)
-                actual_op = "Hardware Secure Erase + Software Verify (NVMe format)"
+                job.hw_info = check_nvme_support(devname, "format", logfile)
+                job.actual_op = "Hardware Secure Erase + Software Verify (NVMe format)"
         else:
-            hw_info = check_ata_support(devname, "secure", logfile)
-            actual_op = "Hardware Secure Erase (ATA enhanced security-erase)"
-        confirm_wipe(devname, devsize, operation, logfile)
-        hw_secure(devname, block, blocksize, devsize, logfile, hw_info)
+            job.hw_info = check_ata_support(devname, "secure", logfile)
+            job.actual_op = "Hardware Secure Erase (ATA enhanced security-erase)"
+
+    return job
+
+
+def resume_journal(job, journal, journal_path):
+    '''
+    --resume: attach the journal of an interrupted run to the job's engine
+    after checking it describes this device and this operation. Any doubt
+    exits rather than guessing where to continue.
+    '''
+    devname, logfile, record = job.devname, job.logfile, job.record
+
+    def refuse(reason):
+        console.print(f"[bold red]ERROR: Cannot resume {devname}: {reason}[/]")
+        logging(logfile, f"ERROR: Cannot resume: {reason}")
+        sys.exit(1)
+
+    if not job.passes:
+        refuse("--resume applies only to --full, --zero, --random, --smart and --plan.")
+    if journal is None:
+        refuse(f"no readable journal at {journal_path}.")
+    state = journal.state
+    if state.get("complete"):
+        refuse(f"the run in {journal_path} already completed.")
+    if state.get("mode") != job.mode:
+        refuse(f"the journal records a {state.get('operation')} run, "
+               f"not {record.operation}.")
+    if state.get("size") != job.devsize:
+        refuse(f"device size {job.devsize:,} does not match the journal "
+               f"({state.get('size', 0):,} bytes).")
+    if state.get("serial") != record.serial:
+        refuse(f"serial {record.serial} does not match the journal "
+               f"({state.get('serial')}).")
+    if state.get("passes") != [_pass_name(kind, pattern) for kind, pattern in job.passes]:
+        refuse("the journal records a different pass plan: "
+               f"{', '.join(state.get('passes', []))}.")
+
+    passes = state["passes"]
+    position = (f"{passes[state['pass']]} at {_offset_text(state['offset'])}"
+                if state["pass"] < len(passes) else "final checkpoint")
+    now = datetime.datetime.now(datetime.timezone.utc).astimezone().isoformat(timespec='seconds')
+    state["resumes"].append(f"{now} — {position}")
+    journal.save()
+
+    record.start_time = state.get("started") or record.start_time
+    record.resume_events = list(state["resumes"])
+    job.engine.journal = journal
+    job.engine.bad_extents = state.get("bad_extents", [])
+    # The checkpoint offsets only make sense for the same split
+    shards = state.get("shards", 1)
+    if shards != job.engine.shards:
+        console.print(f"[yellow]⚠ Resuming with the journal's {shards} shard(s).[/]")
+        job.engine.shards = shards
+    # Journals without shard_align split on the 1 GiB digest regions
+    job.engine.shard_align = state.get("shard_align", _DIGEST_REGION)
+    # The random data still to verify was written with the journal's seed
+    if state.get("seed"):
+        if job.engine.keystream.seed.hex() != state["seed"]:
+            console.print("[yellow]⚠ Resuming with the journal's --random seed.[/]")
+        job.engine.keystream = Keystream(bytes.fromhex(state["seed"]))
+        logging(logfile, f"Random data: SHAKE-128 keystream, seed {state['seed']} (from journal)")
+    console.print(f"[bold yellow]↻ Resuming {record.operation} from {position}.[/]")
+    logging(logfile, f"Resuming from journal {journal_path}: {position}")
+
+
+def run_job(args, job, confirmed=False):
+    '''
+    Run the selected operation on a prepared device, then capture SMART
+    data and write the certificate. confirmed=True skips the per-device
+    prompt (a batch has already been confirmed as a whole). Returns the
+    completed WipeRecord.
+    '''
+    devname, logfile, record = job.devname, job.logfile, job.record
+    block, blocksize, devsize, engine = job.block, job.blocksize, job.devsize, job.engine
+
+    if job.mode not in _READ_ONLY_MODES and not confirmed:
+        confirm_wipe(devname, devsize, record.operation, logfile)
+
+    if job.passes and engine.journal is None:
+        engine.journal = Journal.create(_journal_path(logfile, devname), record,
+                                        job.mode, job.passes, engine.shards,
+                                        engine.keystream.seed.hex() if engine.keystream else "",
+                                        engine.shard_align)
+
+    # Capture SMART data before the wipe
+    if args.report is not None and job.mode not in _READ_ONLY_MODES:
+        console.print("[dim]Capturing pre-wipe SMART data...[/]")
+        record.smart_pre = capture_smart(devname, logfile)
+        record.smart_available = bool(record.smart_pre)
+
+    if job.mode == "sample":
+        with PassStats(engine, "sample", logfile):
+            samplemap(block, blocksize, devsize, job.sample, job.confidence, logfile,
+                      record, engine)
         record.success = True
-        record.operation = actual_op
-        record.wipe_standard = _WIPE_STANDARDS.get(actual_op, "")
-    else:
-        confirm_wipe(devname, devsize, operation, logfile)
-        fulltest(block, blocksize, devsize, logfile)
+    elif job.mode == "check":
+        with PassStats(engine, "check", logfile):
+            drivemap(block, blocksize, devsize, logfile, engine)
+        record.success = True
+        record.notes   = "Read-only check. No data was written."
+    elif job.mode == "smart":
+        runpasses(block, blocksize, devsize, _SMART_PASSES, logfile, engine)
+        record.success = True
+    elif job.mode == "zero":
+        singlepass(block, blocksize, devsize, logfile, engine)
+        record.success = True
+    elif job.mode == "full":
+        fulltest(block, blocksize, devsize, logfile, engine)
+        record.success = True
+    elif job.mode == "random":
+        randomtest(block, blocksize, devsize, logfile, engine)
+        record.success = True
+    elif job.mode == "plan":
+        plantest(block, blocksize, devsize, job.passes, logfile, engine)
+        record.success = True
+    elif job.mode == "window":
+        windowtest(block, blocksize, devsize, job.window, logfile, engine)
+        record.success = True
+    elif job.mode == "hw_erase":
+        with PassStats(engine, "hardware erase + verify", logfile):
+            hw_erase(devname, block, blocksize, devsize, logfile, job.hw_info, engine)
+        record.success = True
+        record.operation = job.actual_op
+        record.wipe_standard = _WIPE_STANDARDS.get(job.actual_op, "")
+    elif job.mode == "hw_secure":
+        with PassStats(engine, "hardware secure erase + verify", logfile):
+            hw_secure(devname, block, blocksize, devsize, logfile, job.hw_info, engine)
         record.success = True
+        record.operation = job.actual_op
+        record.wipe_standard = _WIPE_STANDARDS.get(job.actual_op, "")
+
+    record.zero_path = zero_path(engine)
+    if record.zero_path:
+        logging(logfile, f"0x00 written by {record.zero_path}")
+
+    record.digests = list(engine.digests)
+    if engine.keystream is not None:
+        engine.keystream.close()
+        record.random_data = "; ".join([f"SHAKE-128 keystream, seed {engine.keystream.seed.hex()}"]
+                                       + engine.keystream.rates)
+    record.io_stats = list(engine.iostats)
+    record.profiles = list(engine.profiles)
+
+    if engine.bad_extents:
+        sector = engine.logical_sector
+        record.bad_extents = [(start // sector, (end - 1) // sector)
+                              for start, end in engine.bad_extents]
+        badcount = sum(last - first + 1 for first, last in record.bad_extents)
+        record.notes = (f"NOT FULLY VERIFIED: {badcount:,} bad {sector}-byte sectors in "
+                        f"{len(record.bad_extents)} extents could not be written or "
+                        f"read back and were skipped. " + record.notes).strip()
+        console.print(f"[bold yellow]⚠ {badcount:,} bad sectors skipped — "
+                      "wipe is not fully verified.[/]")
+        logging(logfile, f"{badcount:,} bad sectors skipped; not fully verified. "
+                "Failing LBA ranges: " + ", ".join(
+                    f"{first}" if first == last else f"{first}-{last}"
+                    for first, last in record.bad_extents))
 
     # Capture SMART data after the wipe
-    if args.report is not None and record.success and not args.check:
+    if args.report is not None and record.success and job.mode not in _READ_ONLY_MODES:
         console.print("[dim]Capturing post-wipe SMART data...[/]")
         record.smart_post = capture_smart(devname, logfile)
 
@@ -1692,15 +4714,706 @@ def main():
 
     # Generate certificate if --report was requested
     if args.report is not None:
-        report_path = args.report
-        # If the user gave a directory, auto-name the file inside it
-        if os.path.isdir(report_path):
-            ts = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-            devshort = devname.replace('/', '_').strip('_')
-            report_path = os.path.join(report_path, f"owl_cert_{devshort}_{ts}.pdf")
-        generate_certificate(record, report_path, logfile)
+        job.report_path = _device_path(args.report, devname, "owl_cert", ".pdf",
+                                       batch=_batch_events is not None)
+
+    # Verify profile CSV: where --profile says, else beside the certificate
+    if record.profiles and (args.profile or job.report_path):
+        if args.profile:
+            profile_path = _device_path(args.profile, devname, "owl_profile", ".csv",
+                                        batch=_batch_events is not None)
+        else:
+            profile_path = os.path.splitext(job.report_path)[0] + "_profile.csv"
+        write_profiles(profile_path, record.profiles, logfile)
+
+    if args.report is not None:
+        generate_certificate(record, job.report_path, logfile,
+                             appendix=args.io_appendix)
+
+    if _progress_mode == "json" and _batch_events is None:
+        progress_event("result", devname, success=record.success, report=job.report_path,
+                       bad_extents=record.bad_extents, digests=record.digests,
+                       io_stats=record.io_stats)
 
     logging(logfile, "Exited")
+    return record
+
+
+def _batch_worker(args, job, events):
+    '''
+    Body of one batch worker process. Its terminal output is discarded —
+    progress and log lines travel to the parent over events — and the exit
+    status (0 success, 1 failure, 130 interrupted) reports the outcome.
+    '''
+    global console, _batch_events, _batch_device
+    from rich.console import Console
+    console = Console(file=open(os.devnull, "w", encoding="utf-8"), highlight=False)
+    _batch_events = events
+    _batch_device = job.devname
+    record = run_job(args, job, confirmed=True)
+    events.put(("done", job.devname, {"success": record.success,
+                                      "report": job.report_path}))
+    sys.exit(0 if record.success else 1)
+
+
+class LinkScheduler:
+    '''
+    Start order for a batch under --link-streams: devices are grouped by
+    the link they share (shared_link(); a device with none is a group of
+    its own) and each group runs at most cap streams at once, a device
+    with --shards N counting N. A device always starts on an idle link.
+    When one finishes, the next devices queued on its link start, in the
+    order given; other links are unaffected. cap 0 starts everything.
+    '''
+    def __init__(self, jobs, cap, links):
+        self.cap     = cap
+        self.links   = links
+        self.queued  = list(jobs)
+        self.streams = collections.Counter()
+
+    def ready(self):
+        '''Take the queued jobs that may start now, marking them running.'''
+        started, waiting = [], set()
+        for job in self.queued:
+            link = self.links[job.devname] or job.devname
+            if link in waiting:
+                continue
+            if self.cap and self.streams[link] and \
+                    self.streams[link] + job.engine.shards > self.cap:
+                waiting.add(link)       # keep the link's queue in order
+                continue
+            self.streams[link] += job.engine.shards
+            started.append(job)
+        self.queued = [job for job in self.queued if job not in started]
+        return started
+
+    def finished(self, job):
+        '''Release a finished job's streams on its link.'''
+        self.streams[self.links[job.devname] or job.devname] -= job.engine.shards
+
+
+def run_batch(args, targets):
+    '''
+    Multi-device run. Every device is prepared here in turn (header, disk
+    info, mount guard, pre-flight), one confirmation covers the batch, then
+    each device runs in its own worker process while this process draws a
+    single combined progress table. With --link-streams, devices sharing a
+    USB hub, HBA or PCIe port wait their turn on it (see LinkScheduler).
+    Each device keeps its own log and gets its own certificate. Exits 1 if
+    any device failed.
+    '''
+    from rich.progress import (Progress, BarColumn, TextColumn, TimeRemainingColumn,
+        TaskProgressColumn)
+    from rich.table import Table
+    from rich import box
+    link_streams = 0
+    if args.link_streams:
+        try:
+            link_streams = int(args.link_streams)
+            if link_streams <= 0:
+                raise ValueError
+        except ValueError:
+            console.print("[bold red]ERROR: --link-streams must be a positive integer.[/]")
+            sys.exit(1)
+
+    jobs = []
+    for devname in targets:
+        logfile = None
+        if args.logfile is not None:
+            logfile = _device_path(args.logfile, devname, "owl_log", ".txt", batch=True)
+        jobs.append(prepare_device(args, devname, logfile))
+
+    links = {job.devname: shared_link(job.devname) for job in jobs}
+    for job in jobs:
+        logging(job.logfile, f"Shared link: {links[job.devname] or 'none'}")
+    operation = jobs[0].record.operation
+    if jobs[0].mode not in _READ_ONLY_MODES:
+        confirm_batch(jobs, operation, links)
+    scheduler = LinkScheduler(jobs, link_streams, links)
+
+    # fork explicitly: each WipeJob carries the device descriptor opened
+    # here, which a forkserver or spawn child (the default from Python
+    # 3.14) would not inherit
+    context = multiprocessing.get_context("fork")
+    events = context.Queue()
+    workers = {}
+    outcome = {}
+    last_status = {}
+
+    # The combined table is the rich sink; JSON and --quiet runs go without
+    progress = Progress(
+        TextColumn("[bold white]{task.fields[device]}"),
+        TextColumn("[cyan]{task.description}"),
+        BarColumn(bar_width=None),
+        TaskProgressColumn(),
+        TimeRemainingColumn(),
+        TextColumn("[dim]{task.fields[mbps]}"),
+        TextColumn("{task.fields[status]}"),
+        console=console,
+        transient=False,
+        disable=_progress_mode != "rich",
+    )
+    with progress:
+        rows = {}
+        for job in jobs:
+            rows[job.devname] = progress.add_task("starting", total=job.devsize,
+                device=job.devname, mbps="", status="")
+
+        def launch():
+            for job in scheduler.ready():
+                worker = context.Process(target=_batch_worker,
+                    args=(args, job, events), name=f"owl-{os.path.basename(job.devname)}")
+                worker.start()
+                workers[job.devname] = worker
+            for job in scheduler.queued:
+                if job.devname not in last_status:
+                    last_status[job.devname] = f"queued on {link_label(links[job.devname])}"
+                    progress.update(rows[job.devname], description="queued",
+                                    status=f"[dim]{last_status[job.devname]}[/]")
+                    if _progress_mode == "json":
+                        progress_event("log", job.devname, message=last_status[job.devname])
+
+        launch()
+
+        def handle(kind, devname, payload):
+            row = rows[devname]
+            if _progress_mode == "json":
+                if kind in ("start", "progress", "end"):
+                    progress_event(kind, devname, payload)
+                elif kind == "status":
+                    progress_event("log", devname, message=payload)
+                elif kind == "done":
+                    progress_event("result", devname, **payload)
+            if kind in ("start", "progress", "end"):
+                progress.update(row, description=payload['description'],
+                    total=payload['total'], completed=payload['completed'],
+                    mbps=f"{payload['mbps']:.2f} MB/s")
+            elif kind == "status" and payload != "Exited":
+                last_status[devname] = payload[:48]
+                progress.update(row, status=f"[dim]{last_status[devname]}[/]")
+            elif kind == "done":
+                outcome[devname] = payload
+
+        def drain():
+            while True:
+                try:
+                    handle(*events.get_nowait())
+                except queue.Empty:
+                    break
+
+        finished = set()
+        while len(finished) < len(jobs):
+            try:
+                handle(*events.get(timeout=0.2))
+            except queue.Empty:
+                pass
+            exited = [job for job in jobs if job.devname in workers
+                      and job.devname not in finished
+                      and not workers[job.devname].is_alive()]
+            if not exited:
+                continue
+            drain()
+            for job in exited:
+                worker = workers[job.devname]
+                worker.join()
+                finished.add(job.devname)
+                scheduler.finished(job)
+                # Keep the device's final log line (e.g. clean/dirty) visible
+                final = last_status.get(job.devname, "")
+                if worker.exitcode == 0:
+                    progress.update(rows[job.devname], status=f"[bold green]✓[/] {final}")
+                else:
+                    progress.update(rows[job.devname],
+                        status=f"[bold red]✗ exit {worker.exitcode}[/] {final}")
+            launch()
+
+    summary = Table(title="Batch Summary", box=box.ROUNDED, border_style="cyan",
+                    header_style="bold cyan")
+    summary.add_column("Device", style="bold white", no_wrap=True)
+    summary.add_column("Serial", style="dim white")
+    summary.add_column("Result", no_wrap=True)
+    summary.add_column("Log", style="dim", overflow="fold")
+    summary.add_column("Certificate", style="dim", overflow="fold")
+    failed = 0
+    for job in jobs:
+        ok = workers[job.devname].exitcode == 0
+        failed += not ok
+        summary.add_row(job.devname, job.record.serial,
+            "[bold green]OK[/]" if ok else "[bold red]FAILED[/]",
+            job.logfile or "—", outcome.get(job.devname, {}).get("report") or "—")
+    console.print(summary)
+    if failed:
+        console.print(f"[bold red]✗ {failed} of {len(jobs)} devices failed.[/]")
+        sys.exit(1)
+    console.print(f"[bold green]✓ All {len(jobs)} devices completed.[/]")
+
+
+def _serve_worker(argv, events):
+    '''
+    Body of one --serve job. Forked from the service, so it starts with the
+    modules, shared pattern buffers and probe cache already in memory. It
+    reports over events like a batch worker, and leads its own process
+    group so pause and cancel reach its helper processes too.
+    '''
+    global console, _batch_events, _batch_device
+    from rich.console import Console
+    os.setpgid(0, 0)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    console = Console(file=open(os.devnull, "w", encoding="utf-8"), highlight=False,
+                      record=True)
+    sys.argv = ["wiper.py"] + argv
+    args = parse_arguments(argv)
+    devname = os.path.abspath(args.target[0])
+    _batch_events, _batch_device = events, devname
+    logfile = None
+    if args.logfile is not None:
+        logfile = _device_path(args.logfile, devname, "owl_log", ".txt", batch=True)
+    result = {"success": False, "report": "", "log": logfile}
+    code = 1
+    try:
+        job = prepare_device(args, devname, logfile)
+        if job.mode not in _READ_ONLY_MODES:
+            logging(logfile, f"Wipe confirmed by service client. Starting {job.record.operation}.")
+        record = run_job(args, job, confirmed=True)
+        result.update(success=record.success, report=job.report_path, record=asdict(record))
+        code = 0 if record.success else 1
+    except SystemExit as exc:
+        code = exc.code if isinstance(exc.code, int) else 1
+    # Errors and warnings only reach the console; pass the last lines on
+    lines = [line for line in console.export_text().splitlines() if line.strip()]
+    result["output"] = lines[-20:]
+    events.put(("done", devname, result))
+    sys.exit(code)
+
+
+def _target_identity(path):
+    '''
+    What makes two paths the same target: the device number of a block
+    device, so a /dev/disk/by-id link and the /dev/sdX it points to agree,
+    or the inode of an image file.
+    '''
+    st = os.stat(path)
+    if stat.S_ISBLK(st.st_mode):
+        return ("block", st.st_rdev)
+    return ("file", st.st_dev, st.st_ino)
+
+
+@dataclass
+class ServeJob:
+    '''
+    One job submitted to a --serve service: its arguments and target (see
+    _target_identity), the worker
+    process running it, its state (running, paused, done, failed or
+    cancelled), the latest progress event, recent log and state events for
+    late watchers, and the clients currently watching it.
+    '''
+    id: str
+    device: str
+    operation: str
+    argv: list
+    target: tuple       = ()
+    worker: object      = None
+    events: object      = None
+    state: str          = "running"
+    exitcode: Optional[int] = None
+    cancelled: bool     = False
+    progress: dict      = field(default_factory=dict)
+    history: object     = field(default_factory=lambda: collections.deque(maxlen=_SERVE_HISTORY))
+    watchers: list      = field(default_factory=list)
+    result: dict        = field(default_factory=dict)
+
+    def summary(self):
+        '''The job as a JSON object for list and status replies.'''
+        summary = {"job": self.id, "device": self.device, "operation": self.operation,
+                   "argv": self.argv, "state": self.state, "pid": self.worker.pid,
+                   "exit": self.exitcode}
+        for key in ("pass", "completed", "total", "mbps"):
+            if key in self.progress:
+                summary[key] = self.progress[key]
+        for key in ("success", "report", "log"):
+            if key in self.result:
+                summary[key] = self.result[key]
+        return summary
+
+
+class WipeService:
+    '''
+    --serve: a long-running wipe service. Clients connect to a Unix socket
+    and send one JSON request per line; each gets one JSON reply line, and
+    "watch" streams the job's events (as --progress json writes them) until
+    its result. Every job runs in a worker process forked from this one,
+    exactly as a batch worker runs, so its global state, Ctrl+C handling
+    and checkpoint journal behave as on the command line.
+    '''
+    _TERMINAL = ("done", "failed", "cancelled")
+
+    def __init__(self):
+        self.jobs    = {}
+        self.lock    = threading.Lock()
+        self.parsing = threading.Lock()
+        self.next_id = 1
+        # fork, not the platform default: forkserver or spawn would
+        # re-import everything per job, which is what the service avoids
+        self.context = multiprocessing.get_context("fork")
+
+    def request(self, message, send):
+        '''Answer one request with send(reply); "watch" may send many.'''
+        op = message.get("op")
+        if op == "submit":
+            send(self.submit(message))
+            return
+        if op == "list":
+            with self.lock:
+                send({"ok": True, "jobs": [job.summary() for job in self.jobs.values()]})
+            return
+        if op not in ("status", "watch", "pause", "resume", "cancel"):
+            send({"ok": False, "error": f"unknown op {op!r}; expected submit, list, "
+                  "status, watch, pause, resume or cancel"})
+            return
+        job = self.jobs.get(str(message.get("job")))
+        if job is None:
+            send({"ok": False, "error": f"no job {message.get('job')!r}"})
+        elif op == "status":
+            with self.lock:
+                reply = {"ok": True, **job.summary()}
+                if "record" in job.result:
+                    reply["record"] = job.result["record"]
+                if "output" in job.result:
+                    reply["output"] = job.result["output"]
+            send(reply)
+        elif op == "watch":
+            self.watch(job, send)
+        else:
+            send(self.signal(job, op))
+
+    def submit(self, message):
+        '''
+        Validate a job and start its worker. argv is the command line the
+        job would have (options and one target); a destructive job must
+        carry "confirm" set to the device path, as typed at the prompt.
+        '''
+        argv = message.get("argv")
+        if not isinstance(argv, list) or not all(isinstance(arg, str) for arg in argv):
+            return {"ok": False, "error": "argv must be a list of command line arguments"}
+        errors = io.StringIO()
+        try:
+            # argparse reports to stderr and exits; keep both off the service
+            with self.parsing, contextlib.redirect_stderr(errors), \
+                    contextlib.redirect_stdout(errors):
+                args = parse_arguments(argv)
+        except SystemExit:
+            lines = errors.getvalue().strip().splitlines()
+            return {"ok": False, "error": lines[-1] if lines else "invalid arguments"}
+        if args.serve or args.list:
+            return {"ok": False, "error": "--serve and --list are not job options"}
+        if len(args.target) != 1:
+            return {"ok": False, "error": "a job takes exactly one target device"}
+        devname = os.path.abspath(args.target[0])
+        if not os.path.exists(devname):
+            return {"ok": False, "error": f"target device {devname} not found"}
+        if args.plan:
+            try:
+                parse_plan(args.plan)
+            except ValueError as exc:
+                return {"ok": False, "error": f"--plan: {exc}"}
+        mode, operation = _operation(args)
+        if mode not in _READ_ONLY_MODES and message.get("confirm") != devname:
+            return {"ok": False, "error": f"{operation} destroys all data on {devname}; "
+                    f"set confirm to {devname!r} to proceed"}
+
+        target = _target_identity(devname)
+        with self.lock:
+            busy = [job for job in self.jobs.values()
+                    if job.target == target and job.state not in self._TERMINAL]
+            if busy:
+                return {"ok": False, "error": f"{devname} is busy with job {busy[0].id} "
+                        f"({busy[0].device})"}
+            job = ServeJob(id=str(self.next_id), device=devname, operation=operation,
+                           argv=argv, target=target, events=self.context.Queue())
+            self.next_id += 1
+            job.worker = self.context.Process(target=_serve_worker, args=(argv, job.events),
+                                              name=f"owl-job-{job.id}")
+            job.worker.start()
+            self.jobs[job.id] = job
+        threading.Thread(target=self.pump, args=(job,), daemon=True,
+                         name=f"owl-job-{job.id}").start()
+        console.print(f"[cyan]Job {job.id}[/] {devname}: started {operation} "
+                      f"[dim](pid {job.worker.pid})[/]")
+        return {"ok": True, "job": job.id, "device": devname, "operation": operation}
+
+    def deliver(self, job, event):
+        '''Record one event for job and pass it to its watchers.'''
+        with self.lock:
+            if event["event"] == "progress":
+                job.progress = event
+            else:
+                if event["event"] == "start":
+                    job.progress = event
+                job.history.append(event)
+            for watcher in job.watchers:
+                watcher.put(event)
+
+    def pump(self, job):
+        '''
+        Forward a job's worker events until it exits, then settle its state
+        and send the result event. Probe results go into this process's
+        cache for the jobs forked after it.
+        '''
+        def handle(kind, device, payload):
+            if kind == "probe":
+                key, value = payload
+                _probe_cache[key] = value
+            elif kind == "done":
+                job.result = payload
+            elif kind == "status":
+                self.deliver(job, event_dict("log", device, message=payload))
+            else:
+                self.deliver(job, event_dict(kind, device, payload))
+
+        while job.worker.is_alive():
+            try:
+                handle(*job.events.get(timeout=0.2))
+            except queue.Empty:
+                pass
+        while True:
+            try:
+                handle(*job.events.get_nowait())
+            except queue.Empty:
+                break
+        job.worker.join()
+
+        with self.lock:
+            job.exitcode = job.worker.exitcode
+            if job.exitcode == 0:
+                job.state = "done"
+            elif job.cancelled:
+                job.state = "cancelled"
+            else:
+                job.state = "failed"
+        self.deliver(job, event_dict("result", job.device, job=job.id, outcome=job.state,
+                                     exit=job.exitcode,
+                                     success=bool(job.result.get("success")) and job.exitcode == 0,
+                                     report=job.result.get("report", ""),
+                                     log=job.result.get("log"),
+                                     output=job.result.get("output", [])))
+        if job.state == "done":
+            console.print(f"[bold green]✓[/] [cyan]Job {job.id}[/] {job.device}: done")
+        else:
+            console.print(f"[bold red]✗[/] [cyan]Job {job.id}[/] {job.device}: "
+                          f"{job.state} (exit {job.exitcode})")
+
+    def watch(self, job, send):
+        '''
+        Stream job's events to one client: the kept history and latest
+        progress first, then live events, ending with the result event.
+        '''
+        events = queue.Queue()
+        with self.lock:
+            backlog = list(job.history)
+            if job.progress and job.progress not in backlog:
+                backlog.append(job.progress)
+            finished = job.state in self._TERMINAL
+            if not finished:
+                job.watchers.append(events)
+        try:
+            for event in backlog:
+                send(event)
+            while not finished:
+                event = events.get()
+                send(event)
+                finished = event["event"] == "result"
+        finally:
+            with self.lock:
+                if events in job.watchers:
+                    job.watchers.remove(events)
+
+    def signal(self, job, op):
+        '''
+        pause and resume stop and continue the job's whole process group;
+        cancel interrupts it as Ctrl+C would, so its checkpoint journal is
+        left for a later --resume job.
+        '''
+        with self.lock:
+            try:
+                if op == "pause" and job.state == "running":
+                    os.killpg(job.worker.pid, signal.SIGSTOP)
+                    job.state = "paused"
+                elif op == "resume" and job.state == "paused":
+                    os.killpg(job.worker.pid, signal.SIGCONT)
+                    job.state = "running"
+                elif op == "cancel" and job.state not in self._TERMINAL:
+                    os.killpg(job.worker.pid, signal.SIGINT)
+                    job.cancelled = True
+                    if job.state == "paused":
+                        os.killpg(job.worker.pid, signal.SIGCONT)
+                        job.state = "running"
+                else:
+                    return {"ok": False, "error": f"job {job.id} is {job.state}"}
+            except ProcessLookupError:
+                # The worker has exited and pump() has yet to settle it, or
+                # has not yet made itself a process group leader
+                return {"ok": False, "error": f"job {job.id} has no process group to "
+                        f"{op}; it is finishing or still starting"}
+        console.print(f"[cyan]Job {job.id}[/] {job.device}: {op}")
+        self.deliver(job, event_dict("log", job.device, message=f"Job {job.id}: {op} requested"))
+        return {"ok": True, **job.summary()}
+
+    def stop(self):
+        '''Cancel every unfinished job and wait for it to checkpoint and exit.'''
+        with self.lock:
+            active = [job for job in self.jobs.values() if job.state not in self._TERMINAL]
+        for job in active:
+            self.signal(job, "cancel")
+        for job in active:
+            job.worker.join(_SERVE_STOP_TIMEOUT)
+            if job.worker.is_alive():
+                os.killpg(job.worker.pid, signal.SIGKILL)
+        if active:
+            console.print(f"[yellow]⚠ Cancelled {len(active)} unfinished jobs; "
+                          "submit them again with --resume to continue.[/]")
+
+
+class _ServeHandler(socketserver.StreamRequestHandler):
+    '''One --serve client connection: JSON requests in, JSON replies out.'''
+    def handle(self):
+        import json as _json
+
+        def send(reply):
+            self.wfile.write((_json.dumps(reply, default=str) + "\n").encode())
+            self.wfile.flush()
+
+        try:
+            for line in self.rfile:
+                if not line.strip():
+                    continue
+                try:
+                    message = _json.loads(line)
+                    if not isinstance(message, dict):
+                        raise ValueError
+                except ValueError:
+                    send({"ok": False, "error": "a request is one JSON object per line"})
+                    continue
+                self.server.service.request(message, send)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+def serve(path):
+    '''
+    Run the --serve service on the Unix socket path until interrupted or
+    sent SIGTERM, then cancel unfinished jobs and remove the socket.
+    '''
+    if os.path.exists(path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(path)
+            console.print(f"[bold red]ERROR: A service is already listening on {path}.[/]")
+            sys.exit(1)
+        except OSError:
+            os.unlink(path)     # left behind by a service that did not stop cleanly
+        finally:
+            probe.close()
+
+    # The default block size's 0xFF and 0x00 buffers are anonymous shared
+    # mmaps: built once here, every forked job uses the same pages
+    prepare_patterns(_FULL_PASSES, _DEFAULT_BLOCKSIZE)
+
+    service = WipeService()
+    # Any local user who can connect can submit a wipe: the socket is
+    # created 0600, never briefly open under a permissive umask
+    umask = os.umask(0o177)
+    try:
+        server = socketserver.ThreadingUnixStreamServer(path, _ServeHandler)
+    except OSError as exc:
+        console.print(f"[bold red]ERROR: Could not listen on {path}: {exc}[/]")
+        sys.exit(1)
+    finally:
+        os.umask(umask)
+    server.daemon_threads = True
+    server.service = service
+    signal.signal(signal.SIGTERM, lambda sig, frame: sys.exit(0))
+    console.print(f"[bold green]✓ Serving wipe jobs on {path}[/] [dim](Ctrl+C to stop)[/]")
+    try:
+        server.serve_forever()
+    finally:
+        service.stop()
+        server.server_close()
+        os.unlink(path)
+
+
+def set_progress(args):
+    '''
+    Select the progress sink from --progress / --quiet. JSON events on
+    stdout move every other message to stderr, so stdout carries nothing
+    but events.
+    '''
+    global console, _progress_mode, _progress_stream
+    from rich.console import Console
+    if args.quiet:
+        _progress_mode = "quiet"
+    elif args.progress == "json":
+        _progress_mode = "json"
+        if args.progress_file:
+            try:
+                _progress_stream = open(args.progress_file, "a", encoding="utf-8")
+            except OSError as exc:
+                console.print(f"[bold red]ERROR: Could not open {args.progress_file}: {exc}[/]")
+                sys.exit(1)
+        else:
+            _progress_stream = sys.stdout
+            console = Console(stderr=True, highlight=False)
+
+
+def main():
+    '''
+    Entry point. Parses arguments, resolves the target devices, and runs
+    the selected operation on one device here or on several concurrently.
+    '''
+    args = parse_arguments()
+    set_progress(args)
+
+    # --list needs no target and no root — handle and exit immediately
+    if args.list:
+        list_devices()
+        sys.exit(0)
+
+    if args.serve:
+        if args.target:
+            console.print("[bold red]ERROR: --serve takes no target device; "
+                "submit jobs over the socket.[/]")
+            sys.exit(1)
+        atexit.register(cleanup)
+        rootcheck()
+        serve(args.serve)
+        return
+
+    # All other operations require a target device
+    if not args.target:
+        console.print("[bold red]ERROR: A target device is required. "
+            "Use --list to see available devices.[/]")
+        sys.exit(1)
+
+    targets = resolve_targets(args.target)
+
+    if args.operator and args.report is None:
+        console.print("[yellow]⚠ --operator was specified but --report was not. "
+            "The operator name will not be saved unless --report is also used.[/]")
+
+    atexit.register(cleanup)
+    rootcheck()
+
+    if len(targets) > 1:
+        run_batch(args, targets)
+        return
+
+    devname = targets[0]
+    logfile = args.logfile  # None if not provided by user
+    # If a directory was given for --logfile, auto-name the file inside it
+    if logfile is not None:
+        logfile = _device_path(logfile, devname, "owl_log", ".txt")
+
+    job = prepare_device(args, devname, logfile)
+    run_job(args, job)
 
 if __name__ == "__main__":
     main()